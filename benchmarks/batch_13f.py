@@ -0,0 +1,75 @@
+"""
+Parse time of a batch of WhaleWisdom 13F exports.
+
+Before: one export at a time, each a serial pd.read_excel. After: read_uploads
+parses the batch on PARSE_WORKERS processes (sales_data.workers), and a batch
+seen before comes straight from the parsed-upload cache. The exports are
+synthetic, with the three title rows the page skips.
+
+Usage:
+     python benchmarks/batch_13f.py [--filers 40] [--holdings 3000] [--workers 8]
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sales_data import uploads, workers
+
+
+class Upload:
+     # The part of st.file_uploader's UploadedFile the readers use
+     def __init__(self, content, name):
+          self.content = content
+          self.name = name
+
+     def getvalue(self):
+          return self.content
+
+
+def export(seed, holdings) -> bytes:
+     rng = np.random.default_rng(seed)
+     df = pd.DataFrame({'Symbol': [f'T{i}' for i in rng.choice(10 * holdings, holdings, replace=False)],
+                        'Market Value': rng.integers(1_000, 50_000_000, holdings)})
+     buffer = io.BytesIO()
+     with pd.ExcelWriter(buffer) as writer:
+          pd.DataFrame([['13F Holdings'], ['Filer'], ['Quarter']]).to_excel(writer, header=False, index=False)
+          df.to_excel(writer, startrow=3, index=False)
+     return buffer.getvalue()
+
+
+def main():
+     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+     parser.add_argument('--filers', type=int, default=40, help='Exports in the batch')
+     parser.add_argument('--holdings', type=int, default=3000, help='Holdings per export')
+     parser.add_argument('--workers', type=int, default=workers.PARSE_WORKERS)
+     args = parser.parse_args()
+     workers.PARSE_WORKERS = args.workers
+
+     files = [Upload(export(seed, args.holdings), f'filer{seed}.xlsx') for seed in range(args.filers)]
+     started = time.perf_counter()
+     serial = [pd.read_excel(io.BytesIO(upload.getvalue()), skiprows=3) for upload in files]
+     before = time.perf_counter() - started
+
+     # Worker processes start on the first batch and are reused, so warm them up with a different batch
+     uploads.read_uploads([Upload(export(10_000 + seed, 10), f'warmup{seed}.xlsx') for seed in range(1, args.workers + 1)], skiprows=3)
+     started = time.perf_counter()
+     batch = uploads.read_uploads(files, skiprows=3)
+     after = time.perf_counter() - started
+     started = time.perf_counter()
+     uploads.read_uploads(files, skiprows=3)
+     cached = time.perf_counter() - started
+
+     assert all(a.equals(b) for a, b in zip(serial, batch))
+     print(f'{args.filers} exports x {args.holdings:,} holdings, {args.workers} workers')
+     print(f'  serial {before:.2f} s -> batch {after:.2f} s, repeated batch {1000 * cached:.1f} ms')
+
+
+if __name__ == '__main__':
+     main()
@@ -0,0 +1,85 @@
+"""
+Cost of one filter change on the Cohort Analyzer.
+
+Before: DynamicFilters filtered a copy of the whole frame once per filter column
+to find that column's options, and once more for the table. After: FacetIndex
+answers the options and the rows from per-value bitmaps (sales_data.facets).
+Timed over a few typical selections, at today's latest-month cohort size and at
+ten times that.
+
+Usage:
+     python benchmarks/cohort_filters.py [--rows 20000] [--reruns 10]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cohort_rerun import cohort_frame, process
+from sales_data.facets import FacetIndex
+
+FILTERS = ['Client Defined Category Name', 'IS Outsider', 'ETF/SMA Outsider', 'SP Outsider', 'COM Outsider', 'Vest', 'Channel']
+
+SELECTIONS = [
+     {},
+     {'Vest': ['Wholesaler 3']},
+     {'Vest': ['Wholesaler 3', 'Wholesaler 7'], 'Channel': ['Channel 1']},
+     {'Client Defined Category Name': ['Category 2'], 'IS Outsider': ['Outsider'], 'Channel': ['Channel 0', 'Channel 4']},
+]
+
+
+def dynamic_filters(df, selections):
+     # What DynamicFilters did on every rerun: options per filter from a filtered copy, then the table
+     def filter_df(except_filter=None):
+          filtered_df = df.copy()
+          for key, values in selections.items():
+               if key != except_filter and values:
+                    filtered_df = filtered_df[filtered_df[key].isin(values)]
+          return filtered_df
+     options = {column: sorted(filter_df(column)[column].dropna().unique().tolist()) for column in FILTERS}
+     return options, filter_df()
+
+
+def facet_filters(index, selections):
+     options = {column: sorted(index.options(selections, column)) for column in FILTERS}
+     return options, index.filter(selections)
+
+
+def median_ms(call, reruns) -> float:
+     times = []
+     for _ in range(reruns):
+          started = time.perf_counter()
+          call()
+          times.append(time.perf_counter() - started)
+     return 1000 * statistics.median(times)
+
+
+def main():
+     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+     parser.add_argument('--rows', type=int, default=20_000, help="Rows in today's latest-month cohort")
+     parser.add_argument('--reruns', type=int, default=10)
+     args = parser.parse_args()
+
+     for rows in (args.rows, 10 * args.rows):
+          # Twelve months are generated and the latest one is kept, like process_dataframe
+          df = process(cohort_frame(12 * rows))
+          df = df.assign(**{column: df[column].cat.add_categories('None').fillna('None') for column in FILTERS[:-1]})
+          started = time.perf_counter()
+          index = FacetIndex(df, FILTERS)
+          build = 1000 * (time.perf_counter() - started)
+
+          print(f'{len(df):,} rows, index built once per version in {build:.1f} ms')
+          for selections in SELECTIONS:
+               before_options, before_rows = dynamic_filters(df, selections)
+               after_options, after_rows = facet_filters(index, selections)
+               assert before_options == after_options and before_rows.index.equals(after_rows.index)
+               before = median_ms(lambda: dynamic_filters(df, selections), args.reruns)
+               after = median_ms(lambda: facet_filters(index, selections), args.reruns)
+               print(f'  {len(after_rows):>8,} rows matching {sorted(selections) or "no filter"}: {before:7.1f} ms -> {after:5.1f} ms')
+
+
+if __name__ == '__main__':
+     main()
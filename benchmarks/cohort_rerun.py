@@ -0,0 +1,118 @@
+"""
+Per-rerun cost of the Cohort Analyzer's cached process_dataframe step.
+
+Before: the function took the loaded frames, so every rerun hashed both of them
+to find the cache entry. After: it takes the source URL and is keyed by the
+source version (sales_data.versions), so a rerun only looks the version up.
+With st.cache_data both variants still unpickle a private copy of the result;
+the shared variant (sales_data.shared) hands every rerun a view of one copy.
+
+Usage:
+     python benchmarks/cohort_rerun.py [--rows 250000] [--reruns 20]
+"""
+import argparse
+import pickle
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sales_data.columns import columns_for
+from sales_data.schema import apply_schema
+from sales_data.shared import shared_cache
+from sales_data.versions import CACHE_ENTRIES, versioned
+from sales_data.wholesalers import resolve_wholesalers
+
+
+def cohort_frame(rows, seed=0) -> pd.DataFrame:
+     # Cohort-shaped frame: 12 months of clients with the analyzer's columns
+     rng = np.random.default_rng(seed)
+     labels = lambda prefix, n: np.array([f'{prefix} {i}' for i in range(n)], dtype=object)[rng.integers(0, n, rows)]
+     flags = lambda: np.where(rng.random(rows) < 0.2, 'Outsider', None)
+     df = pd.DataFrame({
+          'Month/Year (Asset Date)': pd.to_datetime('2024-01-01') + pd.to_timedelta(rng.integers(0, 12, rows) * 31, unit='D'),
+          'Client Defined Category Name': labels('Category', 8),
+          'IS Outsider': flags(), 'ETF/SMA Outsider': flags(), 'SP Outsider': flags(), 'COM Outsider': flags(),
+          'Vest': labels('Wholesaler', 12),
+          'Intermediary Firm Name': labels('Firm', 5000),
+          'Initiating Firm Name': labels('Office', 20000),
+          'Address Line 1': labels('Street', 20000),
+          'Address Line 2': labels('Suite', 500),
+          'City': labels('City', 3000),
+          'Postal Code': labels('Zip', 9000),
+          'State/Region': labels('State', 50),
+          'Channel': labels('Channel', 6),
+          'AUM': rng.gamma(2, 5e5, rows), 'Industry AUM': rng.gamma(2, 5e7, rows),
+          'NNA': rng.normal(0, 1e5, rows), 'Industry NNA': rng.normal(0, 1e7, rows),
+     })
+     df['Month/Year (Asset Date)'] = df['Month/Year (Asset Date)'].dt.to_period('M').dt.to_timestamp()
+     return resolve_wholesalers(apply_schema(df.sort_values('Month/Year (Asset Date)', ignore_index=True), 'mf_cohort'), 'Vest')
+
+
+def process(df) -> pd.DataFrame:
+     # Same shape of work as the page: latest month, analyzer columns
+     df = df[df['Month/Year (Asset Date)'] == df['Month/Year (Asset Date)'].max()]
+     return df[columns_for('mf_cohort', 'cohort_analyzer')]
+
+
+def rerun_times(call, reruns) -> list:
+     call()  # populate the cache
+     times = []
+     for _ in range(reruns):
+          started = time.perf_counter()
+          call()
+          times.append(time.perf_counter() - started)
+     return times
+
+
+def main():
+     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+     parser.add_argument('--rows', type=int, default=250_000)
+     parser.add_argument('--reruns', type=int, default=20)
+     args = parser.parse_args()
+
+     df_mf_master = cohort_frame(args.rows)
+     df_territory_master = pd.DataFrame({'Zip': [f'Zip {i}' for i in range(40000)], 'Territory': 'T'})
+     # Stand-in for the cohort workbook: only its version is checked
+     source = Path(tempfile.mkdtemp()) / 'cohort.xlsx'
+     source.write_bytes(b'v1')
+     frames = {str(source): df_mf_master}
+
+     @st.cache_data(show_spinner=False)
+     def by_frames(df_mf_master, df_territory_master):
+          return process(df_mf_master)
+
+     @versioned('url')
+     @st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+     def by_version(url, version=None):
+          return process(frames[url])
+
+     @versioned('url')
+     @shared_cache
+     def by_version_shared(url, version=None):
+          return process(frames[url])
+
+     result = process(df_mf_master)
+     payload = pickle.dumps(result)
+     unpickle = rerun_times(lambda: pickle.loads(payload), args.reruns)
+
+     before = rerun_times(lambda: by_frames(df_mf_master, df_territory_master), args.reruns)
+     after = rerun_times(lambda: by_version(str(source)), args.reruns)
+     shared = rerun_times(lambda: by_version_shared(str(source)), args.reruns)
+     ms = lambda times: 1000 * statistics.median(times)
+     print(f'{args.rows:,} cohort rows, {len(result):,} in the latest month, median of {args.reruns} reruns')
+     print(f'  unpickling the cached result:       {ms(unpickle):8.2f} ms ({len(payload) / 2**20:.1f} MB copied per rerun with st.cache_data)')
+     print(f'  before, keyed by frame contents:    {ms(before):8.2f} ms per rerun')
+     print(f'  after, keyed by source version:     {ms(after):8.2f} ms per rerun')
+     print(f'  shared read-only, keyed by version: {ms(shared):8.2f} ms per rerun, no copy')
+
+
+if __name__ == '__main__':
+     main()
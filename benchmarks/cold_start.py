@@ -0,0 +1,78 @@
+"""
+Cold-start parse time of several source workbooks loaded at once.
+
+Before: SourceLoader ran every loader on a thread, and each thread parsed its
+workbook with openpyxl. openpyxl holds the GIL, so the threads took turns and
+the parses cost their sum. After: the threads hand the parse to the worker
+processes (sales_data.workers), which write the snapshots the loaders then
+memory-map. This only overlaps the parses when there is more than one CPU.
+
+Usage:
+     python benchmarks/cold_start.py [--sources 4] [--rows 20000] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sales_data import snapshot, workers
+from sales_data.snapshot import read_excel_snapshot
+
+
+def workbook(path, rows, seed):
+     rng = np.random.default_rng(seed)
+     pd.DataFrame({'Date': pd.to_datetime('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+                   'Firm': [f'Firm {i}' for i in rng.integers(0, 5000, rows)],
+                   'Zip': [f'{i:05d}' for i in rng.integers(0, 99999, rows)],
+                   'AUM': rng.gamma(2, 5e5, rows), 'NNA': rng.normal(0, 1e5, rows)}).to_excel(path, index=False)
+
+
+def on_threads(load, paths) -> float:
+     # One thread per source, like SourceLoader
+     started = time.perf_counter()
+     with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+          list(executor.map(load, paths))
+     return time.perf_counter() - started
+
+
+def main():
+     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+     parser.add_argument('--sources', type=int, default=4)
+     parser.add_argument('--rows', type=int, default=20_000, help='Rows per workbook')
+     parser.add_argument('--workers', type=int, default=workers.PARSE_WORKERS)
+     args = parser.parse_args()
+     workers.PARSE_WORKERS = args.workers
+
+     directory = Path(tempfile.mkdtemp())
+     snapshot.SNAPSHOT_DIR = directory / 'snapshots'
+     paths = [directory / f'source{seed}.xlsx' for seed in range(args.sources)]
+     for seed, path in enumerate(paths):
+          workbook(path, args.rows, seed)
+
+     started = time.perf_counter()
+     for path in paths:
+          pd.read_excel(path, engine='openpyxl')
+     serial = time.perf_counter() - started
+     threads = on_threads(lambda path: pd.read_excel(path, engine='openpyxl'), paths)
+     # Worker processes start on the first parse and are reused, so warm them up with a different version
+     on_threads(lambda path: read_excel_snapshot(path, version='warmup', nrows=1), paths)
+     processes = on_threads(lambda path: read_excel_snapshot(path, version='v1'), paths)
+     mapped = on_threads(lambda path: read_excel_snapshot(path, version='v1'), paths)
+
+     print(f'{args.sources} workbooks x {args.rows:,} rows, {args.workers} workers, {os.cpu_count()} CPUs')
+     print(f'  one after the other   {serial:6.2f} s')
+     print(f'  before, on threads    {threads:6.2f} s')
+     print(f'  after, on processes   {processes:6.2f} s')
+     print(f'  restart, snapshots    {1000 * mapped:6.1f} ms')
+
+
+if __name__ == '__main__':
+     main()
@@ -1,4 +1,5 @@
 from datetime import datetime
+from functools import partial
 from click import style
 import streamlit as st
 import pandas as pd
@@ -9,55 +10,19 @@ from pathlib import Path
 import yaml
 from yaml import SafeLoader
 import streamlit_authenticator as stauth
-
-def format_dollar_amount(amount):
-    formatted_absolute_amount = '${:,.2f}'.format(abs(amount))
-    if round(amount, 2) < 0:
-        return f'-{formatted_absolute_amount}'
-    return formatted_absolute_amount
-
-def format_headers(df):
-     df['AUM'] = df['AUM'].apply(lambda x: format_dollar_amount(x))
-     #df['Industry AUM'] = df['Industry AUM'].apply(lambda x: format_dollar_amount(x))
-     #df['NNA'] = df['NNA'].apply(lambda x: format_dollar_amount(x))
-     #df['Industry NNA'] = df['Industry NNA'].apply(lambda x: format_dollar_amount(x))
-     return df
-
-def format_ticker_headers(df):
-     for column in df:
-          df[column] = df[column].apply(lambda x: format_dollar_amount(x))
-     #df['Industry AUM'] = df['Industry AUM'].apply(lambda x: format_dollar_amount(x))
-     #df['NNA'] = df['NNA'].apply(lambda x: format_dollar_amount(x))
-     #df['Industry NNA'] = df['Industry NNA'].apply(lambda x: format_dollar_amount(x))
-     return df
-
-@st.cache_data(ttl=21*24*3600)
-def load_vest_wholesaler_data(url):
-     #----------READ IN DATA--------
-     # Read in the Cboe Vest Wholesaler Territory Data
-     df_vest_wholesalers = pd.read_excel(url,engine='openpyxl',skiprows=0)
-     return df_vest_wholesalers
-
-@st.cache_data(ttl=21*24*3600)
-def load_ft_wholesaler_data(url):
-     #----------READ IN DATA--------
-     # Read in the Cboe Vest Wholesaler Territory Data
-     df_ft_wholesalers = pd.read_excel(url,engine='openpyxl',skiprows=0)
-     return df_ft_wholesalers
-
-@st.cache_data(ttl=21*24*3600)
-def load_etf_analyzer_data(url):
-     #----------READ IN DATA--------
-     # Read in the FT ETF Sales Data
-     df_etf_master = pd.read_excel(url,engine='openpyxl',skiprows=0)
-     return df_etf_master
-
-@st.cache_data(ttl=21*24*3600)
-def load_uit_data(url):
-     #----------READ IN DATA--------
-     # Read in the FT UIT Sales Data
-     df_uit_master = pd.read_excel(url,engine='openpyxl',skiprows=0)
-     return df_uit_master
+from sales_data import (SourceLoader, load_etf_analyzer_data, load_ft_wholesaler_data, load_uit_data,
+                        load_vest_wholesaler_data)
+from sales_data.columns import columns_for
+from sales_data.formatting import dollar_columns, dollar_grid_options
+from sales_data.periods import MonthIndex, parse_month
+from sales_data.territories import load_uit_territory_data
+from sales_data.wholesaler_ranking import load_etf_ranking_cube, load_uit_ranking_cube
+
+def merge_uit_wholesalers(sources):
+     # Wait for the UIT and territory workbooks, then take the UIT rows with their territories resolved once per version
+     for name in ['UIT Sales', 'FT Wholesalers', 'Vest Wholesalers']:
+          sources.get(name)
+     return load_uit_territory_data(st.secrets['uit_sales_url'], st.secrets['ft_wholesaler_url'], st.secrets['vest_wholesaler_url'])
 
 #---------- SETTINGS ----------
 page_title = "FT Sales Intelligence"
@@ -97,29 +62,28 @@ elif st.session_state['authentication_status'] is None:
 if st.session_state['authentication_status']:
      
      #----------STATUS MESSAGE------
-     with st.spinner('Loading All Sales Data. This May Take A Minute. Please wait...'):
-          df_etf_master = load_etf_analyzer_data(st.secrets['etf_analyzer_url'])
-          df_uit_master = load_uit_data(st.secrets['uit_sales_url'])
-          df_ft_wholesalers = load_ft_wholesaler_data(st.secrets['ft_wholesaler_url'])
-          df_vest_wholesalers = load_vest_wholesaler_data(st.secrets['vest_wholesaler_url'])
-     
-     # Merge all FT and Vest Wholesalers together     
-     df_wholesaler_merged = df_ft_wholesalers.merge(df_vest_wholesalers,left_on='State',right_on='State',how='left')
-     # Then merge all wholesalers list with the ETF and UIT data to create a master table by clients and wholesalers
-     #df_etf_master_merged = df_etf_master.merge(df_wholesaler_merged, left_on=['Zip'], right_on=['Zip'], how='left').rename(columns={'City_x':'City','State_x':'State'})
-     df_uit_master_merged = df_uit_master.merge(df_wholesaler_merged, left_on=['Zip'], right_on=['Zip'], how='left').rename(columns={'City_x':'City','State_x':'State'})
+     # Start loading every source at once. The UIT and territory workbooks are only waited on by the UIT views
+     sources = SourceLoader({
+          'ETF Sales': partial(load_etf_analyzer_data, st.secrets['etf_analyzer_url']),
+          'UIT Sales': partial(load_uit_data, st.secrets['uit_sales_url']),
+          'FT Wholesalers': partial(load_ft_wholesaler_data, st.secrets['ft_wholesaler_url']),
+          'Vest Wholesalers': partial(load_vest_wholesaler_data, st.secrets['vest_wholesaler_url']),
+     })
+     df_etf_master = sources.get('ETF Sales')
      
      df_buffer_etf_master = df_etf_master[df_etf_master['Ticker'].isin(st.secrets['buffer_etf_tickers'])]
      df_target_income_etf_master = df_etf_master[df_etf_master['Ticker'].isin(st.secrets['target_income_etf_tickers'])]
      
      etf_ticker_options = df_etf_master['Ticker'].sort_values().unique().tolist()
-     date_options = df_etf_master['Date'].dt.strftime('%m-%Y').unique().tolist()
+     # The ETF and UIT histories are sorted by month at load, so each month is a contiguous block of rows
+     etf_months = MonthIndex(df_etf_master['Date'])
+     date_options = [month.strftime('%m-%Y') for month in etf_months.months]
      sp_wholesaler_options = df_etf_master['SP Outsider'].sort_values().unique().tolist()
      etf_wholesaler_options = df_etf_master['ETF Outsider'].sort_values().unique().tolist()
      uit_wholesaler_options = df_etf_master['COM Outsider'].sort_values().unique().tolist()
      vest_wholesaler_options = df_etf_master['Wholesaler'].sort_values().unique().tolist()
      
-     etf_df_headers = ['Account','Sub Acct Name','Office Address','City','State','Zip','Ticker','AUM','SP Outsider','ETF Outsider','COM Outsider','Wholesaler']
+     etf_df_headers = columns_for('etf_analyzer', 'tools_clients')
      uit_df_headers = ['Account','Sub Acct Name','Office Address','City','State','Zip','Ticker','AUM','COM Outsider','SP Outsider','ETF Outsider','Wholesaler']
      
      st.subheader("Wholesaler Ranking")
@@ -138,35 +102,23 @@ if st.session_state['authentication_status']:
           
           # Submit button and then perform operation on data based on the conditions
           if st.button("Submit", key='update_ranking'):
+               # Every ranking is answered from the month's cells of a cube rolled up once per data version
+               ranking_month = parse_month(date_select)
                if wholesaler_type_select == 'Structured':
-                    if vest_wholesaler_select:
-                         df_wholesaler_rank = df_buffer_etf_master.where((df_buffer_etf_master['Date'] == date_select) & (df_buffer_etf_master['Wholesaler'] == vest_wholesaler_select)).groupby(['SP Outsider'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False, ignore_index=True)
-                    else:
-                         df_wholesaler_rank = df_buffer_etf_master.where((df_buffer_etf_master['Date'] == date_select) & (df_buffer_etf_master['Ticker'].isin(st.secrets['buffer_etf_tickers']))).groupby(['SP Outsider'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False, ignore_index=True)
+                    df_wholesaler_rank = load_etf_ranking_cube(st.secrets['etf_analyzer_url']).rank(
+                         ranking_month, ['SP Outsider'], tickers=st.secrets['buffer_etf_tickers'], wholesaler=vest_wholesaler_select)
                elif wholesaler_type_select == 'ETF':
-                    if vest_wholesaler_select:
-                         if split_columns_by_ticker:
-                              df_wholesaler_rank = df_target_income_etf_master.where((df_target_income_etf_master['Wholesaler'] == vest_wholesaler_select) & df_target_income_etf_master['Ticker'].isin(st.secrets['target_income_etf_tickers'])).groupby(['ETF Outsider','Ticker','Wholesaler'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False).pivot(index='ETF Outsider',columns='Ticker',values='AUM')
-                         else:
-                              df_wholesaler_rank = df_target_income_etf_master.where((df_target_income_etf_master['Wholesaler'] == vest_wholesaler_select) & df_target_income_etf_master['Ticker'].isin(st.secrets['target_income_etf_tickers'])).groupby(['ETF Outsider'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False, ignore_index=True)
-                    elif split_columns_by_ticker:
-                         df_wholesaler_rank = df_target_income_etf_master.where(df_target_income_etf_master['Ticker'].isin(st.secrets['target_income_etf_tickers'])).groupby(['ETF Outsider', 'Wholesaler', 'Ticker'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False).pivot(index=['ETF Outsider', 'Wholesaler'], columns='Ticker', values='AUM')
-                         for column in df_wholesaler_rank:
-                              df_wholesaler_rank[column].astype(float)
-                         #df_wholesaler_rank = format_ticker_headers(df_wholesaler_rank)
-                         #df_wholesaler_rank.insert(0, 'ETF Outsider', df_wholesaler_rank.index)
-                    else:     
-                         df_wholesaler_rank = df_target_income_etf_master.where((df_target_income_etf_master['Date'] == date_select) & df_target_income_etf_master['Ticker'].isin(st.secrets['target_income_etf_tickers'])).groupby(['ETF Outsider','Wholesaler'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False, ignore_index=True)
+                    # Without a wholesaler filter the ranking is by outsider and Vest wholesaler pair
+                    ranking_levels = ['ETF Outsider'] if vest_wholesaler_select else ['ETF Outsider', 'Wholesaler']
+                    df_wholesaler_rank = load_etf_ranking_cube(st.secrets['etf_analyzer_url']).rank(
+                         ranking_month, ranking_levels, tickers=st.secrets['target_income_etf_tickers'], wholesaler=vest_wholesaler_select,
+                         split_by_ticker=split_columns_by_ticker)
                else:
-                    if vest_wholesaler_select:
-                         df_wholesaler_rank = df_uit_master_merged.where((df_uit_master_merged['Date'] == date_select) & (df_uit_master_merged['Wholesaler'] == vest_wholesaler_select)).groupby(['COM Outsider'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False)
-                    else:     
-                         df_wholesaler_rank = df_uit_master_merged.where((df_uit_master_merged['Date'] == date_select)).groupby(['COM Outsider','Wholesaler'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False)
-               #df_wholesaler_rank['AUM'] = df_wholesaler_rank['AUM'].apply(lambda x: format_dollar_amount(x))
-               try:
-                    updated_df = format_headers(df_wholesaler_rank)
-               except:
-                    updated_df = df_wholesaler_rank
+                    ranking_levels = ['COM Outsider'] if vest_wholesaler_select else ['COM Outsider', 'Wholesaler']
+                    df_wholesaler_rank = load_uit_ranking_cube(st.secrets['uit_sales_url'], st.secrets['ft_wholesaler_url'], st.secrets['vest_wholesaler_url']).rank(
+                         ranking_month, ranking_levels, wholesaler=vest_wholesaler_select)
+               # AUM stays numeric so the table sorts by amount. The dollar format is applied by the column config
+               updated_df = df_wholesaler_rank
                
                # Configure the AG-Grid options to better display the data
                gb = GridOptionsBuilder.from_dataframe(updated_df)
@@ -189,7 +141,9 @@ if st.session_state['authentication_status']:
                #     update_mode=GridUpdateMode.SELECTION_CHANGED
                #     )        
                
-               st.dataframe(df_wholesaler_rank)  
+               # Tickers pivoted into columns come from a categorical. Keep the headers as plain labels
+               df_wholesaler_rank.columns = df_wholesaler_rank.columns.astype(str)
+               st.dataframe(df_wholesaler_rank, column_config=dollar_columns(df_wholesaler_rank))  
                     
      #with st.expander('ETF Wholesaler Ranking'):
      #     with st.form('ETF Wholesaler Rank Form'):
@@ -198,7 +152,7 @@ if st.session_state['authentication_status']:
      #          submitted = st.form_submit_button("Submit")
      #
      #          if submitted:
-     #               df_sp_wholesaler_rank = df_target_income_etf_master_merged.where(df_target_income_etf_master_merged['Date'] == date_select).groupby(['ETF Outsider'], as_index=False)['AUM'].sum().sort_values(by=['AUM'],ascending=False)
+     #               df_sp_wholesaler_rank = df_target_income_etf_master_merged.where(df_target_income_etf_master_merged['Date'] == date_select).groupby(['ETF Outsider'], as_index=False, observed=True)['AUM'].sum().sort_values(by=['AUM'],ascending=False)
      #               df_sp_wholesaler_rank['AUM'] = df_sp_wholesaler_rank['AUM'].apply(lambda x: format_dollar_amount(x))
      #               AgGrid(df_sp_wholesaler_rank)
                     
@@ -213,9 +167,9 @@ if st.session_state['authentication_status']:
                
 
                if submitted:
-                    df_clients_by_ticker = df_etf_master[df_etf_master['Ticker'].isin([etf_ticker_select])].where(df_etf_master['Date'] == date_select).sort_values(by=['AUM'], ascending=False)[etf_df_headers].fillna('').head(100)
-                    df_clients_by_ticker['AUM'] = df_clients_by_ticker['AUM'].apply(lambda x: format_dollar_amount(x))
-                    AgGrid(df_clients_by_ticker)
+                    df_selected_month = etf_months.select(df_etf_master, parse_month(date_select))
+                    df_clients_by_ticker = df_selected_month[df_selected_month['Ticker'].isin([etf_ticker_select])].sort_values(by=['AUM'], ascending=False)[etf_df_headers].head(100)
+                    AgGrid(df_clients_by_ticker, gridOptions=dollar_grid_options(df_clients_by_ticker), allow_unsafe_jscode=True)
                     
      with st.expander('Clients By ETF Ticker and Wholesaler'):
           date_select = st.selectbox('Please select the date you want to analyze sales data:', date_options, index=len(date_options)-1, key='clients by etf and wholesaler select')
@@ -240,12 +194,12 @@ if st.session_state['authentication_status']:
           
 
           if st.button('Submit', key='clients by etf and wholesaler button'):
+               df_selected_month = etf_months.select(df_etf_master, parse_month(date_select))
                if st.session_state['sp_wholesaler']:
-                    df_by_client_and_wholesaler = df_buffer_etf_master[df_buffer_etf_master['Ticker'].isin([etf_ticker_select])].where((df_buffer_etf_master['Date'] == date_select) & (df_buffer_etf_master['SP Outsider'] == wholesaler_select)).sort_values(by=['AUM'], ascending=False)[etf_df_headers].dropna(how='all')
+                    df_by_client_and_wholesaler = df_selected_month[df_selected_month['Ticker'].isin([etf_ticker_select]) & (df_selected_month['SP Outsider'] == wholesaler_select)].sort_values(by=['AUM'], ascending=False)[etf_df_headers]
                else:
-                    df_by_client_and_wholesaler = df_target_income_etf_master[df_target_income_etf_master['Ticker'].isin([etf_ticker_select])].where((df_target_income_etf_master['Date'] == date_select) & (df_target_income_etf_master['SP Outsider'] == wholesaler_select)).sort_values(by=['AUM'], ascending=False)[etf_df_headers].dropna(how='all')
-               df_by_client_and_wholesaler['AUM'] = df_by_client_and_wholesaler['AUM'].apply(lambda x: format_dollar_amount(x))
-               AgGrid(df_by_client_and_wholesaler)
+                    df_by_client_and_wholesaler = df_selected_month[df_selected_month['Ticker'].isin([etf_ticker_select]) & (df_selected_month['ETF Outsider'] == wholesaler_select)].sort_values(by=['AUM'], ascending=False)[etf_df_headers]
+               AgGrid(df_by_client_and_wholesaler, gridOptions=dollar_grid_options(df_by_client_and_wholesaler), allow_unsafe_jscode=True)
      
      # Analyze UITs by Wholesaler          
      with st.expander('Clients By UIT'):
@@ -258,6 +212,6 @@ if st.session_state['authentication_status']:
                
 
                if submitted:
-                    df_clients = df_uit_master_merged.where(df_uit_master_merged['Date'] == date_select).sort_values(by=['AUM'], ascending=False)[uit_df_headers].fillna('')
-                    #df_clients['AUM'] = df_clients['AUM'].apply(lambda x: format_dollar_amount(x))
-                    AgGrid(df_clients)
\ No newline at end of file
+                    df_uit_master_merged = merge_uit_wholesalers(sources)
+                    df_clients = MonthIndex(df_uit_master_merged['Date']).select(df_uit_master_merged, parse_month(date_select)).sort_values(by=['AUM'], ascending=False)[uit_df_headers]
+                    AgGrid(df_clients, gridOptions=dollar_grid_options(df_clients), allow_unsafe_jscode=True)
\ No newline at end of file
@@ -5,26 +5,15 @@ from pathlib import Path
 import yaml
 from yaml import SafeLoader
 import streamlit_authenticator as stauth
+from sales_data import load_mf_cohort_data
+from sales_data.columns import columns_for
+from sales_data.firms import load_firm_directory, load_firm_index, load_firm_matcher
+from sales_data.formatting import dollar_columns
+from sales_data.schema import replace_categories
 
-def format_dollar_amount(amount):
-    formatted_absolute_amount = '${:,.2f}'.format(abs(amount))
-    if round(amount, 2) < 0:
-        return f'-{formatted_absolute_amount}'
-    return formatted_absolute_amount
-
-@st.cache_data(ttl=21*24*3600)
 def load_data(url):
-    # Read in the data
-    df = pd.read_excel(url, engine='openpyxl', skiprows=0, usecols=[
-        'Initiating Firm Name',
-        'Client Defined Category Name',
-        'ETF/SMA Outsider',
-        'Channel',
-        'AUM',
-        'Industry AUM',
-        'NNA',
-        'Industry NNA'
-    ])
+    # Read in the data from the shared cohort loader and keep only the columns this page uses
+    df = load_mf_cohort_data(url)[columns_for('mf_cohort', 'industry_lookup')]
     return df
 
 st.set_page_config(page_title="Industry AUM Lookup", page_icon="📈", layout="wide")
@@ -66,7 +55,7 @@ if st.session_state['authentication_status']:
     This page extracts Industry AUM from the Cohort Analyzer output. 
     """)
     st.write("""
-    !! This page takes about 30 seconds to load the first time !!
+    !! The first load after new data is published takes about 30 seconds !!
     """)
 
     # Load data
@@ -85,6 +74,7 @@ if st.session_state['authentication_status']:
     )
     # Get user input for firm names
     firm_names = st.text_area("Enter firm names (separated by new lines)")
+    fuzzy_match = st.toggle("Fuzzy match firm names", help="Match names that differ in punctuation, legal suffixes or small typos")
 
     # Add a button to extract data
     extract_button = st.button("Extract data")
@@ -94,13 +84,16 @@ if st.session_state['authentication_status']:
         firm_names = [name.strip() for name in firm_names.split("\n") if name.strip()]
 
         if firm_names:
-            # Create a dictionary to store the order of input
-            firm_order = {name.lower(): index for index, name in enumerate(firm_names)}
+            # Resolve the names through the firm index: one lookup per name instead of scanning every row.
+            # The fuzzy matcher has the same interface, with keys shared by near-identical spellings
+            firm_index = load_firm_matcher(url) if fuzzy_match else load_firm_index(url)
+            firm_keys = firm_index.keys_for(firm_names)
+            rows = firm_index.rows(firm_keys)
             
             # Filter and process the dataframe
-            filtered_df = df[(df['Initiating Firm Name'].str.lower().isin([name.lower() for name in firm_names])) & 
-                             (df['ETF/SMA Outsider'] == etf_outsider) &
-                             (df['Channel'] == 'RIA')]
+            filtered_df = df.take(rows).assign(**{'Firm Key': firm_index.row_keys[rows]})
+            filtered_df = filtered_df[(filtered_df['ETF/SMA Outsider'] == etf_outsider) &
+                                      (filtered_df['Channel'] == 'RIA')]
             category_mapping = {
                 'BUIGX': 'Hedged Equity',
                 'KNGIX': 'Covered Call',
@@ -108,50 +101,39 @@ if st.session_state['authentication_status']:
                 'RYSE ': 'IR Hedge',
                 'BTCVX': 'Crypto'
             }
-            filtered_df.loc[filtered_df['Client Defined Category Name'].isin(category_mapping), 'Client Defined Category Name'] = filtered_df['Client Defined Category Name'].map(category_mapping)
-            filtered_df = filtered_df.groupby(['Initiating Firm Name', 'Client Defined Category Name'])['Industry AUM'].sum().reset_index()
-            filtered_df['Industry AUM'] = filtered_df['Industry AUM'].apply(format_dollar_amount)
+            filtered_df = filtered_df.assign(**{'Client Defined Category Name': replace_categories(filtered_df['Client Defined Category Name'], category_mapping)})
+            filtered_df = filtered_df.groupby(['Firm Key', 'Client Defined Category Name'], observed=True)['Industry AUM'].sum().reset_index()
             
             # Pivot the dataframe
-            pivoted_df = filtered_df.pivot(index='Initiating Firm Name', columns='Client Defined Category Name', values='Industry AUM')
-            # Replace the index with the case of the text inputs
-            pivoted_df.index = pivoted_df.index.map(lambda x: next((name for name in firm_names if name.lower() == x.lower()), x))
-            
-            # Create a DataFrame with all input firm names
-            all_firms_df = pd.DataFrame(index=[name for name in firm_names])
-            # Merge the pivoted dataframe with all_firms_df, making the merge case-insensitive
-            result_df = all_firms_df.merge(
-                pivoted_df.reset_index(),
-                how='left',
-                left_index=True,
-                right_on=pivoted_df.index.name,
-                suffixes=('', '_y')
-            )
-            result_df.index = result_df[pivoted_df.index.name].str.lower()
-            result_df.drop(columns=[pivoted_df.index.name], inplace=True)
-            
-            # Sort the dataframe based on the input order
-            result_df['sort_order'] = result_df.index.str.lower().map(firm_order)
-            result_df = result_df.sort_values('sort_order')
-            
-            # Replace the index with the case of the text inputs
-            result_df.index = result_df.index.map(lambda x: next((name for name in firm_names if name.lower() == x), x))
+            pivoted_df = filtered_df.pivot(index='Firm Key', columns='Client Defined Category Name', values='Industry AUM')
+            # The categories become the columns. Keep them as plain labels so the table can be serialized
+            pivoted_df.columns = pivoted_df.columns.astype(str)
             
-            # Remove the sort_order column and reset the index
-            result_df = result_df.drop('sort_order', axis=1).reset_index()
+            # One row per input firm in input order, empty for firms without Industry AUM
+            result_df = pivoted_df.reindex(firm_keys)
+            result_df.index = pd.Index(firm_names, name='Initiating Firm Name')
+            result_df = result_df.reset_index()
             result_df.columns.name = None  # Remove the name from the columns index
             
-            # Set the firm name column as the index
-            #result_df.set_index(firm_name_column, inplace=True)
-
+            # Firms with Industry AUM sorted by name, labeled with the case of the first matching input
+            first_input = {key: name for key, name in reversed(list(zip(firm_keys, firm_names)))}
+            pivoted_df = pivoted_df.loc[sorted(pivoted_df.index, key=lambda key: firm_index.keys[key])]
+            pivoted_df.index = pd.Index([first_input[key] for key in pivoted_df.index], name='Initiating Firm Name')
+            
             # Display the filtered data side by side
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("Sorted based on Input")
-                st.dataframe(result_df)
+                st.dataframe(result_df, column_config=dollar_columns(result_df))
             with col2:
                 st.subheader("Show only firms with Industry AUM")
-                st.dataframe(pivoted_df)
+                st.dataframe(pivoted_df, column_config=dollar_columns(pivoted_df))
+            
+            if fuzzy_match:
+                # Show what each name was matched to, with the runners-up
+                with st.expander("Fuzzy matches"):
+                    st.dataframe(firm_index.candidates(firm_names), hide_index=True,
+                                 column_config={'Score': st.column_config.ProgressColumn('Score', min_value=0, max_value=1, format='%.2f')})
         else:
             st.warning("Please enter at least one firm name.")
 
@@ -159,22 +141,21 @@ if st.session_state['authentication_status']:
     st.markdown("---")
     st.subheader("Single Firm Lookup")
 
-    # Get unique list of Initiating Firm Names
-    unique_firm_names = sorted(df['Initiating Firm Name'].unique())
+    # Search the cached firm directory and offer only the closest names, not every firm
+    firm_directory = load_firm_directory(url)
+    firm_search = st.text_input("Search Firm Name", key="firm_name_search", placeholder="Start typing a firm name...")
 
     # Create an autocomplete input for Firm Name
     selected_firm = st.selectbox(
         "Enter or Select Firm Name",
-        options=[""] + unique_firm_names,
+        options=[""] + firm_directory.search(firm_search),
         index=0,
         key="firm_name_input"
     )
 
     if selected_firm:
-        # Filter the dataframe for the selected firm
-        firm_df = df[(df['Initiating Firm Name'] == selected_firm) & 
-                     (df['ETF/SMA Outsider'] == etf_outsider) & 
-                     (df['Channel'] == 'RIA')]
+        # The firm's RIA Industry AUM by category, summed once per data version
+        firm_summary = firm_directory.summary(selected_firm, etf_outsider)
         
         # Apply category mapping
         category_mapping = {
@@ -184,16 +165,13 @@ if st.session_state['authentication_status']:
             'RYSE ': 'IR Hedge',
             'BTCVX': 'Crypto'
         }
-        firm_df.loc[firm_df['Client Defined Category Name'].isin(category_mapping), 'Client Defined Category Name'] = firm_df['Client Defined Category Name'].map(category_mapping)
-        
-        # Group by Client Defined Category Name and sum the Industry AUM
-        firm_summary = firm_df.groupby('Client Defined Category Name')['Industry AUM'].sum().reset_index()
+        firm_summary = firm_summary.assign(**{'Client Defined Category Name': replace_categories(firm_summary['Client Defined Category Name'], category_mapping)})
         
-        # Format the Industry AUM
-        firm_summary['Industry AUM'] = firm_summary['Industry AUM'].apply(format_dollar_amount)
+        # Categories the mapping merges are summed together
+        firm_summary = firm_summary.groupby('Client Defined Category Name', observed=True)['Industry AUM'].sum().reset_index()
         
-        # Display the results
+        # Display the results. Industry AUM stays numeric and is shown as dollars by the column config
         st.write(f"Industry AUM for {selected_firm}:")
-        st.dataframe(firm_summary)
+        st.dataframe(firm_summary, column_config=dollar_columns(firm_summary))
     else:
         st.info("Please select a firm to view its Industry AUM.")
\ No newline at end of file
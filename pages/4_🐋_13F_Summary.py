@@ -2,19 +2,26 @@ import streamlit as st
 import pandas as pd
 import io
 import openpyxl
+from datetime import datetime
 
 from pathlib import Path
 import yaml
 from yaml import SafeLoader
 import streamlit_authenticator as stauth
+from sales_data.formatting import dollar_columns
+from sales_data.holdings import changes_text, holdings_by_quarter, holdings_changes
+from sales_data.uploads import clear_upload, latest_upload, read_upload, read_uploads
 
-@st.cache_data
-def load_ticker_data(ticker_file):
-    return pd.read_excel(ticker_file)
+# Name the Master ETF ticker file is shared under, so every session can use the latest upload
+MASTER_TICKER_FILE = 'Master ETF Data Pull'
+
+def holdings_text(df_holdings):
+    # One 'Ticker Type $Market Value' line per holding
+    return df_holdings['Ticker'] + ' ' + df_holdings['Type'].fillna('') + ' $' + df_holdings['Market Value'].map("{:,}".format)
 
 def generate_holdings_summary(df_tickers, ww_file):
-    # Read the Whalewisdom export excel file
-    df_ww_export = pd.read_excel(ww_file, skiprows=3)
+    # Read the Whalewisdom export excel file. The same export is only parsed once, whoever uploads it
+    df_ww_export = read_upload(ww_file, skiprows=3)
 
     # Perform left join on df_tickers and df_ww_export
     df_merged = pd.merge(df_tickers, df_ww_export, left_on='Ticker', right_on='Symbol', how='left')
@@ -31,16 +38,56 @@ def generate_holdings_summary(df_tickers, ww_file):
     df_sliced = df_sliced[df_sliced['Market Value'] != 0]
 
     df_sliced = df_sliced.sort_values(by='Market Value', ascending=False)
-    df_sliced['Market Value'] = df_sliced['Market Value'].apply(lambda x: "{:,}".format(x))
-    
-    # Create a new column 'Text' that combines 'Ticker' and 'Market Value'
-    df_sliced['Text'] = df_sliced['Ticker'] +' '+ df_sliced['Type'].fillna('') + ' $' + df_sliced['Market Value']
 
-    # Join all elements in the 'Text' column into a single string, separated by newlines
-    text_chunk = '\n'.join(df_sliced['Text'])
+    # Join all holdings into a single string, separated by newlines
+    text_chunk = '\n'.join(holdings_text(df_sliced))
 
     return text_chunk
 
+def generate_batch_summary(df_tickers, ww_files):
+    # Parse every export at once on the parser processes, then join them all against the ticker master in one merge
+    df_ww_exports = read_uploads(ww_files, skiprows=3)
+    filers = filer_names(ww_files)
+    df_ww_export = pd.concat([df.assign(Filer=filer) for df, filer in zip(df_ww_exports, filers)], ignore_index=True)
+    df_ww_export['Filer'] = pd.Categorical(df_ww_export['Filer'], categories=filers)
+
+    # Holdings outside the ticker master, or without a market value, never reach the summary
+    df_merged = pd.merge(df_tickers, df_ww_export, left_on='Ticker', right_on='Symbol', how='inner')
+    df_merged['Market Value'] = df_merged['Market Value'].fillna(0).astype(int)
+    df_sliced = df_merged[['Filer', 'Ticker', 'Market Value', 'Type']].dropna(subset=['Ticker'])
+    df_sliced = df_sliced[df_sliced['Market Value'] != 0]
+
+    # Each filer's holdings, largest first, in upload order. Filers without any holding get an empty block
+    df_sliced = df_sliced.sort_values(by=['Filer', 'Market Value'], ascending=[True, False], kind='stable')
+    filer_blocks = holdings_text(df_sliced).groupby(df_sliced['Filer'], observed=False).agg('\n'.join)
+
+    # Market value of every ticker summed over all filers
+    df_combined = df_sliced.groupby(['Ticker', 'Type'], dropna=False, as_index=False)['Market Value'].sum()
+    df_combined = df_combined.sort_values(by='Market Value', ascending=False, kind='stable')
+    combined_text = '\n'.join(holdings_text(df_combined))
+
+    return combined_text, filer_blocks
+
+def generate_quarter_changes(df_tickers, ww_files):
+    # Quarterly exports of one filer, oldest first, compared quarter by quarter
+    quarters = filer_names(ww_files)
+    df_values = holdings_by_quarter(df_tickers, read_uploads(ww_files, skiprows=3), quarters)
+    comparisons = []
+    for before, after in zip(quarters, quarters[1:]):
+        df_changes = holdings_changes(df_values, before, after)
+        comparisons.append((before, after, df_changes, changes_text(df_changes, before, after)))
+    return df_values, comparisons
+
+def filer_names(ww_files):
+    # Filers are named after their export file. Repeated names get a counter so their blocks stay apart
+    stems = [Path(ww_file.name).stem for ww_file in ww_files]
+    seen = {}
+    names = []
+    for stem in stems:
+        seen[stem] = seen.get(stem, 0) + 1
+        names.append(f'{stem} ({seen[stem]})' if stems.count(stem) > 1 else stem)
+    return names
+
 #-------------- USER AUTHENTICATION ----------
 
 # load config file
@@ -83,25 +130,72 @@ if st.session_state['authentication_status']:
     3. Click 'Generate Summary' to process the data and view the results.
     """)
 
-    # Master ticker file upload
-    if 'ticker_data' not in st.session_state:
-        ticker_file = st.file_uploader("Upload Master ETF Data Pull Excel file", type=["xlsx"])
-        if ticker_file:
-            st.session_state.ticker_data = load_ticker_data(ticker_file)
-            st.success("Master ETF Data Pull file loaded successfully!")
-
-    # Whalewisdom file upload
-    ww_file = st.file_uploader("Upload Whalewisdom Export Excel file", type=["xlsx"])
-
-    if 'ticker_data' in st.session_state and ww_file:
+    # Master ticker file upload. The latest upload from any session is used until it is replaced or cleared
+    ticker_data, ticker_details = latest_upload(MASTER_TICKER_FILE)
+    # Clearing the shared file also empties this session's uploader, which would share it again otherwise
+    ticker_uploads = st.session_state.setdefault('ticker_uploads', 0)
+    ticker_file = st.file_uploader("Upload Master ETF Data Pull Excel file", type=["xlsx"], key=f'ticker_file_{ticker_uploads}')
+    if ticker_file:
+        ticker_data = read_upload(ticker_file, share_as=MASTER_TICKER_FILE, shared_by=st.session_state["name"])
+        ticker_details = latest_upload(MASTER_TICKER_FILE)[1]
+    if ticker_data is not None and ticker_details is not None:
+        uploaded_at = datetime.fromisoformat(ticker_details['uploaded_at']).strftime('%b %d, %Y %I:%M %p')
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.success(f"Using {ticker_details['file_name']}, uploaded by {ticker_details['uploaded_by']} on {uploaded_at}. "
+                       "Upload a new file to replace it for everyone.")
+        with col2:
+            if st.button("Clear Master ETF Data Pull file"):
+                clear_upload(MASTER_TICKER_FILE)
+                st.session_state['ticker_uploads'] += 1
+                st.rerun()
+
+    # Whalewisdom file upload. Several exports at once are summarized as a batch, or compared as quarters of one filer
+    ww_files = st.file_uploader("Upload Whalewisdom Export Excel files", type=["xlsx"], accept_multiple_files=True)
+    compare_quarters = st.toggle("Compare quarters", help="Treat the exports as quarterly exports of one filer, uploaded oldest first")
+
+    if ticker_data is not None and len(ww_files) == 1:
         if st.button("Generate Summary"):
             try:
-                result = generate_holdings_summary(st.session_state.ticker_data, ww_file)
+                result = generate_holdings_summary(ticker_data, ww_files[0])
                 st.text_area("Holdings Summary", result, height=400)
                 st.download_button("Download Summary", result, "holdings_summary.txt")
             except Exception as e:
                 st.error(f"An error occurred: {str(e)}")
-    elif 'ticker_data' not in st.session_state:
+    elif ticker_data is not None and ww_files and compare_quarters:
+        if st.button("Generate Summary"):
+            try:
+                df_values, comparisons = generate_quarter_changes(ticker_data, ww_files)
+                with st.expander("Market Value By Quarter"):
+                    st.dataframe(df_values, column_config=dollar_columns(df_values))
+                for before, after, df_changes, changes in comparisons:
+                    st.subheader(f"{before} → {after}")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.text_area("Holdings Changes", changes, height=400, key=f'changes {before} {after}')
+                    with col2:
+                        st.dataframe(df_changes, hide_index=True, column_config=dollar_columns(df_changes, [before, after, 'Change']))
+                all_changes = '\n\n'.join(f'{before} -> {after}\n\n{changes}' for before, after, _, changes in comparisons)
+                st.download_button("Download Changes", all_changes, "holdings_changes.txt")
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
+    elif ticker_data is not None and ww_files:
+        if st.button("Generate Summary"):
+            try:
+                combined_text, filer_blocks = generate_batch_summary(ticker_data, ww_files)
+                st.text_area(f"Combined Holdings Summary ({len(filer_blocks)} filers)", combined_text, height=400)
+                all_filers = '\n\n'.join(f'{filer}\n{block}' for filer, block in filer_blocks.items())
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.download_button("Download Combined Summary", combined_text, "holdings_summary_combined.txt")
+                with col2:
+                    st.download_button("Download Summaries By Filer", all_filers, "holdings_summary_by_filer.txt")
+                for filer, block in filer_blocks.items():
+                    with st.expander(filer):
+                        st.text(block or "No holdings in the ticker master.")
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
+    elif ticker_data is None:
         st.info("Please upload the Master ETF Data Pull file first.")
     else:
         st.info("Please upload a Whalewisdom Export file to generate the summary.")
\ No newline at end of file
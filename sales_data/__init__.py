@@ -0,0 +1,16 @@
+"""
+Shared data layer for the Sales Reporting pages.
+"""
+from sales_data.columns import CONSUMER_COLUMNS, columns_for, source_columns
+from sales_data.cube import FactCube, load_etf_cube, load_mf_cube, load_uit_cube
+from sales_data.loaders import (load_etf_analyzer_data, load_etf_sales_data, load_ft_wholesaler_data,
+                                load_mf_cohort_data, load_mf_sales_data, load_territory_data, load_uit_data,
+                                load_vest_wholesaler_data)
+from sales_data.parallel import SourceLoader
+from sales_data.periods import MonthIndex, parse_month, sort_by_period
+from sales_data.rankings import ClientRankings, load_cohort_rankings
+from sales_data.schema import SCHEMAS, apply_schema, frame_memory, replace_categories
+from sales_data.shared import shared_cache
+from sales_data.snapshot import read_csv_snapshot, read_excel_snapshot
+from sales_data.wholesalers import WholesalerRoster, name_key, partition_rows, resolve_wholesalers, rows_for, tab_label
+from sales_data.versions import served_version, versioned
@@ -0,0 +1,53 @@
+"""
+Columns each page reads from each source.
+
+Every consumer declares the columns it uses here. The loader for a source parses
+only the union of its consumers' columns, so no page pays parse time or memory
+for columns nobody touches. A page that starts using a new column adds it to
+its declaration; the snapshot key changes with the union, so the next load
+re-parses the workbook with the extra column.
+"""
+
+CLIENT_COLUMNS = ['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
+                  'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 'NNA']
+
+# Source -> consumer -> columns, in the order the consumer displays them
+CONSUMER_COLUMNS = {
+     'mf_sales': {
+          'cube': ['Month/Year (Asset Date)', 'Vest Wholesaler', 'Client Defined Category Name', 'Channel', 'AUM', 'NNA'],
+     },
+     'mf_cohort': {
+          'dashboard_clients': CLIENT_COLUMNS,
+          'client_rankings': ['Vest', 'Client Defined Category Name', 'AUM', 'NNA'],
+          'cohort_analyzer': ['Client Defined Category Name', 'IS Outsider', 'ETF/SMA Outsider', 'SP Outsider', 'COM Outsider', 'Vest',
+                              'Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2', 'City', 'Postal Code',
+                              'State/Region', 'Channel', 'AUM', 'Industry AUM', 'NNA', 'Industry NNA'],
+          'cohort_analyzer_period': ['Month/Year (Asset Date)'],
+          'industry_lookup': ['Initiating Firm Name', 'Client Defined Category Name', 'ETF/SMA Outsider', 'Channel',
+                              'AUM', 'Industry AUM', 'NNA', 'Industry NNA'],
+     },
+     'etf_sales': {
+          'cube': ['Date', 'Vest Wholesaler', 'Ticker', 'Channel', 'AUM'],
+     },
+     'etf_analyzer': {
+          'tools_clients': ['Account', 'Sub Acct Name', 'Office Address', 'City', 'State', 'Zip', 'Ticker', 'AUM',
+                            'SP Outsider', 'ETF Outsider', 'COM Outsider', 'Wholesaler'],
+          'tools_ranking': ['Date', 'Ticker', 'SP Outsider', 'ETF Outsider', 'COM Outsider', 'Wholesaler', 'AUM'],
+     },
+     'uit_sales': {
+          'cube': ['Date', 'State', 'Ticker', 'Channel', 'AUM'],
+          'tools_clients': ['Date', 'Account', 'Sub Acct Name', 'Office Address', 'City', 'State', 'Zip', 'Ticker', 'AUM'],
+     },
+}
+
+
+def columns_for(source, consumer) -> list:
+     # The columns one consumer declared for a source
+     return list(CONSUMER_COLUMNS[source][consumer])
+
+
+def source_columns(source) -> list:
+     """
+     Union of the columns every consumer of a source declared, in first-declared order
+     """
+     return list(dict.fromkeys(column for columns in CONSUMER_COLUMNS[source].values() for column in columns))
@@ -0,0 +1,221 @@
+"""
+Pre-aggregated monthly fact cubes for the Sales Dashboard.
+
+Each product's history is rolled up once per data version into AUM/NNA sums keyed
+by month x wholesaler x product x channel. Metric cards, month over month deltas,
+bar charts and the "Assets Over Time" series read from the rollups instead of
+scanning the raw rows. When a new version of a history only adds months, the
+cube is extended with those months instead of being rebuilt. A per-month
+fingerprint of the raw rows proves the older months are unchanged; any
+restatement, or a new version of a dimension input such as the territory list,
+rebuilds the whole cube.
+"""
+import threading
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sales_data.loaders import load_etf_sales_data, load_mf_sales_data, load_uit_data, load_vest_wholesaler_data
+from sales_data.periods import MonthIndex
+from sales_data.shared import shared_cache
+from sales_data.versions import served_version, versioned
+
+MONTH = 'Month'
+WHOLESALER = 'Wholesaler'
+PRODUCT = 'Product'
+CHANNEL = 'Channel'
+CUBE_LEVELS = [MONTH, WHOLESALER, PRODUCT, CHANNEL]
+
+# Number of raw rows behind each cell
+ROWS = 'Rows'
+
+
+def aggregate_cube(df, month_column, wholesaler_column, product_column, channel_column=None, measures=('AUM',)) -> pd.DataFrame:
+     """
+     Rolls a sales history up to one row per month x wholesaler x product x channel
+     Args:
+          df (pd.DataFrame): Raw sales rows
+          month_column, wholesaler_column, product_column, channel_column (str): Source columns for each level.
+               A missing channel column is kept as a single empty channel
+          measures (tuple): Numeric columns to sum
+     Returns:
+          pd.DataFrame: Sums of each measure plus a row count, indexed by CUBE_LEVELS
+     """
+     keys = [df[month_column], df[wholesaler_column], df[product_column]]
+     if channel_column in df:
+          keys.append(df[channel_column])
+     else:
+          keys.append(pd.Series(pd.NA, index=df.index, dtype='object'))
+     grouped = df[list(measures)].groupby(keys, dropna=False, observed=True)
+     cube = grouped.sum()
+     cube[ROWS] = grouped.size()
+     cube.index.names = CUBE_LEVELS
+     return cube.sort_index()
+
+
+def month_fingerprints(df, month_column) -> pd.Series:
+     """
+     Order-independent fingerprint of each month's raw rows: the wrapping sum of their row hashes over every column
+     Returns:
+          pd.Series: uint64 fingerprint per month, missing months included
+     """
+     hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+     codes, months = pd.factorize(df[month_column], use_na_sentinel=False)
+     fingerprints = np.zeros(len(months), dtype=np.uint64)
+     np.add.at(fingerprints, codes, hashes)
+     return pd.Series(fingerprints, index=months)
+
+
+def _breakdown(cube, level) -> pd.DataFrame:
+     return cube.groupby(level=[MONTH, level], dropna=False, observed=True).sum()
+
+
+class FactCube:
+     """
+     Lookups over one product's cube. Month totals and per-level breakdowns are rolled up
+     once when the cube is built, so each metric card, chart or series is a single index lookup.
+     """
+
+     def __init__(self, cube, fingerprints=None):
+          self.cube = cube
+          # Fingerprint of the raw rows of each month (see month_fingerprints), used to check the next version only appended months
+          self.fingerprints = fingerprints
+          self.measures = [column for column in cube.columns if column != ROWS]
+          self._totals = cube.groupby(level=MONTH, observed=True).sum()
+          self._breakdowns = {level: _breakdown(cube, level) for level in (WHOLESALER, PRODUCT, CHANNEL)}
+
+     @property
+     def months(self) -> pd.Index:
+          return self._totals.index
+
+     @property
+     def wholesalers(self) -> pd.Index:
+          return self._breakdowns[WHOLESALER].index.get_level_values(WHOLESALER).dropna().unique()
+
+     def extended(self, tail_cube, since, fingerprints=None) -> 'FactCube':
+          """
+          New cube with every month from `since` onward replaced by `tail_cube`. Only the tail is rolled up
+          """
+          def splice(rollup, tail):
+               return pd.concat([rollup[rollup.index.get_level_values(MONTH) < since], tail])
+
+          extended = FactCube.__new__(FactCube)
+          extended.cube = splice(self.cube, tail_cube)
+          extended.fingerprints = fingerprints
+          extended.measures = self.measures
+          extended._totals = splice(self._totals, tail_cube.groupby(level=MONTH, observed=True).sum())
+          extended._breakdowns = {level: splice(rollup, _breakdown(tail_cube, level)) for level, rollup in self._breakdowns.items()}
+          return extended
+
+     def total(self, month, measure='AUM'):
+          # Firm wide total for one month, 0 when the month is not in the data
+          if month not in self._totals.index:
+               return 0
+          return self._totals.at[month, measure]
+
+     def breakdown(self, month, level, measure='AUM') -> pd.DataFrame:
+          # Totals for one month split by a single level, shaped for st.bar_chart. Blank keys are left out like a default groupby
+          by_level = self._breakdowns[level]
+          if month not in by_level.index.get_level_values(MONTH):
+               return pd.DataFrame({level: [], measure: []})
+          month_rows = by_level.loc[month, [measure]]
+          return month_rows[month_rows.index.notna()].reset_index()
+
+     def wholesaler_total(self, month, wholesaler, measure='AUM'):
+          """
+          Total for a single wholesaler in one month. None selects rows without a wholesaler
+          """
+          by_wholesaler = self._breakdowns[WHOLESALER]
+          if month not in by_wholesaler.index.get_level_values(MONTH):
+               return 0
+          month_rows = by_wholesaler.loc[month, measure]
+          if wholesaler is None:
+               return month_rows[month_rows.index.isna()].sum()
+          return month_rows.get(wholesaler, 0)
+
+     def series(self, measure='AUM') -> pd.DataFrame:
+          """
+          Monthly time series shaped for st.line_chart, just the month and the measure
+          Args:
+               measure (str): Measure to plot
+          """
+          return self._totals[[measure]].reset_index()
+
+
+def update_cube(previous, df, month_column, aggregate) -> FactCube:
+     """
+     Brings a cube up to date with a history sorted by month
+     Args:
+          previous (FactCube): The cube built from the last version of the history, or None
+          df (pd.DataFrame): The current history
+          month_column (str): Period column the history is sorted by
+          aggregate (callable): Rolls raw rows up into a cube frame
+     Returns:
+          FactCube: When every month before the newest one in `previous` has the same fingerprint as before,
+               only the rows from that month onward are aggregated. Anything else is a full rebuild
+     """
+     fingerprints = month_fingerprints(df, month_column)
+     if previous is not None and previous.fingerprints is not None and len(previous.months):
+          last_month = previous.months[-1]
+          settled = previous.fingerprints[previous.fingerprints.index < last_month].sort_index()
+          if settled.equals(fingerprints[fingerprints.index < last_month].sort_index()):
+               start = MonthIndex(df[month_column]).rows(last_month).start
+               return previous.extended(aggregate(df.iloc[start:]), since=last_month, fingerprints=fingerprints)
+     return FactCube(aggregate(df), fingerprints)
+
+
+@st.cache_resource
+def _latest_cubes() -> dict:
+     # Newest cube per source and the version of its dimension inputs, kept across data versions so the next version can extend it
+     return {}
+
+
+_latest_cubes_lock = threading.Lock()
+
+
+def _refresh_cube(key, df, month_column, aggregate, inputs_version=None) -> FactCube:
+     """
+     Brings the newest cube of a source up to date with df, see update_cube
+     Args:
+          inputs_version (str): Version of the dimension inputs merged into df (e.g. a territory list). When it
+               changed, every month may have changed and the cube is rebuilt
+     """
+     with _latest_cubes_lock:
+          latest = _latest_cubes()
+          previous_inputs, previous = latest.get(key, (None, None))
+          if previous_inputs != inputs_version:
+               previous = None
+          cube = update_cube(previous, df, month_column, aggregate)
+          latest[key] = (inputs_version, cube)
+          return cube
+
+
+@versioned('url')
+@shared_cache
+def load_mf_cube(url: str, version: str = None) -> FactCube:
+     df_mf_sales_master = load_mf_sales_data(url)
+     aggregate = partial(aggregate_cube, month_column='Month/Year (Asset Date)', wholesaler_column='Vest Wholesaler',
+                         product_column='Client Defined Category Name', channel_column='Channel', measures=('AUM', 'NNA'))
+     return _refresh_cube(('mf', url), df_mf_sales_master, 'Month/Year (Asset Date)', aggregate)
+
+
+@versioned('url')
+@shared_cache
+def load_etf_cube(url: str, version: str = None) -> FactCube:
+     df_etf_master = load_etf_sales_data(url)
+     aggregate = partial(aggregate_cube, month_column='Date', wholesaler_column='Vest Wholesaler', product_column='Ticker',
+                         channel_column='Channel')
+     return _refresh_cube(('etf', url), df_etf_master, 'Date', aggregate)
+
+
+@versioned('url', 'vest_wholesaler_url')
+@shared_cache
+def load_uit_cube(url: str, vest_wholesaler_url: str, version: str = None) -> FactCube:
+     # UIT rows get their Vest wholesaler from the state territory list
+     df_uit_master_merged = load_uit_data(url).merge(load_vest_wholesaler_data(vest_wholesaler_url), left_on=['State'], right_on=['State'], how='left')
+     aggregate = partial(aggregate_cube, month_column='Date', wholesaler_column='Wholesaler', product_column='Ticker',
+                         channel_column='Channel')
+     return _refresh_cube(('uit', url, vest_wholesaler_url), df_uit_master_merged, 'Date', aggregate,
+                         inputs_version=served_version(vest_wholesaler_url))
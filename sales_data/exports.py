@@ -0,0 +1,137 @@
+"""
+On-demand downloads of filtered results.
+
+The Cohort Analyzer used to build a full xlsxwriter workbook in memory as the
+data= of its download button, on every rerun, whether or not anyone clicked it.
+export_button hands the button a callable instead, so the file is only written
+when it is clicked. Excel files stream their rows through xlsxwriter's
+constant-memory mode a chunk at a time, and CSV/Parquet are offered for big
+pulls. Written files are kept under SNAPSHOT_DIR/exports by content key, so
+downloading the same filter state of the same data version again reuses the
+file.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+import xlsxwriter
+
+from sales_data import snapshot
+
+# Export files kept on disk. The least recently used ones are removed first
+EXPORT_ENTRIES = 16
+# Rows converted to Python values at a time while streaming a workbook
+CHUNK_ROWS = 10_000
+
+# Format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+     'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+     'CSV': ('csv', 'text/csv'),
+     'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def write_excel(df, path, dollar_columns=()):
+     """
+     Writes a frame to a workbook row by row, holding one chunk of rows in memory at a time
+     Args:
+          df (pd.DataFrame): Rows to export
+          path (Path): Workbook to write
+          dollar_columns (list): Numeric columns shown with a dollar format
+     """
+     workbook = xlsxwriter.Workbook(str(path), {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+     try:
+          worksheet = workbook.add_worksheet('Sheet1')
+          dollar_format = workbook.add_format({'num_format': '$#,##0.00'})
+          header_format = workbook.add_format({'bold': True})
+          for position, column in enumerate(df.columns):
+               if column in dollar_columns:
+                    worksheet.set_column(position, position, None, dollar_format)
+          worksheet.write_row(0, 0, [str(column) for column in df.columns], header_format)
+          row = 1
+          for start in range(0, len(df), CHUNK_ROWS):
+               chunk = df.iloc[start:start + CHUNK_ROWS].astype(object)
+               # Missing values are left as empty cells
+               for values in chunk.where(chunk.notna(), None).itertuples(index=False, name=None):
+                    worksheet.write_row(row, 0, values)
+                    row += 1
+     finally:
+          workbook.close()
+
+
+def _write(df, path, fmt, dollar_columns):
+     if fmt == 'Excel':
+          write_excel(df, path, dollar_columns)
+     elif fmt == 'CSV':
+          df.to_csv(path, index=False, chunksize=CHUNK_ROWS)
+     else:
+          df.to_parquet(path, index=False)
+
+
+def export_dir() -> Path:
+     # Resolved on every call, so a SNAPSHOT_DIR set after import (e.g. by tests) is honoured
+     return snapshot.SNAPSHOT_DIR / 'exports'
+
+
+def _evict():
+     # Keep only the EXPORT_ENTRIES most recently used files
+     paths = sorted(export_dir().glob('*.*'), key=lambda path: path.stat().st_mtime, reverse=True)
+     for path in paths[EXPORT_ENTRIES:]:
+          path.unlink(missing_ok=True)
+
+
+def export_file(rows, fmt, key=None, dollar_columns=()) -> Path:
+     """
+     Writes the rows in a format, or reuses the file written for the same key
+     Args:
+          rows (callable): Returns the frame to export. Only called when there is no cached file
+          fmt (str): Key in EXPORT_FORMATS
+          key: JSON-serializable identity of the rows, e.g. source version and filter selections. None skips the cache
+          dollar_columns (list): Numeric columns shown with a dollar format in Excel
+     Returns:
+          Path: The export file
+     """
+     extension = EXPORT_FORMATS[fmt][0]
+     directory = export_dir()
+     directory.mkdir(parents=True, exist_ok=True)
+     if key is not None:
+          digest = hashlib.sha1(json.dumps([key, list(dollar_columns)], sort_keys=True, default=str).encode()).hexdigest()[:16]
+          path = directory / f'{digest}.{extension}'
+          if path.exists():
+               path.touch()
+               return path
+     else:
+          path = directory / f'unkeyed-{os.getpid()}-{threading.get_ident()}.{extension}'
+
+     tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+     try:
+          _write(rows(), tmp_path, fmt, dollar_columns)
+          os.replace(tmp_path, path)
+     finally:
+          tmp_path.unlink(missing_ok=True)
+     _evict()
+     return path
+
+
+def export_button(label, rows, file_stem, key=None, dollar_columns=(), widget_key='export'):
+     """
+     A format picker and a download button that only writes the file when it is clicked
+     Args:
+          label (str): Button label
+          rows (callable): Returns the frame to export. It runs off the script thread, so it must not read session state
+          file_stem (str): Downloaded file name without extension
+          key: Identity of the rows for the export cache, see export_file
+          dollar_columns (list): Numeric columns shown with a dollar format in Excel
+          widget_key (str): Prefix of the widget keys
+     """
+     fmt = st.radio('Export format', list(EXPORT_FORMATS), horizontal=True, key=f'{widget_key} format')
+     extension, mime = EXPORT_FORMATS[fmt]
+
+     def data():
+          return export_file(rows, fmt, key, dollar_columns).read_bytes()
+
+     st.download_button(label, data=data, file_name=f'{file_stem}.{extension}', mime=mime, key=f'{widget_key} button')
@@ -0,0 +1,128 @@
+"""
+Faceted filters over the cohort rows.
+
+DynamicFilters re-filtered the whole frame once per filter column, and again for
+the table, on every widget change. FacetIndex instead keeps one packed bitmap
+per value of each filter column, built once per data version. A selection is the
+OR of its values' bitmaps, the filtered rows are the AND of every selection,
+and the options left for one filter are the values whose bitmap still meets the
+AND of the other selections. Each step is a bitwise op over rows/8 bytes, so the
+cost of a widget change no longer grows with the width of the frame.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+class FacetIndex:
+     """
+     Packed row bitmaps for every value of the filter columns of a frame
+     Args:
+          df (pd.DataFrame): Frame to filter. Shared frames are only read
+          columns (list): Filter columns, in display order
+     """
+     def __init__(self, df, columns):
+          self.df = df
+          self.columns = list(columns)
+          # Column -> value -> packed bitmap of the rows holding that value. Missing values get no bitmap
+          self.bitmaps = {}
+          for column in self.columns:
+               codes, values = pd.factorize(df[column])
+               self.bitmaps[column] = {value: np.packbits(codes == code) for code, value in enumerate(values)}
+
+     def _selected(self, selections, column):
+          # Rows matching any selected value of one column, or None when the column is not filtered
+          values = selections.get(column)
+          if not values:
+               return None
+          bitmaps = [self.bitmaps[column][value] for value in values if value in self.bitmaps[column]]
+          if not bitmaps:
+               # Only values without rows are selected, so no row matches
+               return np.zeros((len(self.df) + 7) // 8, dtype=np.uint8)
+          return np.bitwise_or.reduce(bitmaps) if len(bitmaps) > 1 else bitmaps[0]
+
+     def _matching(self, selections, except_column=None):
+          # Rows matching every filtered column but one, or None when nothing is filtered
+          mask = None
+          for column in self.columns:
+               if column == except_column:
+                    continue
+               selected = self._selected(selections, column)
+               if selected is not None:
+                    mask = selected if mask is None else mask & selected
+          return mask
+
+     def options(self, selections, column) -> list:
+          """
+          Values of a column still available under the other columns' selections, like a cascading filter
+          Args:
+               selections (dict): Column -> selected values. Empty or missing means unfiltered
+               column (str): Filter column
+          """
+          mask = self._matching(selections, except_column=column)
+          if mask is None:
+               return list(self.bitmaps[column])
+          return [value for value, bitmap in self.bitmaps[column].items() if np.bitwise_and(mask, bitmap).any()]
+
+     def rows(self, selections) -> np.ndarray:
+          # Positions of the rows matching every selection
+          mask = self._matching(selections)
+          if mask is None:
+               return np.arange(len(self.df))
+          return np.flatnonzero(np.unpackbits(mask, count=len(self.df)))
+
+     def filter(self, selections) -> pd.DataFrame:
+          if self._matching(selections) is None:
+               return self.df
+          return self.df.take(self.rows(selections))
+
+
+class FacetFilters:
+     """
+     Cascading multiselect filters backed by a FacetIndex, a drop-in for DynamicFilters
+     Args:
+          index (FacetIndex): Index over the frame to filter
+          filters_name (str): Prefix of the widget keys in session state
+     """
+     def __init__(self, index, filters_name='filters'):
+          self.index = index
+          self.filters_name = filters_name
+
+     def _key(self, column):
+          return self.filters_name + column
+
+     def selections(self) -> dict:
+          # Column -> values currently selected in the widgets
+          return {column: st.session_state.get(self._key(column), []) for column in self.index.columns}
+
+     def display_filters(self, num_columns=1, gap='small'):
+          """
+          Renders one multiselect per filter column, each offering only the values left by the other selections
+          """
+          # Values without any row (e.g. kept from an older version of the data) go first, so they do not empty the other filters
+          selections = {column: [value for value in values if value in self.index.bitmaps[column]] for column, values in self.selections().items()}
+          # Drop selections a change elsewhere ruled out, until every selection is still offered
+          changed = True
+          while changed:
+               changed = False
+               for column in self.index.columns:
+                    options = set(self.index.options(selections, column))
+                    valid = [value for value in selections[column] if value in options]
+                    if valid != selections[column]:
+                         selections[column] = valid
+                         changed = True
+
+          containers = st.columns(num_columns, gap=gap)
+          for i, column in enumerate(self.index.columns):
+               key = self._key(column)
+               if st.session_state.get(key, []) != selections[column]:
+                    st.session_state[key] = selections[column]
+               with containers[i % num_columns]:
+                    st.multiselect(f"Select {column}", sorted(self.index.options(selections, column)), key=key)
+
+     def filtered(self) -> pd.DataFrame:
+          return self.index.filter(self.selections())
+
+     def display_df(self, **kwargs):
+          # Renders the filtered rows
+          st.dataframe(self.filtered(), **kwargs)
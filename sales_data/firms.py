@@ -0,0 +1,273 @@
+"""
+Firm-name index over the cohort rows.
+
+The Industry AUM Lookup matched pasted firm names by lower-casing the whole
+firm column on every query and mapping names back with a scan of the input per
+firm. FirmIndex normalizes the firm names once per data version and keeps, for
+each normalized name, the positions of its rows. A batch of N names then
+resolves with N hash lookups, in input order.
+
+Pasted lists rarely spell firms exactly like Broadridge does ("L.L.C." for
+"LLC", stray punctuation, "&" for "and"). FirmMatcher groups the names by a
+canonical form without punctuation or legal suffixes and keeps an inverted index
+from character trigrams to those groups. A pasted name is scored only against
+the groups sharing one of its trigrams, instead of against every firm.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from sales_data.loaders import load_mf_cohort_data
+from sales_data.shared import shared_cache
+from sales_data.versions import versioned
+
+FIRM_COLUMN = 'Initiating Firm Name'
+# Trigram similarity (Dice coefficient) a fuzzy match needs to be used
+MIN_SCORE = 0.6
+# Candidates listed per pasted name
+CANDIDATES = 3
+# Firms returned by a directory search
+SEARCH_LIMIT = 50
+# Pasted names whose best matches each matcher remembers
+MATCH_CACHE_SIZE = 2**14
+
+# Words that do not tell firms apart, dropped from the canonical form
+_LEGAL_WORDS = {'llc', 'inc', 'incorporated', 'co', 'company', 'corp', 'corporation', 'ltd', 'limited', 'lp', 'llp',
+                'pllc', 'pc', 'plc', 'na', 'the', 'and'}
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_firm_names(names) -> pd.Series:
+     # Case-folded names without surrounding whitespace. Missing names stay missing
+     return pd.Series(names, dtype='string').str.strip().str.casefold()
+
+
+def canonical_firm_name(name) -> str:
+     """
+     Form of a firm name used for fuzzy matching, e.g. "Smith & Jones, L.L.C." -> "smith jones"
+     """
+     words = _PUNCTUATION.sub('', str(name).casefold().replace('&', ' and ')).split()
+     # A name made only of legal words keeps them rather than becoming empty
+     return ' '.join([word for word in words if word not in _LEGAL_WORDS] or words)
+
+
+def _trigrams(name) -> set:
+     padded = f' {name} '
+     return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FirmIndex:
+     """
+     Row positions per normalized firm name
+     Args:
+          names (pd.Series): Firm name of every row
+     """
+     def __init__(self, names):
+          row_keys, keys = pd.factorize(normalize_firm_names(names).to_numpy(dtype=object, na_value=None))
+          # Normalized names, and the position of each row's name in them (-1 for rows without a firm)
+          self.keys = pd.Index(keys, dtype=object)
+          self.row_keys = row_keys
+          # Rows grouped by key: the rows of key k are _order[_bounds[k]:_bounds[k + 1]]
+          order = np.argsort(row_keys, kind='stable')
+          self._order = order[row_keys[order] >= 0]
+          self._bounds = np.searchsorted(row_keys[self._order], np.arange(len(keys) + 1))
+          # Spelling of each key's first row, for display
+          self.labels = pd.Series(names).to_numpy(dtype=object)[self._order[self._bounds[:-1]]]
+
+     def keys_for(self, names) -> np.ndarray:
+          """
+          Key of each name, in the order given
+          Args:
+               names (list): Firm names as entered
+          Returns:
+               np.ndarray: Position of each name in .keys, -1 for names with no rows
+          """
+          return self.keys.get_indexer(normalize_firm_names(list(names)).to_numpy(dtype=object, na_value=None))
+
+     def rows(self, keys) -> np.ndarray:
+          # Positions of every row of the given keys, in row order. Unknown (-1) and repeated keys are skipped
+          keys = np.unique(np.asarray(keys))
+          keys = keys[keys >= 0]
+          if not len(keys):
+               return np.array([], dtype=np.intp)
+          return np.sort(np.concatenate([self._order[self._bounds[key]:self._bounds[key + 1]] for key in keys]))
+
+
+class FirmMatcher:
+     """
+     Fuzzy lookups over a FirmIndex, with the same keys_for/rows/row_keys interface. Its keys are
+     canonical names, so spellings that only differ in punctuation or legal suffixes share a key
+     Args:
+          index (FirmIndex): Index over the cohort rows
+     """
+     def __init__(self, index):
+          key_groups, groups = pd.factorize(np.array([canonical_firm_name(key) for key in index.keys], dtype=object))
+          self.index = index
+          self.keys = pd.Index(groups, dtype=object)
+          self.labels = index.labels[np.unique(key_groups, return_index=True)[1]]
+          self.row_keys = np.where(index.row_keys >= 0, key_groups[index.row_keys], -1) if len(groups) else index.row_keys
+          # Index keys of each group
+          order = np.argsort(key_groups, kind='stable')
+          self._group_keys = np.split(order, np.searchsorted(key_groups[order], np.arange(1, len(groups))))
+
+          # Trigram -> groups containing it, and the trigram count of each group
+          postings = {}
+          self._sizes = np.zeros(len(groups), dtype=np.int32)
+          for group, name in enumerate(groups):
+               trigrams = _trigrams(name)
+               self._sizes[group] = len(trigrams)
+               for trigram in trigrams:
+                    postings.setdefault(trigram, []).append(group)
+          self._postings = {trigram: np.array(members, dtype=np.int32) for trigram, members in postings.items()}
+
+          # Best matches of recently pasted names, least recently used first. The matcher is shared by every session
+          self._matches = OrderedDict()
+          self._matches_lock = threading.Lock()
+
+     def _best(self, name):
+          """
+          Best CANDIDATES groups for a name and their Dice similarity to it, best first. Results are cached per
+          matcher and returned as read-only arrays
+          """
+          with self._matches_lock:
+               if name in self._matches:
+                    self._matches.move_to_end(name)
+                    return self._matches[name]
+          best = self._score(name)
+          for array in best:
+               array.flags.writeable = False
+          with self._matches_lock:
+               self._matches[name] = best
+               if len(self._matches) > MATCH_CACHE_SIZE:
+                    self._matches.popitem(last=False)
+          return best
+
+     def _score(self, name):
+          # Only the groups sharing a trigram with the name are counted
+          trigrams = _trigrams(canonical_firm_name(name))
+          postings = [self._postings[trigram] for trigram in trigrams if trigram in self._postings]
+          if not postings:
+               return np.array([], dtype=np.int32), np.array([])
+          shared = np.bincount(np.concatenate(postings), minlength=len(self.keys))
+          scores = 2 * shared / (len(trigrams) + self._sizes)
+          best = np.argpartition(-scores, CANDIDATES)[:CANDIDATES] if len(scores) > CANDIDATES else np.arange(len(scores))
+          best = best[np.argsort(-scores[best], kind='stable')]
+          best = best[shared[best] > 0]
+          return best, scores[best]
+
+     def candidates(self, names) -> pd.DataFrame:
+          """
+          Best matching firms for each name
+          Args:
+               names (list): Firm names as entered
+          Returns:
+               pd.DataFrame: Input, Firm and Score columns, up to CANDIDATES rows per name, best first
+          """
+          records = []
+          for name in names:
+               groups, scores = self._best(name)
+               records.extend(zip([name] * len(groups), self.labels[groups], scores))
+          return pd.DataFrame(records, columns=['Input', 'Firm', 'Score'])
+
+     def keys_for(self, names, min_score=MIN_SCORE) -> np.ndarray:
+          # Best matching key of each name, -1 when no firm scores at least min_score
+          keys = np.full(len(names), -1)
+          for i, name in enumerate(names):
+               groups, scores = self._best(name)
+               if len(groups) and scores[0] >= min_score:
+                    keys[i] = groups[0]
+          return keys
+
+     def rows(self, keys) -> np.ndarray:
+          keys = np.unique(np.asarray(keys))
+          keys = keys[keys >= 0]
+          if not len(keys):
+               return np.array([], dtype=np.intp)
+          return self.index.rows(np.concatenate([self._group_keys[key] for key in keys]))
+
+
+class FirmDirectory:
+     """
+     Sorted firm names with prefix search, and RIA Industry AUM per firm, ETF/SMA outsider and category
+     Args:
+          df (pd.DataFrame): Cohort rows, with the ETF/SMA outsider, channel, category and Industry AUM columns
+          index (FirmIndex): Index over the same rows
+     """
+     def __init__(self, df, index):
+          order = np.argsort(index.keys.to_numpy(dtype=object), kind='stable')
+          # Display name, normalized name and index key of every firm, sorted by normalized name
+          self.names = index.labels[order]
+          self._folded = index.keys.to_numpy(dtype=object)[order]
+          self._keys = order
+          self._key_of_name = dict(zip(self.names, self._keys))
+          # Later words of every name, sorted, with the position of their firm, so a search also finds "Smith Capital" from "cap"
+          words = [(word, position) for position, name in enumerate(self._folded) for word in name.split()[1:]]
+          words.sort()
+          self._words = np.array([word for word, _ in words], dtype=object)
+          self._word_firms = np.array([position for _, position in words], dtype=np.intp)
+
+          ria = (df['Channel'] == 'RIA').to_numpy() & (index.row_keys >= 0)
+          ria_df = df.loc[ria, ['ETF/SMA Outsider', 'Client Defined Category Name', 'Industry AUM']].assign(**{'Firm Key': index.row_keys[ria]})
+          self.summaries = ria_df.groupby(['Firm Key', 'ETF/SMA Outsider', 'Client Defined Category Name'], observed=True)['Industry AUM'].sum()
+
+     @staticmethod
+     def _prefix_range(values, prefix):
+          return np.searchsorted(values, prefix, 'left'), np.searchsorted(values, prefix + '\uffff', 'left')
+
+     def search(self, query, limit=SEARCH_LIMIT) -> list:
+          """
+          Firm names starting with the query, then names with a later word starting with it
+          Args:
+               query (str): Text typed so far. Empty lists the first firms alphabetically
+               limit (int): Most names returned
+          """
+          prefix = query.strip().casefold()
+          start, stop = self._prefix_range(self._folded, prefix)
+          positions = list(range(start, min(stop, start + limit)))
+          if prefix and len(positions) < limit:
+               start, stop = self._prefix_range(self._words, prefix)
+               seen = set(positions)
+               for position in self._word_firms[start:stop]:
+                    if position not in seen:
+                         seen.add(position)
+                         positions.append(position)
+                         if len(positions) == limit:
+                              break
+          return self.names[positions].tolist()
+
+     def summary(self, name, outsider) -> pd.DataFrame:
+          """
+          RIA Industry AUM of a firm for one ETF/SMA outsider, by category
+          Returns:
+               pd.DataFrame: Client Defined Category Name and Industry AUM columns, empty when the firm has none
+          """
+          key = self._key_of_name.get(name)
+          try:
+               summary = self.summaries.loc[(key, outsider)]
+          except (KeyError, TypeError):
+               summary = self.summaries.iloc[:0].droplevel(['Firm Key', 'ETF/SMA Outsider'])
+          return summary.reset_index()
+
+
+@versioned('url')
+@shared_cache
+def load_firm_index(url: str, version: str = None) -> FirmIndex:
+     # Firm index over the cohort rows, in the row order of load_mf_cohort_data(url)
+     return FirmIndex(load_mf_cohort_data(url)[FIRM_COLUMN])
+
+
+@versioned('url')
+@shared_cache
+def load_firm_matcher(url: str, version: str = None) -> FirmMatcher:
+     # Fuzzy matcher over the same rows as load_firm_index(url)
+     return FirmMatcher(load_firm_index(url))
+
+
+@versioned('url')
+@shared_cache
+def load_firm_directory(url: str, version: str = None) -> FirmDirectory:
+     # Firm directory over the cohort rows of load_mf_cohort_data(url)
+     return FirmDirectory(load_mf_cohort_data(url), load_firm_index(url))
@@ -0,0 +1,50 @@
+"""
+Dollar formatting shared by every page.
+
+Grids and tables keep AUM/NNA numeric and format them when they are displayed,
+through st.column_config or an AG-Grid value formatter, so they still sort as
+numbers. Metric cards, which need text, use format_dollar_amount.
+"""
+import streamlit as st
+from st_aggrid import GridOptionsBuilder, JsCode
+
+_GRID_DOLLAR_FORMATTER = JsCode("""
+function(params) {
+     if (params.value === null || params.value === undefined || params.value === '') { return ''; }
+     const amount = Math.abs(params.value).toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+     return (Math.round(params.value * 100) < 0 ? '-$' : '$') + amount;
+}
+""")
+
+
+def format_dollar_amount(amount) -> str:
+     # Single amounts for metric cards and headers, e.g. -$1,234.50
+     formatted_absolute_amount = '${:,.2f}'.format(abs(amount))
+     if round(amount, 2) < 0:
+          return f'-{formatted_absolute_amount}'
+     return formatted_absolute_amount
+
+
+def dollar_columns(df, columns=None) -> dict:
+     """
+     st.column_config entries that show numeric columns as dollars
+     Args:
+          df (pd.DataFrame): Frame about to be displayed
+          columns (list): Columns to format. Defaults to every numeric column
+     """
+     if columns is None:
+          columns = df.select_dtypes('number').columns
+     return {column: st.column_config.NumberColumn(format='dollar') for column in columns if column in df}
+
+
+def dollar_grid_options(df, columns=('AUM',), **grid_options) -> dict:
+     """
+     AG-Grid options that show the given columns as dollars while the grid sorts and filters them as numbers.
+     Pass the result as gridOptions together with allow_unsafe_jscode=True
+     """
+     gb = GridOptionsBuilder.from_dataframe(df)
+     for column in columns:
+          if column in df:
+               gb.configure_column(column, type=['numericColumn', 'numberColumnFilter'], valueFormatter=_GRID_DOLLAR_FORMATTER)
+     gb.configure_grid_options(**grid_options)
+     return gb.build()
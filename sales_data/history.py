@@ -0,0 +1,138 @@
+"""
+Append-only history store for the monthly sales sheets.
+
+The MF "Sales Data Merge" and ETF "Sales Data" sheets carry the full monthly
+history, but a new version normally only adds a month. The parsed history is
+kept as an Arrow file next to the snapshots, together with a checksum of each
+period's rows. When the workbook changes, its rows are streamed on a worker
+process (see workers.py): rows of stored periods are only hashed, and only the
+rows of new periods are sent back and turned into a frame. A stored period
+whose checksum changed was restated and is parsed again in a second pass. A
+store written without checksums is rebuilt from scratch.
+
+Checking for restatements means reading every stored row, so each new version
+is still unzipped and parsed by openpyxl from the first row to the last. That
+scan is most of the cost of a load, and it grows with the whole history, not
+with the new months. What the store saves is building and typing a frame for
+the unchanged periods.
+"""
+import hashlib
+import io
+
+import openpyxl
+import pandas as pd
+
+from sales_data.snapshot import (SNAPSHOT_DIR, fetch_source, read_snapshot, snapshot_metadata, snapshot_version, source_id,
+                                 write_snapshot)
+from sales_data.workers import run_parser
+
+
+def history_id(url, sheet_name, period_column, columns) -> str:
+     return source_id(url, {'history': period_column, 'sheet_name': sheet_name, 'columns': sorted(columns)})
+
+
+def _latest_store(store_id, version):
+     # Store written for an earlier version of the workbook, if any. write_snapshot keeps only the latest one
+     for path in SNAPSHOT_DIR.glob(f'{store_id}-*.arrow'):
+          if path.name != f'{store_id}-{version}.arrow':
+               return path
+     return None
+
+
+def _month(value):
+     # (year, month) of a period cell. Cheaper per row than building a Timestamp
+     if value is None:
+          return None
+     if not hasattr(value, 'month'):
+          value = pd.Timestamp(value)
+     return value.year, value.month
+
+
+def _months(periods) -> pd.Series:
+     return pd.Series(list(zip(periods.dt.year, periods.dt.month)), index=periods.index)
+
+
+def _period_label(period) -> str:
+     # JSON key of a (year, month) period. Rows without a period share the empty label
+     return '' if period is None else f'{period[0]:04d}-{period[1]:02d}'
+
+
+def _stream_rows(content, sheet_name, period_column, columns, settled):
+     """
+     Streams a sheet row by row
+     Args:
+          settled (set): Periods whose rows are only hashed, not kept
+     Returns:
+          tuple: (header of the kept columns, kept rows, checksum of the kept columns' values per period label)
+     """
+     workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+     try:
+          sheet = workbook[sheet_name]
+          rows = sheet.iter_rows(values_only=True)
+          header = list(next(rows))
+          wanted = set(columns)
+          positions = [i for i, column in enumerate(header) if column in wanted]
+          period_position = header.index(period_column)
+          kept, hashes = [], {}
+          for row in rows:
+               if not any(value is not None for value in row):
+                    continue
+               values = [row[i] for i in positions]
+               period = _month(row[period_position])
+               label = _period_label(period)
+               if label not in hashes:
+                    hashes[label] = hashlib.blake2b(digest_size=16)
+               hashes[label].update(repr(values).encode())
+               if period not in settled:
+                    kept.append(values)
+          return [header[i] for i in positions], kept, {label: digest.hexdigest() for label, digest in hashes.items()}
+     finally:
+          workbook.close()
+
+
+def _rows_frame(header, rows) -> pd.DataFrame:
+     df = pd.DataFrame(rows, columns=header).infer_objects()
+     # Blank strings read as missing, like pd.read_excel
+     return df.replace('', pd.NA) if len(df) else df
+
+
+def read_history(url, sheet_name, period_column, columns, version=None) -> pd.DataFrame:
+     """
+     The full history of a monthly sheet. Every row is scanned, but only the periods that are new or restated since
+     the last version are built into a frame
+     Args:
+          url (str): Workbook URL or path
+          sheet_name (str): Sheet holding the history
+          period_column (str): Month column, e.g. 'Month/Year (Asset Date)' or 'Date'
+          columns (list): Columns to keep
+          version (str): Version of the workbook from versions.py, see read_excel_snapshot
+     Returns:
+          pd.DataFrame: Every row of the sheet, the unchanged stored periods first
+     """
+     version, content = snapshot_version(url, version)
+     store_id = history_id(url, sheet_name, period_column, columns)
+     path = SNAPSHOT_DIR / f'{store_id}-{version}.arrow'
+     if path.exists():
+          return read_snapshot(path)
+     if content is None:
+          content = fetch_source(url)
+
+     previous_path = _latest_store(store_id, version)
+     stored_checksums = snapshot_metadata(previous_path).get('checksums') if previous_path is not None else None
+     if stored_checksums:
+          previous = read_snapshot(previous_path)
+          stored_months = _months(previous[period_column].dropna())
+          settled = {period for period in set(stored_months) if _period_label(period) in stored_checksums}
+          header, rows, checksums = run_parser(_stream_rows, content, sheet_name, period_column, columns, settled)
+          # Stored periods with the same rows keep their stored frame. Restated ones are parsed again, removed ones dropped
+          unchanged = {period for period in settled if checksums.get(_period_label(period)) == stored_checksums[_period_label(period)]}
+          if any(_period_label(period) in checksums for period in settled - unchanged):
+               header, rows, _ = run_parser(_stream_rows, content, sheet_name, period_column, columns, unchanged)
+          kept_previous = previous.loc[stored_months.index[stored_months.isin(unchanged)]]
+          df = pd.concat([kept_previous, _rows_frame(header, rows)], ignore_index=True)
+     else:
+          header, rows, checksums = run_parser(_stream_rows, content, sheet_name, period_column, columns, set())
+          df = _rows_frame(header, rows)
+     df[period_column] = pd.to_datetime(df[period_column], errors='coerce')
+     write_snapshot(df, path, metadata={'checksums': checksums})
+     return df
@@ -0,0 +1,78 @@
+"""
+Quarter-over-quarter 13F holdings changes.
+
+Quarterly WhaleWisdom exports of one filer are stacked, restricted to the
+ticker master with a single keyed merge, and pivoted to a ticker x quarter
+matrix of market values, with 0 where a ticker is not held. Two quarters are
+then compared column against column: new positions, exits, increases and
+decreases all come from array comparisons over the matrix, never a loop over
+holdings.
+"""
+import numpy as np
+import pandas as pd
+
+# Change types, in display order
+CHANGES = ['New', 'Exit', 'Increase', 'Decrease', 'Unchanged']
+
+
+def holdings_by_quarter(df_tickers, exports, quarters) -> pd.DataFrame:
+     """
+     Market value of every ticker master holding in each quarter
+     Args:
+          df_tickers (pd.DataFrame): Ticker master with 'Ticker' and 'Type' columns (Type may also come from the exports)
+          exports (list): Parsed WhaleWisdom exports with 'Symbol' and 'Market Value' columns, one per quarter
+          quarters (list): Label of each export, oldest first
+     Returns:
+          pd.DataFrame: Type and one integer market value column per quarter, indexed by Ticker
+     """
+     df_exports = pd.concat([df.assign(Quarter=quarter) for df, quarter in zip(exports, quarters)], ignore_index=True)
+     df_exports['Quarter'] = pd.Categorical(df_exports['Quarter'], categories=quarters)
+     df_merged = pd.merge(df_tickers, df_exports, left_on='Ticker', right_on='Symbol', how='inner').dropna(subset=['Ticker'])
+     df_merged['Market Value'] = df_merged['Market Value'].fillna(0).astype(int)
+
+     values = df_merged.pivot_table(index='Ticker', columns='Quarter', values='Market Value', aggfunc='sum', fill_value=0, observed=False)
+     values = values.reindex(columns=quarters, fill_value=0).astype(int)
+     values.columns = pd.Index(quarters)
+     types = df_merged.drop_duplicates('Ticker').set_index('Ticker')['Type']
+     return values.assign(Type=types).loc[:, ['Type', *quarters]]
+
+
+def holdings_changes(df_values, before, after) -> pd.DataFrame:
+     """
+     Change in each holding between two quarters
+     Args:
+          df_values (pd.DataFrame): Output of holdings_by_quarter
+          before (str): Earlier quarter
+          after (str): Later quarter
+     Returns:
+          pd.DataFrame: Ticker, Type, Change type, both market values and the change, for tickers held in either
+          quarter. Grouped by change type in CHANGES order, largest change first
+     """
+     value_before = df_values[before].to_numpy()
+     value_after = df_values[after].to_numpy()
+     change = value_after - value_before
+     held_before = value_before != 0
+     held_after = value_after != 0
+     kind = np.select([~held_before & held_after, held_before & ~held_after, change > 0, change < 0],
+                      CHANGES[:4], CHANGES[4])
+
+     df_changes = pd.DataFrame({'Ticker': df_values.index, 'Type': df_values['Type'].to_numpy(),
+                                'Change Type': pd.Categorical(kind, categories=CHANGES),
+                                before: value_before, after: value_after, 'Change': change})
+     df_changes = df_changes[held_before | held_after]
+     order = np.lexsort((-np.abs(df_changes['Change'].to_numpy()), df_changes['Change Type'].cat.codes.to_numpy()))
+     return df_changes.iloc[order].reset_index(drop=True)
+
+
+def changes_text(df_changes, before, after) -> str:
+     """
+     Text summary of holdings_changes: one section per change type, one line per holding
+     """
+     sign = np.where(df_changes['Change'] < 0, '-$', '+$')
+     lines = (df_changes['Ticker'] + ' ' + df_changes['Type'].fillna('') + ' $' + df_changes[before].map('{:,}'.format)
+              + ' -> $' + df_changes[after].map('{:,}'.format) + ' (' + sign + df_changes['Change'].abs().map('{:,}'.format) + ')')
+     sections = []
+     for kind, kind_lines in lines.groupby(df_changes['Change Type'], observed=True, sort=True):
+          if kind != 'Unchanged':
+               sections.append(f'{kind} ({len(kind_lines)})\n' + '\n'.join(kind_lines))
+     return '\n\n'.join(sections)
@@ -0,0 +1,84 @@
+"""
+Canonical loaders, one per secret URL.
+
+Every page imports these loaders instead of defining its own copy, so each
+source is read once per version (see versions.py) with the same options and
+only the columns declared in columns.py, converted to its registered column
+types (see schema.py) and shared read-only by every session (see shared.py).
+The MF and ETF sales histories come from the history store, which reuses the
+stored frame for the months whose rows did not change since the previous
+version of the workbook (the sheet itself is still scanned in full), and every
+sales history is sorted by month so pages can slice it with a MonthIndex.
+"""
+import pandas as pd
+
+from sales_data.columns import source_columns
+from sales_data.history import read_history
+from sales_data.periods import sort_by_period
+from sales_data.schema import apply_schema
+from sales_data.shared import shared_cache
+from sales_data.snapshot import read_csv_snapshot, read_excel_snapshot
+from sales_data.versions import versioned
+from sales_data.wholesalers import resolve_wholesalers
+
+
+
+@versioned('url')
+@shared_cache
+def load_mf_sales_data(url: str, version: str = None) -> pd.DataFrame:
+     # st.secrets['mf_sales_url']: Broadridge monthly MF sales history
+     df_mf_master = apply_schema(read_history(url, 'Sales Data Merge', 'Month/Year (Asset Date)', source_columns('mf_sales'), version), 'mf_sales')
+     df_mf_master = sort_by_period(df_mf_master, 'Month/Year (Asset Date)')
+     return resolve_wholesalers(df_mf_master, 'Vest Wholesaler')
+
+
+@versioned('url')
+@shared_cache
+def load_mf_cohort_data(url: str, version: str = None) -> pd.DataFrame:
+     # st.secrets['mf_analyzer_url']: Broadridge cohort workbook used by the dashboard, Cohort Analyzer and Industry AUM Lookup
+     df_mf_master = apply_schema(read_excel_snapshot(url, version=version, columns=source_columns('mf_cohort'), skiprows=0, dtype={'Postal Code': str}), 'mf_cohort')
+     return resolve_wholesalers(df_mf_master, 'Vest')
+
+
+@versioned('url')
+@shared_cache
+def load_etf_sales_data(url: str, version: str = None) -> pd.DataFrame:
+     # st.secrets['etf_sales_url']: FT ETF monthly sales history
+     df_etf_master = apply_schema(read_history(url, 'Sales Data', 'Date', source_columns('etf_sales'), version), 'etf_sales')
+     df_etf_master = sort_by_period(df_etf_master, 'Date')
+     return resolve_wholesalers(df_etf_master, 'Vest Wholesaler')
+
+
+@versioned('url')
+@shared_cache
+def load_etf_analyzer_data(url: str, version: str = None) -> pd.DataFrame:
+     # st.secrets['etf_analyzer_url']: FT ETF sales by account, used on the Tools page
+     return sort_by_period(apply_schema(read_excel_snapshot(url, version=version, columns=source_columns('etf_analyzer'), skiprows=0), 'etf_sales'), 'Date')
+
+
+@versioned('url')
+@shared_cache
+def load_uit_data(url: str, version: str = None) -> pd.DataFrame:
+     # st.secrets['uit_sales_url']: FT UIT sales by account
+     return sort_by_period(apply_schema(read_excel_snapshot(url, version=version, columns=source_columns('uit_sales'), skiprows=0, dtype={'Zip': str}), 'uit_sales'), 'Date')
+
+
+@versioned('url')
+@shared_cache
+def load_vest_wholesaler_data(url: str, version: str = None) -> pd.DataFrame:
+     # st.secrets['vest_wholesaler_url']: Cboe Vest wholesaler territories by state
+     return read_excel_snapshot(url, version=version, skiprows=0)
+
+
+@versioned('url')
+@shared_cache
+def load_ft_wholesaler_data(url: str, version: str = None) -> pd.DataFrame:
+     # st.secrets['ft_wholesaler_url']: FT outsider territories by ZIP code
+     return read_excel_snapshot(url, version=version, skiprows=0, dtype={'Zip': str})
+
+
+@versioned('url')
+@shared_cache
+def load_territory_data(url: str, version: str = None) -> pd.DataFrame:
+     # st.secrets['master_territory_url']: Master ZIP code territory list, joined onto the cohort by postal code
+     return read_csv_snapshot(url, version=version, dtype={'Zip': str})
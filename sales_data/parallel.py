@@ -0,0 +1,83 @@
+"""
+Concurrent loading of independent data sources.
+
+Every source is loaded at the same time on a thread pool. The threads overlap
+the downloads, and hand the openpyxl parsing, which holds the GIL, to the
+worker processes (see workers.py). With a CPU per source, a cold start costs
+the slowest single load instead of the sum of all of them. Pages ask for each
+source with get() right before they need it, which lets everything that is
+already loaded render while the slower workbooks are still coming in.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+
+class SourceLoader:
+     """
+     Starts loading every source immediately and reports progress per source
+     Args:
+          sources (dict): Display name -> zero-argument callable returning a DataFrame
+          label (str): Label of the status box shown while sources are loading
+     """
+
+     def __init__(self, sources, label='Loading All Sales Data'):
+          self._label = label
+          self._elapsed = {}
+          self._reported = set()
+
+          # Worker threads need the script context so st.cache_data and st.secrets work inside the loaders
+          ctx = get_script_run_ctx()
+          executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='source-loader',
+                                        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx))
+          self._futures = {name: executor.submit(self._timed, name, load) for name, load in sources.items()}
+          executor.shutdown(wait=False)
+
+          # One progress line per source inside a collapsible status box
+          self._status = st.status(f'{label}...', expanded=False)
+          self._lines = {}
+          with self._status:
+               for name in sources:
+                    self._lines[name] = st.empty()
+                    self._lines[name].write(f'⏳ {name}')
+
+     def _timed(self, name, load):
+          started = time.perf_counter()
+          try:
+               return load()
+          finally:
+               self._elapsed[name] = time.perf_counter() - started
+
+     def _refresh(self):
+          # Update the progress line of every source that finished since the last refresh
+          for name, future in self._futures.items():
+               if name in self._reported or not future.done():
+                    continue
+               self._reported.add(name)
+               if future.exception() is not None:
+                    self._lines[name].write(f'❌ {name} failed: {future.exception()}')
+                    self._status.update(label=f'{self._label} failed', state='error', expanded=True)
+               else:
+                    self._lines[name].write(f'✅ {name} ({self._elapsed.get(name, 0):.1f}s)')
+
+          if len(self._reported) == len(self._futures) and all(f.exception() is None for f in self._futures.values()):
+               self._status.update(label=f'{self._label} complete', state='complete')
+
+     def get(self, name):
+          """
+          Waits for a single source and returns it. Other sources keep loading in the background
+          """
+          future = self._futures[name]
+          pending = {f for f in self._futures.values() if not f.done()}
+          while not future.done():
+               # Keep the progress lines moving while we wait on this source
+               _, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+               self._refresh()
+          self._refresh()
+          return future.result()
+
+     def get_all(self):
+          return {name: self.get(name) for name in self._futures}
@@ -0,0 +1,60 @@
+"""
+Month index over the sales histories.
+
+The loaders sort every history by its period column once. A month is then a
+contiguous block of rows, found with two binary searches and returned as an
+iloc slice, which is a view instead of a boolean-mask copy of the whole frame.
+"""
+import numpy as np
+import pandas as pd
+
+
+def sort_by_period(df, column) -> pd.DataFrame:
+     # Stable sort so rows keep their workbook order within each month
+     if column not in df:
+          return df
+     return df.sort_values(column, kind='stable', ignore_index=True)
+
+
+def parse_month(date_select, format='%m-%Y') -> pd.Timestamp:
+     # Date pickers on the pages show months as MM-YYYY
+     return pd.to_datetime(date_select, format=format)
+
+
+class MonthIndex:
+     """
+     Month -> row range lookups over a frame sorted with sort_by_period
+     Args:
+          periods (pd.Series): The sorted period column
+     """
+
+     def __init__(self, periods):
+          self._periods = periods.to_numpy()
+
+     def _key(self, month):
+          return pd.Timestamp(month).to_datetime64().astype(self._periods.dtype)
+
+     def rows(self, month) -> slice:
+          # Two binary searches, O(log n)
+          key = self._key(month)
+          return slice(int(np.searchsorted(self._periods, key, side='left')), int(np.searchsorted(self._periods, key, side='right')))
+
+     def select(self, df, month) -> pd.DataFrame:
+          # Rows of a single month as a zero-copy slice
+          return df.iloc[self.rows(month)]
+
+     def select_previous(self, df, month) -> pd.DataFrame:
+          return self.select(df, pd.Timestamp(month) - pd.DateOffset(months=1))
+
+     @property
+     def months(self) -> list:
+          """
+          Distinct months in order, found by jumping from one block to the next (O(k log n) for k months)
+          """
+          months = []
+          start = 0
+          while start < len(self._periods) and not np.isnat(self._periods[start]):
+               month = self._periods[start]
+               months.append(pd.Timestamp(month))
+               start = int(np.searchsorted(self._periods, month, side='right'))
+          return months
@@ -0,0 +1,93 @@
+"""
+Top-k client rankings over the cohort data.
+
+The cohort rows are split by wholesaler (or by category) once per data version,
+and the top clients by AUM and the largest inflows/outflows by NNA are picked
+with partial selection instead of fully sorting every group on each rerun.
+Deeper drilldowns past the precomputed depth select again from the group's own
+rows only.
+"""
+import numpy as np
+import pandas as pd
+
+from sales_data.loaders import load_mf_cohort_data
+from sales_data.shared import shared_cache
+from sales_data.versions import versioned
+from sales_data.wholesalers import partition_rows
+
+# Rows kept per group and order. Covers the Top 20 Clients grid on the dashboard
+RANKING_DEPTH = 20
+
+
+def top_positions(values, rows, k, largest=True) -> np.ndarray:
+     """
+     Row positions of the k largest (or smallest) values among `rows`, in ranked order
+     Args:
+          values (pd.Series): Measure column of the whole frame
+          rows (np.ndarray): Row positions of one group
+          k (int): Number of rows to keep
+          largest (bool): True for the largest values first, False for the smallest
+     Returns:
+          np.ndarray: Up to k row positions. Missing values rank last like sort_values
+     """
+     group_values = pd.Series(values.to_numpy(dtype=float, na_value=np.nan)[rows], index=rows)
+     present = group_values.dropna()
+     picked = present.nlargest(k) if largest else present.nsmallest(k)
+     positions = picked.index.to_numpy(dtype=np.intp)
+     if len(positions) < k:
+          missing = rows[group_values.isna().to_numpy()]
+          positions = np.concatenate([positions, missing[:k - len(positions)]]).astype(np.intp)
+     return positions
+
+
+class ClientRankings:
+     """
+     Precomputed top-k row positions per group of a cohort frame
+     Args:
+          df (pd.DataFrame): Cohort rows
+          column (str): Column to group by, e.g. 'Vest' or 'Client Defined Category Name'
+          measures (tuple): Columns to rank by
+          depth (int): Rows precomputed per group, measure and order
+     """
+
+     def __init__(self, df, column, measures=('AUM', 'NNA'), depth=RANKING_DEPTH):
+          self.column = column
+          self._groups = partition_rows(df[column])
+          self._ranked = {}
+          for measure in measures:
+               for name, rows in self._groups.items():
+                    for largest in (True, False):
+                         self._ranked[name, measure, largest] = top_positions(df[measure], rows, depth, largest)
+
+     def top(self, df, name, measure, k, largest=True) -> pd.DataFrame:
+          """
+          Top k rows of one group
+          Args:
+               df (pd.DataFrame): The cohort frame the rankings were built from
+               name: Group name, None for rows without one
+               measure (str): Column to rank by
+               k (int): Number of rows
+               largest (bool): True for the largest values first, False for the smallest
+          """
+          rows = self._groups.get(name, np.array([], dtype=np.intp))
+          ranked = self._ranked.get((name, measure, largest), rows[:0])
+          if k > len(ranked) and len(ranked) < len(rows):
+               # Past the precomputed depth, select again from this group only
+               ranked = top_positions(df[measure], rows, k, largest)
+          return df.take(ranked[:k])
+
+     def top_of(self, df, names, measure, k, largest=True) -> pd.DataFrame:
+          """
+          Top k rows over several groups, e.g. every spelling of one wholesaler. Same arguments as top
+          """
+          if len(names) == 1:
+               return self.top(df, names[0], measure, k, largest)
+          # The top k of the union are among the top k of each group
+          tops = pd.concat([self.top(df, name, measure, k, largest) for name in names])
+          return tops.sort_values(measure, ascending=not largest, kind='stable', na_position='last').head(k)
+
+
+@versioned('url')
+@shared_cache
+def load_cohort_rankings(url: str, column: str = 'Vest', version: str = None) -> ClientRankings:
+     return ClientRankings(load_mf_cohort_data(url), column)
@@ -0,0 +1,83 @@
+"""
+Column types for every loaded source.
+
+Excel hands back the repeated labels (categories, outsiders, channels, tickers,
+states) as Python strings and integers as int64. The loaders run each frame
+through its schema once per data version: labels become categoricals, whole
+numbers are downcast and period columns are parsed as dates. Dollar amounts stay
+float64 so cent-level totals do not change. Memory before and after is logged per frame.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OUTSIDERS = ['IS Outsider', 'ETF/SMA Outsider', 'SP Outsider', 'ETF Outsider', 'COM Outsider']
+
+# Source name -> columns to parse as dates and columns to store as categoricals. Columns a source does not have are skipped
+SCHEMAS = {
+     'mf_sales': {
+          'dates': ['Month/Year (Asset Date)'],
+          'categories': ['Client Defined Category Name', 'Channel', 'State/Region'],
+     },
+     'mf_cohort': {
+          'dates': ['Month/Year (Asset Date)'],
+          'categories': ['Client Defined Category Name', *OUTSIDERS, 'Channel', 'State/Region', 'City'],
+     },
+     'etf_sales': {
+          'dates': ['Date'],
+          'categories': ['Ticker', *OUTSIDERS, 'Wholesaler', 'Channel', 'State'],
+     },
+     'uit_sales': {
+          'dates': ['Date'],
+          'categories': ['Ticker', *OUTSIDERS, 'Wholesaler', 'Channel', 'State'],
+     },
+}
+
+
+def frame_memory(df) -> int:
+     # Bytes held by a frame, including the Python strings in object columns
+     return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def apply_schema(df, name) -> pd.DataFrame:
+     """
+     Converts a freshly loaded frame to the types registered for its source
+     Args:
+          df (pd.DataFrame): Frame as read from the workbook
+          name (str): Key in SCHEMAS
+     Returns:
+          pd.DataFrame: The same frame with dates parsed, labels categorical and integers downcast
+     """
+     schema = SCHEMAS[name]
+     before = frame_memory(df)
+     for column in schema['dates']:
+          if column in df and not pd.api.types.is_datetime64_any_dtype(df[column]):
+               df[column] = pd.to_datetime(df[column], errors='coerce')
+     for column in schema['categories']:
+          if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+               df[column] = df[column].astype('category')
+     for column in df.select_dtypes('integer').columns:
+          df[column] = pd.to_numeric(df[column], downcast='integer')
+     logger.info("%s: %.1f MB -> %.1f MB", name, before / 2**20, frame_memory(df) / 2**20)
+     return df
+
+
+def replace_categories(column, mapping) -> pd.Series:
+     """
+     Renames values through a mapping. On a categorical only the categories are renamed and
+     the codes are remapped, so the rows are never touched as strings
+     Args:
+          column (pd.Series): Categorical or plain column
+          mapping (dict): Old value -> new value. Values not in the mapping are kept
+     """
+     if not isinstance(column.dtype, pd.CategoricalDtype):
+          return column.replace(mapping)
+     renamed = column.cat.categories.to_series().replace(mapping)
+     categories = pd.Index(renamed.unique())
+     # Several old categories may map to the same new one
+     recode = np.append(categories.get_indexer(renamed), -1)
+     codes = recode[column.cat.codes.to_numpy()]
+     return pd.Series(pd.Categorical.from_codes(codes, categories), index=column.index, name=column.name)
@@ -0,0 +1,47 @@
+"""
+Loader results shared read-only by every session.
+
+st.cache_data pickles what a loader returns and hands every caller its own
+unpickled copy, so each rerun of each session paid for a full copy of the sales
+frames. Loaders decorated with shared_cache keep a single object per source
+version in st.cache_resource and every session reads that same object.
+
+The contract is that callers never mutate a shared result: derive new frames
+with assign, fillna, merge, etc. instead of inplace=True or df[column] = ....
+As a guard, a shared frame is handed out as a shallow view. Copy-on-write is
+always on from pandas 3 (hence pandas>=3 in requirements.txt), so the view
+costs microseconds and shares the columns, and a caller that does write to it
+gets its own copy of the written columns instead of changing what every other
+session sees.
+"""
+import functools
+
+import pandas as pd
+import streamlit as st
+
+from sales_data.versions import CACHE_ENTRIES
+
+
+def _view(value):
+     # Shallow, copy-on-write view of a shared frame. Other results (cubes, rankings) are returned as they are
+     if isinstance(value, pd.DataFrame):
+          return value.copy(deep=False)
+     return value
+
+
+def shared_cache(loader):
+     """
+     Caches a loader's result once per set of arguments for every session, like st.cache_resource
+     Args:
+          loader (callable): Loader whose results callers only read
+     Returns:
+          callable: The cached loader, with a .clear() like the st.cache_data one it replaces
+     """
+     cached = st.cache_resource(max_entries=CACHE_ENTRIES, show_spinner=False)(loader)
+
+     @functools.wraps(loader)
+     def load(*args, **kwargs):
+          return _view(cached(*args, **kwargs))
+
+     load.clear = cached.clear
+     return load
@@ -0,0 +1,175 @@
+"""
+Local columnar snapshots of the Excel/CSV sources.
+
+Parsing the workbooks with openpyxl is what makes a cold load take tens of
+seconds. Each source is parsed once per version and written to an uncompressed
+Arrow (Feather v2) file under SNAPSHOT_DIR by a worker process (see workers.py).
+Every load memory-maps that file instead of touching openpyxl again. When the caller names the columns it
+needs, only those are parsed and kept in the snapshot.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from sales_data.workers import run_parser
+
+logger = logging.getLogger(__name__)
+
+# Where the snapshots live. Override with SALES_SNAPSHOT_DIR on hosts where the repo is read-only
+SNAPSHOT_DIR = Path(os.environ.get('SALES_SNAPSHOT_DIR', Path(__file__).resolve().parents[1] / '.snapshots'))
+# Schema metadata key of the values passed to write_snapshot(metadata=...)
+_METADATA_KEY = b'sales_data'
+# Version of a source that could not be checked yet (see versions.py)
+UNCHECKED = 'unchecked'
+
+
+def fetch_source(url) -> bytes:
+     # Read the raw bytes of a source. URLs go over HTTP, anything else is treated as a local path
+     if str(url).startswith(('http://', 'https://')):
+          with urllib.request.urlopen(url) as response:
+               return response.read()
+     return Path(url).read_bytes()
+
+
+def source_id(url, reader_kwargs) -> str:
+     # Identify a source by its location and the options it is parsed with, so two
+     # different readings of the same workbook never share a snapshot
+     key = json.dumps({'url': str(url), 'reader': reader_kwargs}, sort_keys=True, default=str)
+     return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def content_version(content: bytes) -> str:
+     return hashlib.sha256(content).hexdigest()[:16]
+
+
+def snapshot_version(url, version=None) -> tuple:
+     """
+     Version a snapshot of a source is stored under
+     Args:
+          url (str): Source URL or path
+          version (str): Version probed by versions.py (ETag, Last-Modified or file stat). None or UNCHECKED when the
+               probe could not tell
+     Returns:
+          tuple: (snapshot version, source bytes). The source is only fetched, and hashed, when there is no probed version
+     """
+     if version is None or version == UNCHECKED:
+          content = fetch_source(url)
+          return content_version(content), content
+     # Probed versions can hold characters that do not belong in a file name
+     return content_version(f'probed:{version}'.encode()), None
+
+
+def snapshot_path(url, version, reader_kwargs) -> Path:
+     return SNAPSHOT_DIR / f'{source_id(url, reader_kwargs)}-{version}.arrow'
+
+
+def read_snapshot(path, columns=None) -> pd.DataFrame:
+     """
+     Memory-maps an Arrow snapshot. Numeric and date columns without missing values are zero-copy views of the
+     mapped file, so only the pages that are actually used get read from disk. Strings, categoricals and columns
+     with missing values are converted one column at a time
+     Returns:
+          pd.DataFrame: Frame whose mapped columns are read-only. Writing to a view of it (see shared.py) copies the
+          column, writing to the frame itself in place raises
+     """
+     table = feather.read_table(path, columns=columns, memory_map=True)
+     # One block per column keeps the views instead of consolidating them into new 2-D arrays, and each
+     # column's Arrow buffers are released as soon as it is converted
+     return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def snapshot_metadata(path) -> dict:
+     # JSON metadata stored with a snapshot by write_snapshot, read from the file footer only
+     with pa.memory_map(str(path)) as source:
+          metadata = pa.ipc.open_file(source).schema.metadata or {}
+     return json.loads(metadata.get(_METADATA_KEY, b'{}'))
+
+
+def write_snapshot(df, path, metadata=None):
+     """
+     Writes a frame to an Arrow snapshot and removes older versions of the same source.
+     Frames pyarrow cannot represent (e.g. object columns mixing ints and strings) are
+     not snapshotted; the caller keeps using the parsed frame.
+     Args:
+          metadata (dict): JSON-serializable values kept in the file, see snapshot_metadata
+     """
+     path = Path(path)
+     path.parent.mkdir(parents=True, exist_ok=True)
+     tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+     try:
+          table = pa.Table.from_pandas(df)
+          if metadata is not None:
+               table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(metadata)})
+          feather.write_feather(table, tmp_path, compression='uncompressed')
+     except (pa.ArrowException, TypeError, ValueError, OSError) as e:
+          logger.warning("Could not snapshot %s: %s", path.name, e)
+          tmp_path.unlink(missing_ok=True)
+          return
+     os.replace(tmp_path, path)
+
+     # Only the latest version of each source is kept on disk
+     source_prefix = path.name.rsplit('-', 1)[0]
+     for old_path in path.parent.glob(f'{source_prefix}-*.arrow'):
+          if old_path != path:
+               old_path.unlink(missing_ok=True)
+
+
+def _load_snapshot(url, parse, reader_kwargs, columns=None, version=None) -> pd.DataFrame:
+     key, content = snapshot_version(url, version)
+     # The column list is part of the key, so a wider projection never reads a narrower snapshot
+     key_kwargs = reader_kwargs if columns is None else {**reader_kwargs, 'columns': sorted(columns)}
+     path = snapshot_path(url, key, key_kwargs)
+     if path.exists():
+          return read_snapshot(path)
+
+     # First load of this version: download the source, and parse it and keep a columnar copy on a worker process
+     if content is None:
+          content = fetch_source(url)
+     df = run_parser(_parse_source, content, parse, reader_kwargs, columns, path)
+     return read_snapshot(path) if df is None else df
+
+
+def _parse_source(content, parse, reader_kwargs, columns, path):
+     # Runs on a worker process. The parsed frame is only sent back when it could not be snapshotted
+     if columns is not None:
+          wanted = set(columns)
+          # Columns a source does not have are skipped rather than raising like a usecols list would
+          reader_kwargs = {**reader_kwargs, 'usecols': lambda column: column in wanted}
+     df = parse(io.BytesIO(content), **reader_kwargs)
+     write_snapshot(df, path)
+     return None if path.exists() else df
+
+
+def _read_excel(buffer, **reader_kwargs) -> pd.DataFrame:
+     return pd.read_excel(buffer, engine='openpyxl', **reader_kwargs)
+
+
+def read_excel_snapshot(url, columns=None, version=None, **reader_kwargs) -> pd.DataFrame:
+     """
+     Drop-in replacement for pd.read_excel(url, engine='openpyxl', ...) backed by a snapshot
+     Args:
+          url (str): Source workbook URL or path
+          columns (list): Only parse and keep these columns. Defaults to every column
+          version (str): Version of the source from versions.py. A stored snapshot of it is read without downloading
+               the source. Defaults to hashing the downloaded content
+          **reader_kwargs: Options passed to pd.read_excel (sheet_name, skiprows, dtype, usecols...)
+     Returns:
+          pd.DataFrame: The parsed workbook
+     """
+     return _load_snapshot(url, _read_excel, reader_kwargs, columns, version)
+
+
+def read_csv_snapshot(url, columns=None, version=None, **reader_kwargs) -> pd.DataFrame:
+     """
+     Drop-in replacement for pd.read_csv(url, ...) backed by a snapshot
+     """
+     return _load_snapshot(url, pd.read_csv, reader_kwargs, columns, version)
@@ -0,0 +1,107 @@
+"""
+ZIP code territory resolver.
+
+The Tools page merged the FT territory list with the Vest list on State and
+then merged the UIT rows on the ZIP string, on every rerun. ZIPs written as
+ZIP+4 or without their leading zero did not match at all. ZipTerritories turns
+every ZIP into a 5-digit integer key and stores each territory column as a
+100,000-entry array of category codes, built once per version of the lists.
+Assigning territories to any frame is then one array gather per column. The
+same resolver maps the cohort's postal codes through the master territory list.
+"""
+import numpy as np
+import pandas as pd
+
+from sales_data.loaders import load_ft_wholesaler_data, load_territory_data, load_uit_data, load_vest_wholesaler_data
+from sales_data.shared import shared_cache
+from sales_data.versions import versioned
+
+# Number of 5-digit ZIP codes, the size of every lookup array
+ZIP_KEYS = 100_000
+# Territory columns resolved for every ZIP: FT outsiders by ZIP, and the Vest wholesaler of the ZIP's state
+TERRITORY_COLUMNS = ['SP Outsider', 'ETF Outsider', 'COM Outsider', 'Wholesaler']
+
+
+def zip_keys(zips) -> np.ndarray:
+     """
+     5-digit integer key of each ZIP code
+     Args:
+          zips (pd.Series): ZIP codes such as '02110', '2110', '02110-1234', '021101234' or 2110.0
+     Returns:
+          np.ndarray: Integer keys in [0, ZIP_KEYS), -1 for missing or malformed codes
+     """
+     # Each distinct spelling is normalized once, then spread back to the rows
+     codes, uniques = pd.factorize(pd.Series(zips), use_na_sentinel=True)
+     digits = pd.Series(uniques, dtype='string').str.strip().str.replace(r'\.0+$', '', regex=True)
+     # ZIP+4, with or without the hyphen, keeps its first five digits
+     digits = digits.str.replace(r'^(\d{5})-?\d{4}$', r'\1', regex=True)
+     keys = pd.to_numeric(digits.where(digits.str.fullmatch(r'\d{1,5}').fillna(False)), errors='coerce')
+     keys = keys.fillna(-1).to_numpy(dtype=np.int32)
+     return np.where(codes >= 0, keys[codes] if len(keys) else -1, -1).astype(np.int32)
+
+
+class ZipTerritories:
+     """
+     Territory columns per 5-digit ZIP, as dense lookup arrays
+     Args:
+          df (pd.DataFrame): Territory list with one row per ZIP. The first row wins for repeated ZIPs
+          columns (list): Territory columns to resolve
+          zip_column (str): ZIP column of the list
+     """
+     def __init__(self, df, columns, zip_column='Zip'):
+          keys = zip_keys(df[zip_column])
+          # Keep the first row of each valid ZIP
+          _, first = np.unique(np.where(keys >= 0, keys, ZIP_KEYS), return_index=True)
+          first = first[keys[first] >= 0]
+          self.categories = {}
+          self.codes = {}
+          for column in columns:
+               values = pd.Categorical(df[column].iloc[first])
+               table = np.full(ZIP_KEYS, -1, dtype=np.int32)
+               table[keys[first]] = values.codes
+               self.categories[column] = values.categories
+               self.codes[column] = table
+
+     def resolve(self, zips) -> dict:
+          """
+          Territory of each ZIP
+          Args:
+               zips (pd.Series): ZIP codes, in any format zip_keys accepts
+          Returns:
+               dict: Column -> pd.Categorical aligned with zips, missing for ZIPs outside every territory
+          """
+          keys = zip_keys(zips)
+          found = keys >= 0
+          resolved = {}
+          for column, table in self.codes.items():
+               codes = np.where(found, table[np.where(found, keys, 0)], -1)
+               resolved[column] = pd.Categorical.from_codes(codes, categories=self.categories[column])
+          return resolved
+
+     def assign(self, df, zip_column='Zip') -> pd.DataFrame:
+          # Copy of df with the territory columns of its ZIPs
+          return df.assign(**{column: pd.Series(values, index=df.index) for column, values in self.resolve(df[zip_column]).items()})
+
+
+@versioned('ft_wholesaler_url', 'vest_wholesaler_url')
+@shared_cache
+def load_zip_territories(ft_wholesaler_url: str, vest_wholesaler_url: str, version: str = None) -> ZipTerritories:
+     # The Vest wholesaler list is by state, so it is joined onto the FT list (one row per ZIP) once here
+     df_vest_wholesalers = load_vest_wholesaler_data(vest_wholesaler_url).drop_duplicates('State')
+     df_territories = load_ft_wholesaler_data(ft_wholesaler_url).merge(df_vest_wholesalers, on='State', how='left')
+     return ZipTerritories(df_territories, TERRITORY_COLUMNS)
+
+
+@versioned('url')
+@shared_cache
+def load_master_territories(url: str, version: str = None) -> ZipTerritories:
+     # Every column of the master territory list, by ZIP
+     df_territories = load_territory_data(url)
+     return ZipTerritories(df_territories, [column for column in df_territories.columns if column != 'Zip'])
+
+
+@versioned('url', 'ft_wholesaler_url', 'vest_wholesaler_url')
+@shared_cache
+def load_uit_territory_data(url: str, ft_wholesaler_url: str, vest_wholesaler_url: str, version: str = None) -> pd.DataFrame:
+     # UIT rows with the FT outsiders and Vest wholesaler of their ZIP
+     return load_zip_territories(ft_wholesaler_url, vest_wholesaler_url).assign(load_uit_data(url))
@@ -0,0 +1,175 @@
+"""
+Parsed uploads shared by every session.
+
+The 13F Summary page parsed each uploaded workbook with pd.read_excel on every
+click, and the Master ETF ticker file lived in one session's state, so every
+user re-uploaded and re-parsed it. Uploads are now keyed by the SHA-256 of
+their bytes plus the reader options. The parsed frame is kept in a process-wide
+cache bounded by UPLOAD_CACHE_BYTES. The least recently used frames are dropped
+first, so the same export uploaded again, by anyone, is never parsed twice.
+
+A file shared under a name, e.g. the Master ETF ticker file, is kept with who
+uploaded it and when. Its frame is pinned outside that cache, so big uploads
+never evict it, and a copy is kept under SNAPSHOT_DIR so it survives a restart
+until it is cleared or replaced.
+
+A batch of uploads is parsed by read_uploads on the worker processes (see
+workers.py), so openpyxl parses the workbooks side by side instead of one after
+the other.
+"""
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from sales_data import snapshot
+from sales_data.schema import frame_memory
+from sales_data.snapshot import read_snapshot, snapshot_metadata, write_snapshot
+from sales_data.workers import map_parser
+
+# Memory the parsed uploads may hold together
+UPLOAD_CACHE_BYTES = 256 * 2**20
+
+_lock = threading.Lock()
+# (content hash, reader options) -> (frame, bytes held), least recently used first
+_parsed = OrderedDict()
+_held = 0
+# Name -> details of the latest upload shared under it: cache key, file name, uploader and time
+_shared = {}
+# Name -> frame of the upload shared under it, held outside the cache so other uploads never evict it
+_pinned = {}
+
+
+def upload_key(content: bytes, reader_kwargs) -> tuple:
+     return hashlib.sha256(content).hexdigest(), json.dumps(reader_kwargs, sort_keys=True, default=str)
+
+
+def _parse(content, reader_kwargs) -> pd.DataFrame:
+     return pd.read_excel(io.BytesIO(content), **reader_kwargs)
+
+
+def _get(key):
+     with _lock:
+          if key not in _parsed:
+               return None
+          _parsed.move_to_end(key)
+          return _parsed[key][0]
+
+
+def _put(key, df):
+     global _held
+     size = frame_memory(df)
+     with _lock:
+          if key in _parsed:
+               return
+          _parsed[key] = (df, size)
+          _held += size
+          # Evict the least recently used frames, but always keep the one just parsed
+          while _held > UPLOAD_CACHE_BYTES and len(_parsed) > 1:
+               _, (_, evicted) = _parsed.popitem(last=False)
+               _held -= evicted
+
+
+def _shared_path(name):
+     # Resolved on every call, so a SNAPSHOT_DIR set after import (e.g. by tests) is honoured
+     return snapshot.SNAPSHOT_DIR / 'uploads' / f'{hashlib.sha1(name.encode()).hexdigest()[:16]}.arrow'
+
+
+def read_upload(upload, share_as=None, shared_by=None, **reader_kwargs) -> pd.DataFrame:
+     """
+     Parses an uploaded Excel file, or returns the frame parsed from the same bytes before
+     Args:
+          upload (UploadedFile): File from st.file_uploader
+          share_as (str): Share this upload as the latest one under this name, see latest_upload
+          shared_by (str): Who is sharing it, shown with the shared file
+          reader_kwargs: Options for pd.read_excel, part of the cache key
+     Returns:
+          pd.DataFrame: A shallow view of the shared parsed frame. Derive new frames from it instead of writing to it
+     """
+     content = upload.getvalue()
+     key = upload_key(content, reader_kwargs)
+     df = _get(key)
+     if df is None:
+          df = _parse(content, reader_kwargs)
+          _put(key, df)
+     if share_as:
+          details = {'key': list(key), 'file_name': upload.name, 'uploaded_by': shared_by,
+                     'uploaded_at': datetime.now().astimezone().isoformat(timespec='seconds')}
+          with _lock:
+               # The same file still sitting in an uploader is not shared again on every rerun
+               replaced = _shared.get(share_as, {}).get('key') != details['key']
+               if replaced:
+                    _shared[share_as] = details
+                    _pinned[share_as] = df
+          if replaced:
+               # A file that cannot be snapshotted is only shared until a restart, never replaced by the older copy
+               _shared_path(share_as).unlink(missing_ok=True)
+               write_snapshot(df, _shared_path(share_as), metadata=details)
+     return df.copy(deep=False)
+
+
+def _restore(name):
+     # Details and frame of a file shared before a restart, pinned again
+     path = _shared_path(name)
+     if not path.exists():
+          return None, None
+     details, df = snapshot_metadata(path), read_snapshot(path)
+     _put(tuple(details['key']), df)
+     with _lock:
+          if name not in _shared:
+               _shared[name], _pinned[name] = details, df
+          return _shared[name], _pinned[name]
+
+
+def latest_upload(name) -> tuple:
+     """
+     Latest upload shared under a name, by any session
+     Returns:
+          tuple: A shallow view of the frame, and a dict with its file_name, uploaded_by and uploaded_at (ISO
+               time). (None, None) when nothing is shared under the name
+     """
+     with _lock:
+          details, df = _shared.get(name), _pinned.get(name)
+     if details is None:
+          details, df = _restore(name)
+          if details is None:
+               return None, None
+     return df.copy(deep=False), {field: value for field, value in details.items() if field != 'key'}
+
+
+def clear_upload(name, details=None):
+     """
+     Stops sharing the upload shared under a name and unpins its frame. The frame stays cached like any other upload
+     Args:
+          details (dict): Only clear if this is still the shared upload, so a newer one is not dropped
+     """
+     with _lock:
+          if name not in _shared or details is None or _shared[name] is details:
+               _shared.pop(name, None)
+               _pinned.pop(name, None)
+               _shared_path(name).unlink(missing_ok=True)
+
+
+def read_uploads(uploads, **reader_kwargs) -> list:
+     """
+     Parses a batch of uploaded Excel files, with the ones not parsed before spread over worker processes
+     Args:
+          uploads (list): Files from st.file_uploader(accept_multiple_files=True)
+          reader_kwargs: Options for pd.read_excel, part of the cache key
+     Returns:
+          list: A shallow view of each upload's parsed frame, in upload order
+     """
+     contents = [upload.getvalue() for upload in uploads]
+     keys = [upload_key(content, reader_kwargs) for content in contents]
+     frames = [_get(key) for key in keys]
+     # Each distinct file not in the cache is parsed once, even if it was uploaded twice
+     missing = {key: content for key, content, df in zip(keys, contents, frames) if df is None}
+     parsed = dict(zip(missing, map_parser(_parse, missing.values(), [reader_kwargs] * len(missing))))
+     for key, df in parsed.items():
+          _put(key, df)
+     frames = [parsed[key] if df is None else df for key, df in zip(keys, frames)]
+     return [df.copy(deep=False) for df in frames]
@@ -0,0 +1,175 @@
+"""
+Version-aware caching for everything derived from a source URL.
+
+Instead of expiring after a fixed TTL, each cached loader is keyed by the
+version of the sources it reads. The version is checked with a cheap
+conditional request (ETag / Last-Modified, a file stat for local paths, or a
+content hash when the server sends neither) at most once per CHECK_INTERVAL.
+When a source changed, every cache entry that was served from it is rebuilt on
+a background thread while the previous version keeps being served, and only
+then do the pages switch to the new version.
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import streamlit as st
+
+from sales_data.snapshot import UNCHECKED, content_version, fetch_source
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two version checks of the same source
+CHECK_INTERVAL = 10*60
+# Seconds to wait on a version check before serving what is already loaded
+PROBE_TIMEOUT = 10
+# Entries kept per cached loader: the served version and the one being built, for each source and option
+CACHE_ENTRIES = 8
+
+
+def probe_version(url, validators=None) -> tuple:
+     """
+     Asks a source for its current version without downloading it where possible
+     Args:
+          url (str): Source URL or local path
+          validators (dict): ETag / Last-Modified from the previous check
+     Returns:
+          tuple: (version, validators). The version is None when the source is unchanged or could not be reached
+     """
+     if not str(url).startswith(('http://', 'https://')):
+          stat = Path(url).stat()
+          return f'{stat.st_mtime_ns:x}-{stat.st_size:x}', {}
+
+     validators = validators or {}
+     headers = {}
+     if validators.get('etag'):
+          headers['If-None-Match'] = validators['etag']
+     if validators.get('last_modified'):
+          headers['If-Modified-Since'] = validators['last_modified']
+     etag = last_modified = None
+     try:
+          with urllib.request.urlopen(urllib.request.Request(url, headers=headers, method='HEAD'), timeout=PROBE_TIMEOUT) as response:
+               etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+     except urllib.error.HTTPError as e:
+          if e.code == 304:
+               return None, validators
+          # Hosts that refuse HEAD fall through to hashing the content
+          if e.code not in (403, 405, 501):
+               logger.warning("Could not check %s: %s", url, e)
+               return None, validators
+     except (urllib.error.URLError, OSError) as e:
+          logger.warning("Could not check %s: %s", url, e)
+          return None, validators
+
+     if etag or last_modified:
+          return etag or last_modified, {'etag': etag, 'last_modified': last_modified}
+     return content_version(fetch_source(url)), {}
+
+
+class _SourceState:
+     def __init__(self, version, validators):
+          self.served = version
+          self.validators = validators
+          self.checked = time.monotonic()
+          self.refreshing = False
+          # Cache entries read from this source, as zero-argument callables that rebuild them
+          self.entries = {}
+
+
+@st.cache_resource
+def _sources() -> dict:
+     # Source URL -> _SourceState, shared by every session
+     return {}
+
+
+_sources_lock = threading.Lock()
+# Versions a refresh thread is building. Loaders called from that thread read these instead of the served ones
+_building = threading.local()
+
+
+def served_version(url) -> str:
+     """
+     Version of a source the pages should use. Starts a background refresh when the source changed
+     """
+     building = getattr(_building, 'versions', {})
+     if url in building:
+          return building[url]
+
+     sources = _sources()
+     with _sources_lock:
+          state = sources.get(url)
+          due = state is not None and not state.refreshing and time.monotonic() - state.checked >= CHECK_INTERVAL
+          if due:
+               # Only one session checks at a time
+               state.checked = time.monotonic()
+
+     if state is None:
+          version, validators = probe_version(url)
+          with _sources_lock:
+               state = sources.setdefault(url, _SourceState(version or UNCHECKED, validators))
+          return state.served
+
+     if due:
+          version, validators = probe_version(url, state.validators)
+          if version is not None and version != state.served:
+               with _sources_lock:
+                    state.refreshing = True
+               threading.Thread(target=_refresh, args=(url, state, version, validators), name='source-refresh', daemon=True).start()
+     return state.served
+
+
+def _refresh(url, state, version, validators):
+     # Rebuild every cache entry read from `url` at the new version, then switch the pages over to it
+     _building.versions = {url: version}
+     started = time.perf_counter()
+     try:
+          for rebuild in list(state.entries.values()):
+               rebuild()
+     except Exception as e:
+          logger.warning("Refreshing %s failed, still serving version %s: %s", url, state.served, e)
+          with _sources_lock:
+               state.refreshing = False
+          return
+     finally:
+          _building.versions = {}
+     with _sources_lock:
+          state.served = version
+          state.validators = validators
+          state.refreshing = False
+     logger.info("Refreshed %s to version %s in %.1fs", url, version, time.perf_counter() - started)
+
+
+def versioned(*source_params):
+     """
+     Keys a cached loader by the served version of its sources
+     Args:
+          *source_params (str): Names of the loader's parameters that hold source URLs
+     The decorated function is a cached function (see shared.py) with a `version` parameter. It is only part of the
+     cache key and is filled in here, so callers keep calling the loader with its URLs alone.
+     """
+     def decorate(loader):
+          signature = inspect.signature(loader)
+
+          @functools.wraps(loader)
+          def load(*args, **kwargs):
+               bound = signature.bind_partial(*args, **kwargs)
+               bound.apply_defaults()
+               urls = [bound.arguments[name] for name in source_params]
+               version = '|'.join(served_version(url) for url in urls)
+
+               # Remember how to rebuild this entry so a refresh can warm it before the switch
+               entry = (loader.__qualname__, args, tuple(sorted(kwargs.items())))
+               sources = _sources()
+               with _sources_lock:
+                    for url in urls:
+                         sources[url].entries.setdefault(entry, functools.partial(load, *args, **kwargs))
+               return loader(*args, version=version, **kwargs)
+
+          load.clear = loader.clear
+          return load
+     return decorate
@@ -0,0 +1,74 @@
+"""
+Wholesaler rankings for the Tools page.
+
+The ranking used to mask a full-size copy of the ETF or UIT frame with
+df.where, then group and sort it, for every submit. The rows are now rolled up
+once per data version into AUM sums keyed by month x ticker x outsider x Vest
+wholesaler, with each month's cells stored on their own. A ranking filters one
+month's cells by ticker and wholesaler and regroups them, whatever the branch,
+so the selected month is always applied.
+"""
+import pandas as pd
+
+from sales_data.loaders import load_etf_analyzer_data
+from sales_data.shared import shared_cache
+from sales_data.territories import load_uit_territory_data
+from sales_data.versions import versioned
+
+TICKER = 'Ticker'
+WHOLESALER = 'Wholesaler'
+
+
+class RankingCube:
+     """
+     AUM per month x ticker x outsider x wholesaler, split by month
+     Args:
+          df (pd.DataFrame): Sales rows
+          month_column (str): Period column, e.g. 'Date'
+          dimensions (list): Columns kept as cube levels besides the month, including TICKER and WHOLESALER
+          measure (str): Column to sum
+     """
+     def __init__(self, df, month_column, dimensions, measure='AUM'):
+          self.dimensions = list(dimensions)
+          self.measure = measure
+          # Rows without an outsider or wholesaler are kept, so rankings that do not group by that column still count them
+          cube = df.groupby([month_column, *self.dimensions], observed=True, dropna=False)[measure].sum().reset_index()
+          self._months = {pd.Timestamp(month): cells.drop(columns=month_column).reset_index(drop=True)
+                          for month, cells in cube.groupby(month_column, observed=True)}
+
+     def rank(self, month, by, tickers=None, wholesaler=None, split_by_ticker=False) -> pd.DataFrame:
+          """
+          Ranks outsiders (or outsider x wholesaler pairs) by AUM for one month
+          Args:
+               month (pd.Timestamp): Month to rank
+               by (list): Levels to rank, e.g. ['SP Outsider'] or ['ETF Outsider', 'Wholesaler']
+               tickers (list): Only count these tickers. Defaults to every ticker
+               wholesaler (str): Only count this Vest wholesaler's rows. Defaults to every row
+               split_by_ticker (bool): One AUM column per ticker instead of a single AUM column
+          Returns:
+               pd.DataFrame: `by` and AUM columns sorted by AUM, largest first. Split rankings are indexed by `by` with a column per ticker
+          """
+          empty = pd.DataFrame(columns=[*self.dimensions, self.measure])
+          cells = self._months.get(pd.Timestamp(month), empty)
+          if tickers is not None:
+               cells = cells[cells[TICKER].isin(tickers)]
+          if wholesaler:
+               cells = cells[cells[WHOLESALER] == wholesaler]
+          keys = list(by) + [TICKER] if split_by_ticker else list(by)
+          ranked = cells.groupby(keys, as_index=False, observed=True)[self.measure].sum().sort_values(by=[self.measure], ascending=False, ignore_index=True)
+          if split_by_ticker:
+               return ranked.pivot(index=by if len(by) > 1 else by[0], columns=TICKER, values=self.measure)
+          return ranked
+
+
+@versioned('url')
+@shared_cache
+def load_etf_ranking_cube(url: str, version: str = None) -> RankingCube:
+     return RankingCube(load_etf_analyzer_data(url), 'Date', [TICKER, 'SP Outsider', 'ETF Outsider', WHOLESALER])
+
+
+@versioned('url', 'ft_wholesaler_url', 'vest_wholesaler_url')
+@shared_cache
+def load_uit_ranking_cube(url: str, ft_wholesaler_url: str, vest_wholesaler_url: str, version: str = None) -> RankingCube:
+     # UIT rows get their COM outsider and Vest wholesaler from the ZIP territory resolver
+     return RankingCube(load_uit_territory_data(url, ft_wholesaler_url, vest_wholesaler_url), 'Date', [TICKER, 'COM Outsider', WHOLESALER])
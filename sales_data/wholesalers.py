@@ -0,0 +1,102 @@
+"""
+Vest wholesaler dimension.
+
+The wholesaler columns are resolved into categoricals once when a source is
+loaded. Pages then split rows by wholesaler with a single groupby pass over the
+integer codes, and the dashboard builds its tabs from the roster found in the
+data instead of a hard-coded list of names. The MF sales and cohort files spell
+names independently, so spellings are joined on a normalized name key.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN = 'Unknown'
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def resolve_wholesalers(df, column) -> pd.DataFrame:
+     # Normalize stray whitespace and store the names as a categorical. Rows without a wholesaler stay missing
+     if column in df:
+          df[column] = df[column].astype('string').str.strip().replace('', pd.NA).astype('category')
+     return df
+
+
+def name_key(name) -> str:
+     # Spelling-insensitive key of a name: case, punctuation and spacing are ignored
+     return ' '.join(_PUNCTUATION.sub(' ', str(name).casefold()).split())
+
+
+def tab_label(name) -> str:
+     # Tabs are labelled by last name, rows without a wholesaler go to the Unknown tab
+     if name is None:
+          return UNKNOWN
+     return str(name).split()[-1]
+
+
+class WholesalerRoster:
+     """
+     Every wholesaler found in several name columns, with the spellings of each
+     Args:
+          *columns (pd.Series): Wholesaler columns, e.g. MF sales 'Vest Wholesaler' then cohort 'Vest'. A spelling
+               joins a name with the same name key, or else the only name from an earlier column with the same last
+               name (so 'Chris Mortimer' and 'Christopher Mortimer' are one wholesaler). Other spellings are new names
+     """
+     def __init__(self, *columns):
+          self._spellings = {}
+          by_key, by_last_name = {}, {}
+          for column in columns:
+               new_names = []
+               for spelling in pd.Series(column).dropna().unique().tolist():
+                    key = name_key(spelling)
+                    last_name = key.split()[-1] if key else key
+                    name = by_key.get(key)
+                    # Last names are only matched against earlier columns: within one file, two spellings are two people
+                    if name is None and len(by_last_name.get(last_name, [])) == 1:
+                         name = by_last_name[last_name][0]
+                    if name is None:
+                         name = spelling
+                         self._spellings[name] = []
+                         new_names.append((last_name, name))
+                    by_key.setdefault(key, name)
+                    if spelling not in self._spellings[name]:
+                         self._spellings[name].append(spelling)
+               for last_name, name in new_names:
+                    by_last_name.setdefault(last_name, []).append(name)
+          self.names = sorted(self._spellings, key=lambda name: (tab_label(name), name))
+          # Last names shared by several wholesalers are labelled with the full name instead
+          last_names = [tab_label(name) for name in self.names]
+          self._labels = {name: str(name) if last_names.count(label) > 1 else label for name, label in zip(self.names, last_names)}
+
+     def spellings(self, name) -> list:
+          # Every spelling of a roster name. None (rows without a wholesaler) only stands for itself
+          return self._spellings.get(name, [name])
+
+     def label(self, name) -> str:
+          # Tab label, unique within the roster
+          return self._labels.get(name, tab_label(name))
+
+
+def partition_rows(column) -> dict:
+     """
+     Row positions of each wholesaler, computed in one pass over the category codes
+     Args:
+          column (pd.Series): A wholesaler column resolved by resolve_wholesalers
+     Returns:
+          dict: Wholesaler name (None for rows without one) -> numpy array of row positions
+     """
+     if not isinstance(column.dtype, pd.CategoricalDtype):
+          column = column.astype('category')
+     # Bucket the integer codes with a stable sort; code -1 marks rows without a wholesaler
+     codes = column.cat.codes.to_numpy()
+     order = np.argsort(codes, kind='stable')
+     counts = np.bincount(codes + 1, minlength=len(column.cat.categories) + 1)
+     ends = np.cumsum(counts)
+     names = [None] + column.cat.categories.tolist()
+     return {name: order[end - count:end] for name, count, end in zip(names, counts, ends) if count}
+
+
+def rows_for(df, partition, name) -> pd.DataFrame:
+     # The rows of a single wholesaler, O(group size)
+     return df.take(partition.get(name, np.array([], dtype=np.intp)))
@@ -0,0 +1,74 @@
+"""
+Worker processes for the workbook parsing.
+
+openpyxl parses in pure Python and holds the GIL the whole time, so workbooks
+parsed on threads still take turns on one core. The parsing is sent to a pool
+of spawned processes instead, shared by the source snapshots (snapshot.py), the
+history store (history.py) and upload batches (uploads.py). With a single CPU
+there is nothing to run side by side, and everything is parsed in the calling
+process.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Worker processes parsing workbooks
+PARSE_WORKERS = min(8, os.cpu_count() or 1)
+
+_lock = threading.Lock()
+# Parser processes, started on the first parse and reused by later ones
+_executor = None
+
+
+def _pool():
+     global _executor
+     with _lock:
+          if _executor is None:
+               # Spawned rather than forked: forking copies the server's threads and locks mid-flight
+               _executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+          return _executor
+
+
+def _reset(executor):
+     # A worker died (e.g. out of memory). The next parse starts a fresh pool
+     global _executor
+     with _lock:
+          if _executor is executor:
+               _executor = None
+
+
+def run_parser(parse, *args):
+     """
+     Runs a parsing function on a worker process while the calling thread waits
+     Args:
+          parse (callable): Module-level function, so it can be sent to a worker. Its arguments and result are pickled
+     Returns:
+          The function's result
+     """
+     if PARSE_WORKERS <= 1:
+          return parse(*args)
+     executor = _pool()
+     try:
+          return executor.submit(parse, *args).result()
+     except BrokenProcessPool:
+          _reset(executor)
+          return parse(*args)
+
+
+def map_parser(parse, *iterables) -> list:
+     """
+     Runs a parsing function on every set of arguments, spread over the worker processes
+     Returns:
+          list: The results, in argument order
+     """
+     args = list(zip(*iterables))
+     if PARSE_WORKERS <= 1 or len(args) <= 1:
+          return [parse(*values) for values in args]
+     executor = _pool()
+     try:
+          return list(executor.map(parse, *zip(*args)))
+     except BrokenProcessPool:
+          _reset(executor)
+          return [parse(*values) for values in args]
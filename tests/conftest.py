@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sales_data import history, load_mf_cohort_data, snapshot
+
+# The test workbook, written by tests/fixtures/make_workbooks.py
+COHORT_WORKBOOK = Path(__file__).resolve().parent / 'fixtures' / 'cohort.xlsx'
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+     # Snapshots, history stores and shared uploads of a test go to its own directory
+     directory = tmp_path / 'snapshots'
+     monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', directory)
+     monkeypatch.setattr(history, 'SNAPSHOT_DIR', directory)
+     return directory
+
+
+@pytest.fixture
+def cohort(snapshot_dir):
+     # The test workbook through the cohort loader, typed like the pages see it
+     return load_mf_cohort_data(str(COHORT_WORKBOOK))
@@ -0,0 +1,45 @@
+"""
+Writes the test workbook, a small Broadridge cohort export with the columns the
+Cohort Analyzer and Industry AUM Lookup read. Run it again only to change the
+fixture: the rows are drawn from a fixed seed.
+
+     python tests/fixtures/make_workbooks.py
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FIXTURES = Path(__file__).resolve().parent
+COHORT_WORKBOOK = FIXTURES / 'cohort.xlsx'
+
+WHOLESALERS = ['Michael Capizzi', 'Andrew Torok', 'Chris Mortimer', 'Luke Poggi', 'Dan Sullivan', None]
+CATEGORIES = ['BUIGX', 'KNGIX', 'ENGIX', 'RYSE', 'BTCVX', 'FTMIX']
+
+
+def cohort_rows(n=600, seed=1) -> pd.DataFrame:
+     rng = np.random.default_rng(seed)
+     firms = [f'Firm {i} LLC' for i in range(60)] + ['Smith & Jones, L.L.C.', 'smith & jones llc', 'Acme Advisors Inc']
+     return pd.DataFrame({
+          'Client Defined Category Name': rng.choice(CATEGORIES, n),
+          'IS Outsider': rng.choice(['A', 'B', None], n),
+          'ETF/SMA Outsider': rng.choice(['Joe', 'Ann', None], n),
+          'SP Outsider': rng.choice(['X', 'Y'], n),
+          'COM Outsider': rng.choice(['P', 'Q'], n),
+          'Vest': rng.choice(WHOLESALERS, n),
+          'Intermediary Firm Name': rng.choice(firms, n),
+          'Initiating Firm Name': rng.choice(firms + [None], n),
+          'City': rng.choice(['Boston', 'NYC', 'SF'], n),
+          'Postal Code': rng.choice(['02110', '10001-1234', '94105', '2110'], n),
+          'State/Region': rng.choice(['MA', 'NY', 'CA'], n),
+          'Channel': rng.choice(['RIA', 'BD'], n),
+          'AUM': np.round(rng.random(n) * 1e6, 2),
+          'Industry AUM': np.round(rng.random(n) * 1e7, 2),
+          'NNA': np.where(rng.random(n) < 0.1, np.nan, np.round(rng.normal(0, 1e5, n), 2)),
+          'Industry NNA': np.round(rng.normal(0, 1e6, n), 2),
+          'Month/Year (Asset Date)': pd.Timestamp('2024-06-01'),
+     })
+
+
+if __name__ == '__main__':
+     cohort_rows().to_excel(COHORT_WORKBOOK, index=False)
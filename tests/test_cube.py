@@ -0,0 +1,74 @@
+from functools import partial
+
+import pandas as pd
+import pytest
+
+from sales_data import cube as cube_module
+from sales_data.cube import WHOLESALER, FactCube, _refresh_cube, aggregate_cube, update_cube
+
+aggregate = partial(aggregate_cube, month_column='Date', wholesaler_column='Wholesaler', product_column='Ticker',
+                    channel_column='Channel')
+
+
+def uit_rows(months, territories):
+     # Two accounts per state and month, with the Vest wholesaler merged on by state like load_uit_cube
+     rows = [{'Date': pd.Timestamp(month), 'State': state, 'Ticker': 'U1', 'Channel': 'RIA', 'AUM': float(aum)}
+             for month in months for aum, state in enumerate(['CA', 'CA', 'NY', 'NY'], start=1)]
+     df = pd.DataFrame(rows).merge(pd.DataFrame(territories.items(), columns=['State', 'Wholesaler']), on='State', how='left')
+     return df.sort_values('Date', kind='stable', ignore_index=True)
+
+
+def assert_same_cube(actual, expected):
+     pd.testing.assert_frame_equal(actual.cube, expected.cube)
+     pd.testing.assert_frame_equal(actual.series(), expected.series())
+     for month in expected.months:
+          pd.testing.assert_frame_equal(actual.breakdown(month, WHOLESALER), expected.breakdown(month, WHOLESALER))
+
+
+def test_appended_month_extends_the_cube():
+     territories = {'CA': 'Jones', 'NY': 'Smith'}
+     previous = update_cube(None, uit_rows(['2024-01-01', '2024-02-01'], territories), 'Date', aggregate)
+     df = uit_rows(['2024-01-01', '2024-02-01', '2024-03-01'], territories)
+
+     rolled_up = []
+     updated = update_cube(previous, df, 'Date', lambda rows: rolled_up.append(len(rows)) or aggregate(rows))
+
+     # Only February, the newest stored month, and March are rolled up again
+     assert rolled_up == [8]
+     assert_same_cube(updated, FactCube(aggregate(df)))
+
+
+def test_moved_territory_rebuilds_older_months():
+     previous = update_cube(None, uit_rows(['2024-01-01', '2024-02-01'], {'CA': 'Jones', 'NY': 'Smith'}), 'Date', aggregate)
+     # CA moves from Jones to Smith, which changes January without changing its row count
+     df = uit_rows(['2024-01-01', '2024-02-01', '2024-03-01'], {'CA': 'Smith', 'NY': 'Smith'})
+
+     updated = update_cube(previous, df, 'Date', aggregate)
+
+     assert updated.wholesaler_total(pd.Timestamp('2024-01-01'), 'Jones') == 0
+     assert_same_cube(updated, FactCube(aggregate(df)))
+
+
+def test_restated_month_with_same_row_count_rebuilds():
+     territories = {'CA': 'Jones', 'NY': 'Smith'}
+     previous = update_cube(None, uit_rows(['2024-01-01', '2024-02-01'], territories), 'Date', aggregate)
+     df = uit_rows(['2024-01-01', '2024-02-01', '2024-03-01'], territories)
+     df.loc[0, 'AUM'] = 100.0
+
+     updated = update_cube(previous, df, 'Date', aggregate)
+
+     assert updated.total(pd.Timestamp('2024-01-01')) == df.loc[df['Date'] == '2024-01-01', 'AUM'].sum()
+     assert_same_cube(updated, FactCube(aggregate(df)))
+
+
+@pytest.mark.parametrize('inputs_version, rebuilt', [('v1', False), ('v2', True)])
+def test_new_dimension_inputs_version_rebuilds(monkeypatch, inputs_version, rebuilt):
+     key = ('test', inputs_version)
+     territories = {'CA': 'Jones', 'NY': 'Smith'}
+     _refresh_cube(key, uit_rows(['2024-01-01'], territories), 'Date', aggregate, inputs_version='v1')
+
+     calls = []
+     monkeypatch.setattr(cube_module, 'update_cube', lambda previous, *args: calls.append(previous) or update_cube(previous, *args))
+     _refresh_cube(key, uit_rows(['2024-01-01', '2024-02-01'], territories), 'Date', aggregate, inputs_version=inputs_version)
+
+     assert (calls[0] is None) == rebuilt
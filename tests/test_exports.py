@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from sales_data import exports
+from sales_data.exports import export_dir, export_file, write_excel
+
+
+@pytest.fixture
+def rows():
+     return pd.DataFrame({'Firm': [f'Firm {i}' for i in range(10)], 'AUM': np.arange(10) * 1000.5,
+                          'NNA': [1.0, None] * 5, 'Month': pd.date_range('2024-01-01', periods=10, freq='MS')})
+
+
+class Rows:
+     # Counts how often the rows of an export are computed
+     def __init__(self, df):
+          self.df = df
+          self.calls = 0
+
+     def __call__(self):
+          self.calls += 1
+          return self.df
+
+
+def test_write_excel_streams_every_chunk(rows, tmp_path, monkeypatch):
+     monkeypatch.setattr(exports, 'CHUNK_ROWS', 3)
+     path = tmp_path / 'rows.xlsx'
+
+     write_excel(rows, path, dollar_columns=['AUM'])
+
+     pd.testing.assert_frame_equal(pd.read_excel(path), rows, check_dtype=False)
+     sheet = openpyxl.load_workbook(path).active
+     assert sheet.cell(row=2, column=2).number_format == '$#,##0.00'
+     assert sheet.cell(row=3, column=3).value is None
+
+
+@pytest.mark.parametrize('fmt, read', [('CSV', pd.read_csv), ('Parquet', pd.read_parquet)])
+def test_other_formats_round_trip(rows, snapshot_dir, fmt, read):
+     df = read(export_file(lambda: rows, fmt))
+
+     assert df['Firm'].tolist() == rows['Firm'].tolist()
+     assert df['AUM'].tolist() == rows['AUM'].tolist()
+
+
+def test_exports_follow_the_snapshot_dir(rows, snapshot_dir):
+     assert export_file(lambda: rows, 'CSV', key='a').parent == snapshot_dir / 'exports' == export_dir()
+
+
+def test_same_key_reuses_the_file(rows, snapshot_dir):
+     computed = Rows(rows)
+
+     first = export_file(computed, 'Excel', key={'cohort': 'v1', 'filters': {'Vest': ['Ann']}})
+     again = export_file(computed, 'Excel', key={'filters': {'Vest': ['Ann']}, 'cohort': 'v1'})
+     other = export_file(computed, 'Excel', key={'cohort': 'v2', 'filters': {'Vest': ['Ann']}})
+     unkeyed = [export_file(computed, 'Excel') for _ in range(2)]
+
+     assert again == first != other
+     assert unkeyed[0] == unkeyed[1]
+     # v1 once, v2 once, and every unkeyed export
+     assert computed.calls == 4
+
+
+def test_least_recently_used_files_are_removed(rows, snapshot_dir, monkeypatch):
+     monkeypatch.setattr(exports, 'EXPORT_ENTRIES', 2)
+     paths = []
+     for version in range(3):
+          paths.append(export_file(lambda: rows, 'CSV', key=version))
+          # Spread the modification times so the order does not depend on the file system's resolution
+          for age, path in enumerate(reversed(paths)):
+               if path.exists():
+                    os.utime(path, (1000 - age, 1000 - age))
+
+     assert [path.exists() for path in paths] == [False, True, True]
+
+     # Reusing a file makes it the most recent one
+     export_file(lambda: rows, 'CSV', key=1)
+     os.utime(paths[2], (990, 990))
+     export_file(lambda: rows, 'CSV', key=3)
+     assert [path.exists() for path in paths] == [False, True, False]
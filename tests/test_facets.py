@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from sales_data.facets import FacetIndex
+
+FILTERS = ['Client Defined Category Name', 'IS Outsider', 'ETF/SMA Outsider', 'SP Outsider', 'COM Outsider', 'Vest', 'Channel']
+# Selections made one after the other, like a user working through the filters
+STEPS = [
+     {},
+     {'Vest': ['Dan Sullivan']},
+     {'Vest': ['Dan Sullivan'], 'Channel': ['BD']},
+     {'Vest': ['Dan Sullivan', 'Luke Poggi'], 'Channel': ['BD'], 'IS Outsider': ['A']},
+     {'Vest': ['Dan Sullivan', 'Luke Poggi'], 'Client Defined Category Name': ['KNGIX'], 'IS Outsider': ['A']},
+     {'Client Defined Category Name': ['KNGIX', 'RYSE'], 'ETF/SMA Outsider': ['Joe']},
+     # Only values without rows: nothing matches, like isin
+     {'Vest': ['Nobody']},
+     {'Vest': ['Nobody'], 'Channel': ['BD']},
+     # Empty selections leave a column unfiltered
+     {'Vest': [], 'Channel': ['RIA']},
+]
+
+
+def matching(df, selections, except_column=None):
+     # What DynamicFilters computed: one boolean mask per filtered column
+     mask = pd.Series(True, index=df.index)
+     for column, values in selections.items():
+          if column != except_column and values:
+               mask &= df[column].isin(values)
+     return mask
+
+
+@pytest.fixture
+def facets(cohort):
+     return FacetIndex(cohort, FILTERS)
+
+
+@pytest.mark.parametrize('selections', STEPS)
+def test_rows_match_boolean_masks(cohort, facets, selections):
+     pd.testing.assert_frame_equal(facets.filter(selections), cohort[matching(cohort, selections)])
+
+
+@pytest.mark.parametrize('selections', STEPS)
+def test_options_match_cascading_filters(cohort, facets, selections):
+     for column in FILTERS:
+          expected = cohort.loc[matching(cohort, selections, except_column=column), column].dropna().unique()
+          assert sorted(facets.options(selections, column)) == sorted(expected)
@@ -0,0 +1,90 @@
+import gc
+import weakref
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_data import firms
+from sales_data.firms import FIRM_COLUMN, FirmDirectory, FirmIndex, FirmMatcher
+
+
+def make_matcher():
+     return FirmMatcher(FirmIndex(pd.Series(['Smith & Jones, L.L.C.', 'Acme Advisors', 'Acme Advisors Inc', None])))
+
+
+@pytest.fixture
+def matcher():
+     return make_matcher()
+
+
+def test_matches_are_read_only_and_cached(matcher):
+     groups, scores = matcher._best('smith and jones llc')
+
+     assert matcher.labels[groups[0]] == 'Smith & Jones, L.L.C.'
+     with pytest.raises(ValueError):
+          groups[0] = 1
+     with pytest.raises(ValueError):
+          scores[0] = 0
+     assert matcher._best('smith and jones llc')[0] is groups
+
+
+def test_match_cache_is_bounded(matcher, monkeypatch):
+     monkeypatch.setattr(firms, 'MATCH_CACHE_SIZE', 2)
+
+     for name in ['acme', 'smith', 'jones', 'acme advisors']:
+          matcher._best(name)
+
+     assert list(matcher._matches) == ['jones', 'acme advisors']
+
+
+def test_matcher_is_freed_with_its_cache():
+     matcher = make_matcher()
+     matcher.keys_for(['Acme Advisors'])
+     reference = weakref.ref(matcher)
+
+     del matcher
+     gc.collect()
+
+     assert reference() is None
+
+
+def test_index_rows_match_case_insensitive_masks(cohort):
+     index = FirmIndex(cohort[FIRM_COLUMN])
+     names = ['FIRM 3 LLC', ' firm 10 llc', 'Smith & Jones, L.L.C.', 'Nobody']
+     folded = cohort[FIRM_COLUMN].str.strip().str.casefold()
+
+     for name, key in zip(names, index.keys_for(names)):
+          expected = np.flatnonzero(folded == name.strip().casefold())
+          np.testing.assert_array_equal(index.rows([key]), expected)
+
+
+def test_matcher_rows_cover_every_spelling(cohort):
+     matcher = FirmMatcher(FirmIndex(cohort[FIRM_COLUMN]))
+
+     keys = matcher.keys_for(['Smith and Jones LLC', 'Firm 7, LLC', 'Nobody Else At All'])
+
+     assert keys[2] == -1
+     expected = cohort[FIRM_COLUMN].isin(['Smith & Jones, L.L.C.', 'smith & jones llc', 'Firm 7 LLC'])
+     np.testing.assert_array_equal(matcher.rows(keys), np.flatnonzero(expected))
+
+
+def test_directory_summaries_match_a_masked_groupby(cohort):
+     index = FirmIndex(cohort[FIRM_COLUMN])
+     directory = FirmDirectory(cohort, index)
+
+     for name in directory.names:
+          for outsider in cohort['ETF/SMA Outsider'].cat.categories:
+               # What Single Firm Lookup did before: a three-way mask, then a groupby
+               firm_rows = cohort[(cohort[FIRM_COLUMN] == name) & (cohort['ETF/SMA Outsider'] == outsider) & (cohort['Channel'] == 'RIA')]
+               expected = firm_rows.groupby('Client Defined Category Name', observed=True)['Industry AUM'].sum().reset_index()
+               pd.testing.assert_frame_equal(directory.summary(name, outsider), expected, check_categorical=False)
+
+
+def test_directory_search_lists_prefix_matches_first(cohort):
+     directory = FirmDirectory(cohort, FirmIndex(cohort[FIRM_COLUMN]))
+
+     names = directory.search('firm 1')
+     assert names == sorted(name for name in directory.names if name.casefold().startswith('firm 1'))
+     # Later words match too. Spellings Broadridge keeps apart stay apart
+     assert directory.search('jones') == ['smith & jones llc', 'Smith & Jones, L.L.C.']
@@ -0,0 +1,100 @@
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from sales_data import history
+from sales_data.history import read_history
+
+SHEET = 'Sales Data'
+COLUMNS = ['Date', 'Firm', 'AUM']
+
+
+def write_workbook(path, rows):
+     workbook = Workbook()
+     sheet = workbook.active
+     sheet.title = SHEET
+     sheet.append(COLUMNS)
+     for row in rows:
+          sheet.append(row)
+     workbook.save(path)
+
+
+def month_rows(month, aums):
+     return [[pd.Timestamp(month).to_pydatetime(), f'Firm {i}', aum] for i, aum in enumerate(aums)]
+
+
+def full_parse(path):
+     df = pd.read_excel(path, sheet_name=SHEET)
+     return df.assign(Date=pd.to_datetime(df['Date']))
+
+
+def assert_same_history(df, path):
+     # The store keeps unchanged periods first, so compare by period like the loaders' sort_by_period
+     expected = full_parse(path).sort_values('Date', kind='stable', ignore_index=True)
+     actual = df[COLUMNS].sort_values('Date', kind='stable', ignore_index=True)
+     pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.fixture
+def parsed_rows(monkeypatch):
+     # Rows turned into frames by each read, to tell parsed periods from reused ones
+     frames = []
+     rows_frame = history._rows_frame
+
+     def counting(header, rows):
+          frames.append(len(rows))
+          return rows_frame(header, rows)
+
+     monkeypatch.setattr(history, '_rows_frame', counting)
+     return frames
+
+
+def test_new_month_only_parses_new_rows(tmp_path, snapshot_dir, parsed_rows):
+     path = tmp_path / 'sales.xlsx'
+     write_workbook(path, month_rows('2024-01-01', [1, 2, 3]) + month_rows('2024-02-01', [4, 5]))
+     read_history(path, SHEET, 'Date', COLUMNS)
+
+     write_workbook(path, month_rows('2024-01-01', [1, 2, 3]) + month_rows('2024-02-01', [4, 5]) + month_rows('2024-03-01', [6]))
+     df = read_history(path, SHEET, 'Date', COLUMNS)
+
+     assert parsed_rows == [5, 1]
+     assert_same_history(df, path)
+
+
+def test_restated_month_with_same_row_count_is_parsed_again(tmp_path, snapshot_dir, parsed_rows):
+     path = tmp_path / 'sales.xlsx'
+     write_workbook(path, month_rows('2024-01-01', [1, 2]) + month_rows('2024-02-01', [3, 4]))
+     read_history(path, SHEET, 'Date', COLUMNS)
+
+     # January is restated without changing its row count, and March is added
+     write_workbook(path, month_rows('2024-01-01', [100, 2]) + month_rows('2024-02-01', [3, 4]) + month_rows('2024-03-01', [5]))
+     df = read_history(path, SHEET, 'Date', COLUMNS)
+
+     assert df.loc[(df['Date'] == '2024-01-01') & (df['Firm'] == 'Firm 0'), 'AUM'].tolist() == [100]
+     # February is reused, January and March are parsed
+     assert parsed_rows == [4, 3]
+     assert_same_history(df, path)
+
+
+def test_removed_month_is_dropped(tmp_path, snapshot_dir):
+     path = tmp_path / 'sales.xlsx'
+     write_workbook(path, month_rows('2024-01-01', [1, 2]) + month_rows('2024-02-01', [3]))
+     read_history(path, SHEET, 'Date', COLUMNS)
+
+     write_workbook(path, month_rows('2024-02-01', [3]) + month_rows('2024-03-01', [4]))
+     assert_same_history(read_history(path, SHEET, 'Date', COLUMNS), path)
+
+
+def test_store_without_checksums_is_rebuilt(tmp_path, snapshot_dir, parsed_rows):
+     path = tmp_path / 'sales.xlsx'
+     write_workbook(path, month_rows('2024-01-01', [1, 2]))
+     read_history(path, SHEET, 'Date', COLUMNS)
+     # A store from before checksums were kept
+     store = next(snapshot_dir.glob('*.arrow'))
+     history.write_snapshot(history.read_snapshot(store), store)
+
+     write_workbook(path, month_rows('2024-01-01', [7, 2]) + month_rows('2024-02-01', [3]))
+     df = read_history(path, SHEET, 'Date', COLUMNS)
+
+     assert parsed_rows == [2, 3]
+     assert_same_history(df, path)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from sales_data.holdings import CHANGES, holdings_by_quarter, holdings_changes
+
+QUARTERS = ['2024Q1', '2024Q2', '2024Q3']
+
+
+def export(holdings):
+     return pd.DataFrame(holdings, columns=['Symbol', 'Market Value'])
+
+
+def test_changes_match_a_loop_over_holdings():
+     rng = np.random.default_rng(0)
+     tickers = pd.DataFrame({'Ticker': [f'T{i}' for i in range(40)], 'Type': rng.choice(['ETF', 'MF'], 40)})
+     # Each quarter holds a random subset, with symbols outside the ticker master and repeated lines. Small values make some holdings unchanged
+     exports = []
+     for _ in QUARTERS:
+          symbols = rng.choice([f'T{i}' for i in range(40)] + ['ZZZ', 'YYY'], 30)
+          exports.append(export({'Symbol': symbols, 'Market Value': rng.integers(1, 5, 30) * 1000}))
+
+     df_values = holdings_by_quarter(tickers, exports, QUARTERS)
+
+     for before, after in zip(QUARTERS, QUARTERS[1:]):
+          expected = []
+          totals = [df.groupby('Symbol')['Market Value'].sum() for df in exports]
+          for ticker, kind in zip(tickers['Ticker'], tickers['Type']):
+               value_before = int(totals[QUARTERS.index(before)].get(ticker, 0))
+               value_after = int(totals[QUARTERS.index(after)].get(ticker, 0))
+               if value_before == 0 and value_after == 0:
+                    continue
+               if value_before == 0:
+                    change = 'New'
+               elif value_after == 0:
+                    change = 'Exit'
+               elif value_after != value_before:
+                    change = 'Increase' if value_after > value_before else 'Decrease'
+               else:
+                    change = 'Unchanged'
+               expected.append((ticker, kind, change, value_before, value_after, value_after - value_before))
+          expected.sort(key=lambda row: (CHANGES.index(row[2]), -abs(row[5])))
+
+          df_changes = holdings_changes(df_values, before, after)
+
+          actual = list(df_changes.itertuples(index=False, name=None))
+          # Equal changes may come in any order, so compare each change type's rows as a set and the ranking by size
+          assert sorted(actual) == sorted(expected)
+          assert [(row[2], abs(row[5])) for row in actual] == [(row[2], abs(row[5])) for row in expected]
+
+
+def test_tickers_never_held_are_left_out():
+     tickers = pd.DataFrame({'Ticker': ['A', 'B', 'C'], 'Type': ['ETF', 'ETF', 'MF']})
+     exports = [export({'Symbol': ['A', 'B'], 'Market Value': [100, 200]}), export({'Symbol': ['B'], 'Market Value': [250]})]
+
+     df_values = holdings_by_quarter(tickers, exports, QUARTERS[:2])
+     df_changes = holdings_changes(df_values, *QUARTERS[:2])
+
+     assert df_values.loc[['A', 'B'], QUARTERS[:2]].to_numpy().tolist() == [[100, 0], [200, 250]]
+     assert df_changes[['Ticker', 'Change Type', 'Change']].values.tolist() == [['A', 'Exit', -100], ['B', 'Increase', 50]]
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_data.rankings import ClientRankings, top_positions
+
+
+def pandas_top(df, column, name, measure, k, largest):
+     rows = df[df[column].isna()] if name is None else df[df[column] == name]
+     return rows.sort_values(measure, ascending=not largest, kind='stable', na_position='last').head(k)
+
+
+@pytest.mark.parametrize('measure, k, largest', [('AUM', 20, True), ('NNA', 10, True), ('NNA', 10, False), ('NNA', 200, False)])
+def test_top_matches_sort_values(cohort, measure, k, largest):
+     # Depth 20 is the dashboard's; k=200 selects past it from the group's own rows
+     rankings = ClientRankings(cohort, 'Vest')
+
+     for name in [*cohort['Vest'].cat.categories, None]:
+          top = rankings.top(cohort, name, measure, k, largest)
+          expected = pandas_top(cohort, 'Vest', name, measure, k, largest)
+          pd.testing.assert_frame_equal(top, expected)
+
+
+def test_top_of_unknown_group_is_empty(cohort):
+     rankings = ClientRankings(cohort, 'Vest')
+
+     assert rankings.top(cohort, 'Nobody', 'AUM', 20).empty
+
+
+def test_missing_values_rank_last():
+     values = pd.Series([3.0, np.nan, 5.0, 1.0, np.nan])
+
+     assert top_positions(values, np.arange(5), 4).tolist() == [2, 0, 3, 1]
+     assert top_positions(values, np.array([1, 3, 4]), 3, largest=False).tolist() == [3, 1, 4]
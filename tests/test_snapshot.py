@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import COHORT_WORKBOOK
+from sales_data import load_mf_cohort_data, snapshot, versions
+from sales_data.snapshot import UNCHECKED, read_csv_snapshot, read_snapshot, snapshot_metadata, write_snapshot
+
+
+def test_round_trip_maps_numeric_columns(snapshot_dir):
+     df = pd.DataFrame({'AUM': np.arange(1000, dtype=float), 'Month': pd.date_range('2024-01-01', periods=1000, freq='D'),
+                        'Ticker': ['KNG', 'BUFR'] * 500, 'NNA': [1.0, None] * 500})
+     path = snapshot_dir / 'source-1.arrow'
+     write_snapshot(df, path, metadata={'checksums': {'2024-01': 'abc'}})
+
+     snapshot = read_snapshot(path)
+
+     pd.testing.assert_frame_equal(snapshot, df)
+     assert snapshot_metadata(path) == {'checksums': {'2024-01': 'abc'}}
+     # Numeric columns are views of the mapped file rather than copies
+     assert not snapshot['AUM'].to_numpy().flags.owndata
+     assert not snapshot['AUM'].to_numpy().flags.writeable
+
+
+def test_writes_never_reach_the_mapped_file(snapshot_dir):
+     path = snapshot_dir / 'source-1.arrow'
+     write_snapshot(pd.DataFrame({'AUM': [1.0, 2.0, 3.0]}), path)
+     snapshot = read_snapshot(path)
+     view = snapshot.copy(deep=False)
+
+     # A shared view gets its own copy of the written column
+     view.loc[0, 'AUM'] = 10.0
+     view['AUM'] *= 2
+     # The mapped frame itself is read-only
+     with pytest.raises(ValueError):
+          snapshot.loc[0, 'AUM'] = 10.0
+
+     assert view['AUM'].tolist() == [20.0, 4.0, 6.0]
+     assert snapshot['AUM'].tolist() == [1.0, 2.0, 3.0]
+     assert read_snapshot(path)['AUM'].tolist() == [1.0, 2.0, 3.0]
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+     # URLs downloaded by the snapshot readers
+     fetched = []
+     fetch_source = snapshot.fetch_source
+
+     def counting(url):
+          fetched.append(url)
+          return fetch_source(url)
+
+     monkeypatch.setattr(snapshot, 'fetch_source', counting)
+     return fetched
+
+
+def test_probed_version_reads_the_snapshot_without_downloading(tmp_path, snapshot_dir, fetches):
+     path = tmp_path / 'territories.csv'
+     pd.DataFrame({'Zip': ['02110', '94105'], 'Territory': ['East', 'West']}).to_csv(path, index=False)
+
+     first = read_csv_snapshot(path, version='v1', dtype={'Zip': str})
+     again = read_csv_snapshot(path, version='v1', dtype={'Zip': str})
+
+     pd.testing.assert_frame_equal(again, first)
+     assert fetches == [path]
+
+
+@pytest.mark.parametrize('version', [None, UNCHECKED])
+def test_unknown_version_is_keyed_by_content(tmp_path, snapshot_dir, fetches, version):
+     path = tmp_path / 'territories.csv'
+     pd.DataFrame({'Zip': ['02110'], 'Territory': ['East']}).to_csv(path, index=False)
+     read_csv_snapshot(path, version=version)
+     pd.DataFrame({'Zip': ['02110'], 'Territory': ['North']}).to_csv(path, index=False)
+
+     assert read_csv_snapshot(path, version=version)['Territory'].tolist() == ['North']
+     assert fetches == [path, path]
+
+
+def restart():
+     # Forget everything a process keeps in memory, leaving the snapshots on disk
+     load_mf_cohort_data.clear()
+     versions._sources().clear()
+
+
+def test_loader_restart_does_not_download_the_source(snapshot_dir, monkeypatch):
+     restart()
+     cohort = load_mf_cohort_data(str(COHORT_WORKBOOK))
+
+     # A new process with the same source version only maps the snapshot written by the first one
+     restart()
+     monkeypatch.setattr(snapshot, 'fetch_source', lambda url: pytest.fail(f'downloaded {url}'))
+     pd.testing.assert_frame_equal(load_mf_cohort_data(str(COHORT_WORKBOOK)), cohort)
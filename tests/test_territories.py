@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from sales_data.territories import ZipTerritories, load_master_territories, zip_keys
+
+
+def test_zip_keys():
+     zips = pd.Series(['02110', '2110', '02110-1234', '021101234', 2110.0, ' 10001 ', '1234567', 'N/A', None, np.nan])
+
+     assert zip_keys(zips).tolist() == [2110, 2110, 2110, 2110, 2110, 10001, -1, -1, -1, -1]
+
+
+def test_assign_matches_a_merge_on_five_digit_zips():
+     territories = pd.DataFrame({'Zip': ['02110', '10001', '94105', '02110'], 'Outsider': ['Joe', 'Ann', 'Joe', 'Bob'],
+                                 'Region': ['East', 'East', 'West', 'North']})
+     rows = pd.DataFrame({'Zip': ['02110-1234', '2110', '10001', '94105', '60601', None], 'AUM': np.arange(6.0)})
+
+     resolved = ZipTerritories(territories, ['Outsider', 'Region']).assign(rows)
+
+     # The same join in plain pandas: zero-padded 5-digit strings, first row of a repeated ZIP
+     lookup = territories.drop_duplicates('Zip')
+     padded = rows['Zip'].str.split('-').str[0].str.zfill(5)
+     expected = rows.merge(lookup, left_on=padded, right_on='Zip', how='left', suffixes=('', '_territory'))
+     for column in ['Outsider', 'Region']:
+          pd.testing.assert_series_equal(resolved[column].astype(object), expected[column].astype(object), check_index=False)
+     pd.testing.assert_frame_equal(resolved[rows.columns], rows)
+
+
+def test_master_list_matches_a_merge_on_cohort_postal_codes(cohort, tmp_path):
+     path = tmp_path / 'territories.csv'
+     pd.DataFrame({'Zip': ['02110', '10001', '60601'], 'Territory': ['East', 'Metro', 'Central']}).to_csv(path, index=False)
+
+     resolved = load_master_territories(str(path)).resolve(cohort['Postal Code'])
+
+     # The join the Cohort Analyzer left commented out, on postal codes cut to 5 digits and zero-padded
+     padded = cohort['Postal Code'].str[:5].str.zfill(5)
+     expected = padded.map(pd.read_csv(path, dtype={'Zip': str}).set_index('Zip')['Territory'])
+     pd.testing.assert_series_equal(pd.Series(resolved['Territory'], index=cohort.index).astype(object), expected.astype(object),
+                                    check_names=False)
@@ -0,0 +1,97 @@
+import io
+
+import pandas as pd
+import pytest
+
+from sales_data import uploads
+from sales_data.uploads import clear_upload, latest_upload, read_upload
+
+SHARED = 'Master ETF Data Pull'
+
+
+class Upload(io.BytesIO):
+     # Stand-in for a Streamlit UploadedFile
+     def __init__(self, df, name):
+          buffer = io.BytesIO()
+          df.to_excel(buffer, index=False)
+          super().__init__(buffer.getvalue())
+          self.name = name
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(snapshot_dir, monkeypatch):
+     monkeypatch.setattr(uploads, '_parsed', type(uploads._parsed)())
+     monkeypatch.setattr(uploads, '_shared', {})
+     monkeypatch.setattr(uploads, '_pinned', {})
+     monkeypatch.setattr(uploads, '_held', 0)
+
+
+@pytest.fixture
+def tickers():
+     return pd.DataFrame({'Ticker': ['KNG', 'BUFR', 'RYLD'], 'Type': ['ETF', 'ETF', 'ETF']})
+
+
+def test_shared_upload_records_who_and_when(tickers):
+     read_upload(Upload(tickers, 'tickers.xlsx'), share_as=SHARED, shared_by='Ann Smith')
+
+     df, details = latest_upload(SHARED)
+
+     pd.testing.assert_frame_equal(df, tickers)
+     assert details['file_name'] == 'tickers.xlsx'
+     assert details['uploaded_by'] == 'Ann Smith'
+     assert pd.Timestamp(details['uploaded_at']).tzinfo is not None
+     assert latest_upload('Other file') == (None, None)
+
+
+def test_same_file_is_not_shared_again(tickers):
+     upload = Upload(tickers, 'tickers.xlsx')
+     read_upload(upload, share_as=SHARED, shared_by='Ann Smith')
+     read_upload(upload, share_as=SHARED, shared_by='Bob Jones')
+
+     assert latest_upload(SHARED)[1]['uploaded_by'] == 'Ann Smith'
+
+
+def test_new_upload_replaces_the_shared_file(tickers):
+     read_upload(Upload(tickers, 'tickers.xlsx'), share_as=SHARED, shared_by='Ann Smith')
+     read_upload(Upload(tickers.head(1), 'kng.xlsx'), share_as=SHARED, shared_by='Bob Jones')
+
+     df, details = latest_upload(SHARED)
+
+     assert df['Ticker'].tolist() == ['KNG']
+     assert details['uploaded_by'] == 'Bob Jones'
+
+
+def test_shared_upload_is_never_evicted(tickers, monkeypatch):
+     monkeypatch.setattr(uploads, 'UPLOAD_CACHE_BYTES', 1)
+     read_upload(Upload(tickers, 'tickers.xlsx'), share_as=SHARED, shared_by='Ann Smith')
+     read_upload(Upload(tickers.head(1), 'kng.xlsx'))
+
+     # The big upload pushed the shared file out of the cache, but not out of the shared slot or off disk
+     assert len(uploads._parsed) == 1
+     df, details = latest_upload(SHARED)
+     pd.testing.assert_frame_equal(df, tickers)
+     assert details['file_name'] == 'tickers.xlsx'
+     assert uploads._shared_path(SHARED).exists()
+
+
+def test_shared_upload_survives_a_restart(tickers, monkeypatch):
+     read_upload(Upload(tickers, 'tickers.xlsx'), share_as=SHARED, shared_by='Ann Smith')
+     monkeypatch.setattr(uploads, '_parsed', type(uploads._parsed)())
+     monkeypatch.setattr(uploads, '_shared', {})
+     monkeypatch.setattr(uploads, '_pinned', {})
+
+     df, details = latest_upload(SHARED)
+
+     assert df['Ticker'].tolist() == tickers['Ticker'].tolist()
+     assert details['uploaded_by'] == 'Ann Smith'
+
+
+def test_cleared_upload_is_gone_after_a_restart(tickers, monkeypatch):
+     read_upload(Upload(tickers, 'tickers.xlsx'), share_as=SHARED, shared_by='Ann Smith')
+
+     clear_upload(SHARED)
+
+     assert latest_upload(SHARED) == (None, None)
+     monkeypatch.setattr(uploads, '_shared', {})
+     monkeypatch.setattr(uploads, '_pinned', {})
+     assert latest_upload(SHARED) == (None, None)
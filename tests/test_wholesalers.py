@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from sales_data.rankings import ClientRankings
+from sales_data.wholesalers import UNKNOWN, WholesalerRoster
+
+
+def test_roster_joins_spellings_across_files():
+     mf_sales = pd.Series(['Michael Capizzi', 'Chris Mortimer', 'Andrew Torok'])
+     cohort = pd.Series(['michael  capizzi', 'Christopher Mortimer', 'Andrew Torok', 'Dana Poggi', None])
+
+     roster = WholesalerRoster(mf_sales, cohort)
+
+     # Dana Poggi is only in the cohort and still gets a tab
+     assert roster.names == ['Michael Capizzi', 'Chris Mortimer', 'Dana Poggi', 'Andrew Torok']
+     assert roster.spellings('Michael Capizzi') == ['Michael Capizzi', 'michael  capizzi']
+     assert roster.spellings('Chris Mortimer') == ['Chris Mortimer', 'Christopher Mortimer']
+     assert roster.spellings(None) == [None]
+     assert roster.label(None) == UNKNOWN
+
+
+def test_shared_last_names_get_unique_labels():
+     roster = WholesalerRoster(pd.Series(['Ann Smith', 'Bob Smith', 'Andrew Torok']), pd.Series(['A. Smith']))
+
+     labels = [roster.label(name) for name in roster.names]
+
+     assert len(set(labels)) == len(labels)
+     assert labels == ['A. Smith', 'Ann Smith', 'Bob Smith', 'Torok']
+     # An ambiguous last name is not guessed: the spelling stays its own wholesaler
+     assert roster.spellings('A. Smith') == ['A. Smith']
+
+
+def test_top_of_several_spellings_matches_pandas():
+     rng = np.random.default_rng(0)
+     df = pd.DataFrame({'Vest': pd.Categorical(rng.choice(['Chris Mortimer', 'Christopher Mortimer', 'Andrew Torok'], 200)),
+                        'AUM': rng.random(200), 'NNA': rng.normal(size=200)})
+     rankings = ClientRankings(df, 'Vest', depth=5)
+     spellings = ['Chris Mortimer', 'Christopher Mortimer']
+     rows = df[df['Vest'].isin(spellings)]
+
+     for measure, k, largest in [('AUM', 20, True), ('NNA', 10, True), ('NNA', 10, False)]:
+          expected = rows[measure].nlargest(k) if largest else rows[measure].nsmallest(k)
+          top = rankings.top_of(df, spellings, measure, k, largest)
+          assert top[measure].tolist() == expected.tolist()
+
+
+def test_multi_name_cells_are_their_own_wholesaler():
+     vest = pd.Series(['Michael Capizzi', 'Chris Mortimer', 'Chris Mortimer / Michael Capizzi', 'Andrew Torok'])
+     roster = WholesalerRoster(vest)
+
+     # Before: each hard-coded tab took every row whose name contained its last name, so the shared cell
+     # was counted in both the Capizzi and the Mortimer tab
+     old_tabs = {last_name: vest[vest.str.contains(last_name, na=False)].tolist() for last_name in ['Capizzi', 'Mortimer']}
+     assert old_tabs == {'Capizzi': ['Michael Capizzi', 'Chris Mortimer / Michael Capizzi'],
+                         'Mortimer': ['Chris Mortimer', 'Chris Mortimer / Michael Capizzi']}
+
+     # Now: tabs take the exact spellings of one roster name. The shared cell gets a tab of its own,
+     # labelled with the full cell because its last word is also Capizzi's
+     new_tabs = {roster.label(name): vest[vest.isin(roster.spellings(name))].tolist() for name in roster.names}
+     assert new_tabs == {'Michael Capizzi': ['Michael Capizzi'],
+                         'Chris Mortimer / Michael Capizzi': ['Chris Mortimer / Michael Capizzi'],
+                         'Mortimer': ['Chris Mortimer'], 'Torok': ['Andrew Torok']}
@@ -1,3 +1,4 @@
+from functools import partial
 from pathlib import Path
 import yaml
 from yaml import SafeLoader
@@ -7,46 +8,14 @@ import streamlit_authenticator as stauth
 import pandas as pd
 from st_aggrid import AgGrid
 
-def format_dollar_amount(amount):
-    formatted_absolute_amount = '${:,.2f}'.format(abs(amount))
-    if round(amount, 2) < 0:
-        return f'-{formatted_absolute_amount}'
-    return formatted_absolute_amount
+from sales_data import SourceLoader, load_mf_cohort_data
+from sales_data.columns import columns_for
+from sales_data.cube import MONTH, PRODUCT, WHOLESALER, load_etf_cube, load_mf_cube, load_uit_cube
+from sales_data.formatting import format_dollar_amount
+from sales_data.periods import parse_month
+from sales_data.rankings import load_cohort_rankings
+from sales_data.wholesalers import WholesalerRoster
 
-@st.cache_data(ttl=21*24*3600)
-def load_mf_sales_data(url):
-     #----------READ IN DATA--------
-     # Read in the Broadridge Data
-     df_mf_master = pd.read_excel(url,sheet_name='Sales Data Merge',engine='openpyxl',skiprows=0)
-     return df_mf_master
-
-@st.cache_data(ttl=21*24*3600)
-def load_mf_cohort_data(url):
-     #----------READ IN DATA--------
-     # Read in the Broadridge Data
-     df_mf_master = pd.read_excel(url,engine='openpyxl',skiprows=0)
-     return df_mf_master
-
-@st.cache_data(ttl=30*24*3600)
-def load_vest_wholesaler_data(url):
-     #----------READ IN DATA--------
-     # Read in the Cboe Vest Wholesaler Territory Data
-     df_vest_wholesalers = pd.read_excel(url,engine='openpyxl',skiprows=0)
-     return df_vest_wholesalers
-
-@st.cache_data(ttl=21*24*3600)
-def load_etf_data(url):
-     #----------READ IN DATA--------
-     # Read in the FT ETF Sales Data
-     df_etf_master = pd.read_excel(url,sheet_name='Sales Data',engine='openpyxl',skiprows=0)
-     return df_etf_master
-
-@st.cache_data(ttl=21*24*3600)
-def load_uit_data(url):
-     #----------READ IN DATA--------
-     # Read in the FT UIT Sales Data
-     df_uit_master = pd.read_excel(url,engine='openpyxl',skiprows=0)
-     return df_uit_master
 
 #---------- SETTINGS ----------
 page_title = "Sales Dashboard"
@@ -86,19 +55,21 @@ elif st.session_state['authentication_status'] is None:
 if st.session_state['authentication_status']:
      
      #----------STATUS MESSAGE------
-     with st.spinner('Loading All Sales Data. This May Take A Minute. Please wait...'):
-          df_mf_sales_master = load_mf_sales_data(st.secrets['mf_sales_url'])
-          df_mf_cohort_master = load_mf_cohort_data(st.secrets['mf_analyzer_url'])
-          df_etf_master = load_etf_data(st.secrets['etf_sales_url'])
-          df_uit_master = load_uit_data(st.secrets['uit_sales_url'])
-          df_vest_wholesalers = load_vest_wholesaler_data(st.secrets['vest_wholesaler_url'])
+     # Start loading every source at once. Each section below only waits on the sources it uses.
+     # The sales histories are only read through their monthly cubes, so the raw rows are never handed to the page
+     sources = SourceLoader({
+          'MF Sales': partial(load_mf_cube, st.secrets['mf_sales_url']),
+          'MF Cohort': partial(load_mf_cohort_data, st.secrets['mf_analyzer_url']),
+          'ETF Sales': partial(load_etf_cube, st.secrets['etf_sales_url']),
+          'UIT Sales': partial(load_uit_cube, st.secrets['uit_sales_url'], st.secrets['vest_wholesaler_url']),
+     })
+     mf_cube = sources.get('MF Sales')
 
      # Load in the data and perform operations on the Dataframe
      # Merged Master_Table and Sheet1 into df3
      #df_mf_master_merged = df_mf_master.merge(df_vest_wholesalers, left_on=['State/Region'], right_on=['State'], how='outer')
      #df_etf_master_merged = df_etf_master.merge(df_vest_wholesalers, left_on=['State'], right_on=['State'], how='left')
-     df_uit_master_merged = df_uit_master.merge(df_vest_wholesalers, left_on=['State'], right_on=['State'], how='left')
-     date_options = df_mf_sales_master['Month/Year (Asset Date)'].dt.strftime('%m-%Y').unique().tolist()
+     date_options = [month.strftime('%m-%Y') for month in mf_cube.months]
      
      # Filtered NNA
      #df3_nna = df_mf_master_merged[df_mf_master_merged['NNA'].notnull()]
@@ -113,28 +84,25 @@ if st.session_state['authentication_status']:
      #selected_date_master = df_mf_master[df_mf_master['Month/Year (Asset Date)'] == pd.to_datetime(date_select + "-01",format='%m-%Y-%d')]
      #selected_prev_date_master = df_mf_master[df_mf_master['Month/Year (Asset Date)'] == (pd.to_datetime(date_select + "-01",format='%m-%Y-%d') - pd.DateOffset(months=1))]
 
-     # Filter the date on the merged table as well. We will use this table for wholesaler filter
-     selected_date_mf_master = df_mf_sales_master[df_mf_sales_master['Month/Year (Asset Date)'] == pd.to_datetime(date_select + "-01",format='%m-%Y-%d')]
-     selected_prev_date_mf_master = df_mf_sales_master[df_mf_sales_master['Month/Year (Asset Date)'] == (pd.to_datetime(date_select + "-01",format='%m-%Y-%d') - pd.DateOffset(months=1))]
-     selected_date_etf_master = df_etf_master[df_etf_master['Date'] == pd.to_datetime(date_select + "-01",format='%m-%Y-%d')]
-     selected_prev_date_etf_master = df_etf_master[df_etf_master['Date'] == (pd.to_datetime(date_select + "-01",format='%m-%Y-%d') - pd.DateOffset(months=1))]
-     selected_date_uit_master = df_uit_master_merged[df_uit_master_merged['Date'] == pd.to_datetime(date_select + "-01",format='%m-%Y-%d')]
-     selected_prev_date_uit_master = df_uit_master_merged[df_uit_master_merged['Date'] == (pd.to_datetime(date_select + "-01",format='%m-%Y-%d') - pd.DateOffset(months=1))]
+     # The selected month and the month before it. All metrics below are lookups into the monthly cubes
+     selected_date = parse_month(date_select)
+     selected_prev_date = selected_date - pd.DateOffset(months=1)
 
-     # Create tabs that will be based on each wholesaler
-     firm, capizzi, torok, mortimer, poggi, sullivan, unknown = st.tabs(['Firm', 'Capizzi', 'Torok', 'Mortimer', 'Poggi', 'Sullivan','Unknown'])
+     # Create tabs that will be based on each wholesaler in the MF sales or cohort data. None collects the rows without a wholesaler
+     df_mf_cohort_master = sources.get('MF Cohort')
+     roster = WholesalerRoster(mf_cube.wholesalers, df_mf_cohort_master['Vest'])
+     wholesalers = roster.names + [None]
+     firm, *wholesaler_tabs = st.tabs(['Firm'] + [roster.label(wholesaler) for wholesaler in wholesalers])
      
-     # Calculate Total Firm AUM
-     selected_date_mf_AUM = selected_date_mf_master['AUM'].sum()
-     selected_date_etf_AUM = selected_date_etf_master['AUM'].sum()
-     selected_date_uit_AUM = selected_date_uit_master['AUM'].sum()
-     total_firm_aum = selected_date_mf_AUM + selected_date_etf_AUM + selected_date_uit_AUM
+     # Calculate MF AUM
+     selected_date_mf_AUM = mf_cube.total(selected_date, 'AUM')
 
      # Firm Wide Tab
      with firm:
           
-          # Create the headers
-          st.header(f"Overall Firm Summary (AUM {format_dollar_amount(total_firm_aum)})")
+          # Create the headers. The total needs every product, so it is filled in once ETF and UIT are loaded
+          firm_header = st.empty()
+          firm_header.header("Overall Firm Summary")
           st.write(f"As of {date_select}")
           col1, col2 = st.columns(2)
           
@@ -142,337 +110,120 @@ if st.session_state['authentication_status']:
           #selected_date_AUM = df3_selected_month['AUM'].sum()
           #selected_prev_date_AUM = df3_previous_month['AUM'].sum()
           #selected_date_mf_AUM = selected_date_mf_master['AUM'].sum()
-          selected_prev_date_mf_AUM = selected_prev_date_mf_master['AUM'].sum()
+          selected_prev_date_mf_AUM = mf_cube.total(selected_prev_date, 'AUM')
           change_in_AUM = selected_date_mf_AUM - selected_prev_date_mf_AUM
           col1.metric("Total Mutual Funds AUM", format_dollar_amount(selected_date_mf_AUM), format_dollar_amount(change_in_AUM))
           col1.caption("Month Over Month Change")
 
           # Calculate total NNA by filtering from the master table all blank values in the NNA column
           # then we create a new dataframe and use this to get NNA
-          selected_date_NNA = selected_date_mf_master['NNA'].sum()
-          selected_prev_date_NNA = selected_prev_date_mf_master['NNA'].sum()
+          selected_date_NNA = mf_cube.total(selected_date, 'NNA')
+          selected_prev_date_NNA = mf_cube.total(selected_prev_date, 'NNA')
           change_in_NNA = selected_date_NNA - selected_prev_date_NNA
           col2.metric("Total Mutual Funds NNA", format_dollar_amount(selected_date_NNA), format_dollar_amount(change_in_NNA))
           col2.caption("Month Over Month Change")
           
           # Calculate ETF Assets for Firm and display
           etf_firm, uit_firm = st.columns(2)
-          #selected_date_etf_AUM = selected_date_etf_master['AUM'].sum()
-          selected_prev_date_etf_AUM = selected_prev_date_etf_master['AUM'].sum()
+          etf_cube = sources.get('ETF Sales')
+          selected_date_etf_AUM = etf_cube.total(selected_date, 'AUM')
+          selected_prev_date_etf_AUM = etf_cube.total(selected_prev_date, 'AUM')
           change_in_AUM = selected_date_etf_AUM - selected_prev_date_etf_AUM
           etf_firm.metric("Total ETF AUM", format_dollar_amount(selected_date_etf_AUM), format_dollar_amount(change_in_AUM))
           etf_firm.caption("Month Over Month Change")
           
           # Calculate UIT Assets for Firm and display
-          #selected_date_uit_AUM = selected_date_uit_master['Princ Amt'].sum()
-          selected_prev_date_uit_AUM = selected_prev_date_uit_master['AUM'].sum()
+          uit_cube = sources.get('UIT Sales')
+          selected_date_uit_AUM = uit_cube.total(selected_date, 'AUM')
+          selected_prev_date_uit_AUM = uit_cube.total(selected_prev_date, 'AUM')
           change_in_AUM = selected_date_uit_AUM - selected_prev_date_uit_AUM
           uit_firm.metric("Total UIT AUM", format_dollar_amount(selected_date_uit_AUM), format_dollar_amount(change_in_AUM))
           uit_firm.caption("Month Over Month Change")
           
+          # Calculate Total Firm AUM
+          total_firm_aum = selected_date_mf_AUM + selected_date_etf_AUM + selected_date_uit_AUM
+          firm_header.header(f"Overall Firm Summary (AUM {format_dollar_amount(total_firm_aum)})")
+          
           st.markdown("""---""")
           
           mf_line_col, mf_bar_col, mf_bar_by_ticker = st.columns(3)
           
           with mf_line_col:
                mf_line_col.subheader("Mutual Fund Assets Over Time")
-               st.line_chart(df_mf_sales_master.groupby(['Month/Year (Asset Date)'], as_index=False).sum(), x='Month/Year (Asset Date)', y='AUM')
+               st.line_chart(mf_cube.series('AUM'), x=MONTH, y='AUM')
           with mf_bar_col:
                mf_bar_col.subheader("Mutual Fund Assets By Wholesaler")
-               st.bar_chart(selected_date_mf_master[['Vest Wholesaler','AUM']].groupby(['Vest Wholesaler'], as_index=False).sum(), x='Vest Wholesaler', y='AUM')
+               st.bar_chart(mf_cube.breakdown(selected_date, WHOLESALER, 'AUM'), x=WHOLESALER, y='AUM')
           with mf_bar_by_ticker:
                mf_bar_by_ticker.subheader("Mutual Fund Assets By Product")
-               st.bar_chart(selected_date_mf_master[['Client Defined Category Name','AUM']].groupby(['Client Defined Category Name'], as_index=False).sum(), x='Client Defined Category Name', y='AUM')
+               st.bar_chart(mf_cube.breakdown(selected_date, PRODUCT, 'AUM'), x=PRODUCT, y='AUM')
           
           etf_line_col, etf_bar_col, etf_bar_by_ticker = st.columns(3)
           
           with etf_line_col:
                etf_line_col.subheader("ETF Assets Over Time")
-               st.line_chart(df_etf_master.groupby(['Date'], as_index=False).sum(), x='Date', y='AUM')
+               st.line_chart(etf_cube.series('AUM'), x=MONTH, y='AUM')
           with etf_bar_col:
                etf_bar_col.subheader("ETF Assets By Wholesaler")
-               st.bar_chart(selected_date_etf_master[['Vest Wholesaler','AUM']].groupby(['Vest Wholesaler'], as_index=False).sum(), x='Vest Wholesaler', y='AUM')
+               st.bar_chart(etf_cube.breakdown(selected_date, WHOLESALER, 'AUM'), x=WHOLESALER, y='AUM')
           with etf_bar_by_ticker:
                etf_bar_by_ticker.subheader("ETF Assets By Ticker")
-               st.bar_chart(selected_date_etf_master[['Ticker','AUM']].groupby(['Ticker'], as_index=False).sum(), x='Ticker', y='AUM')
+               st.bar_chart(etf_cube.breakdown(selected_date, PRODUCT, 'AUM'), x=PRODUCT, y='AUM')
                
           uit_line_col, uit_bar_col, uit_bar_by_ticker = st.columns(3)
           
           with uit_line_col:
                uit_line_col.subheader("UIT Assets Over Time")
-               st.line_chart(df_uit_master_merged.groupby(['Date'], as_index=False).sum(), x='Date', y='AUM')
+               st.line_chart(uit_cube.series('AUM'), x=MONTH, y='AUM')
           with uit_bar_col:
                uit_bar_col.subheader("UIT Assets By Wholesaler")
-               st.bar_chart(selected_date_uit_master[['Wholesaler','AUM']].groupby(['Wholesaler'], as_index=False).sum(), x='Wholesaler', y='AUM')
+               st.bar_chart(uit_cube.breakdown(selected_date, WHOLESALER, 'AUM'), x=WHOLESALER, y='AUM')
           with uit_bar_by_ticker:
                uit_bar_by_ticker.subheader("UIT Assets By Ticker")
-               st.bar_chart(selected_date_uit_master[['Ticker','AUM']].groupby(['Ticker'], as_index=False).sum(), x='Ticker', y='AUM')
+               st.bar_chart(uit_cube.breakdown(selected_date, PRODUCT, 'AUM'), x=PRODUCT, y='AUM')
                
           
                
           
 
-     # Capizzi Tab     
-     with capizzi:
-          # Create the headers
-          st.header("Capizzi Summary")
-          col1, col2 = st.columns(2)
-          
-          # Filtered Wholesaler to calculate the AUM
-          selected_date_df3_master_by_wholesaler = selected_date_mf_master[selected_date_mf_master['Vest Wholesaler'].str.contains('Capizzi', na=False)]
-          df_mf_cohort_master_by_wholesaler = df_mf_cohort_master[df_mf_cohort_master['Vest'].str.contains('Capizzi', na=False)]
-          selected_prev_date_df3_master_by_wholesaler = selected_prev_date_mf_master[selected_prev_date_mf_master['Vest Wholesaler'].str.contains('Capizzi', na=False)]
-          selected_date_AUM = selected_date_df3_master_by_wholesaler['AUM'].sum()
-          selected_prev_date_AUM = selected_prev_date_df3_master_by_wholesaler['AUM'].sum()
-          change_in_AUM = selected_date_AUM - selected_prev_date_AUM
-          col1.metric("Total Mutual Funds AUM", format_dollar_amount(selected_date_AUM), format_dollar_amount(change_in_AUM))
-          col1.caption('Month Over Month Change')
-          
-          # Net New Assets Calculations
-          selected_date_NNA = selected_date_df3_master_by_wholesaler[selected_date_df3_master_by_wholesaler['NNA'].notnull()]
-          selected_prev_date_NNA = selected_prev_date_df3_master_by_wholesaler[selected_prev_date_df3_master_by_wholesaler['NNA'].notnull()]
-          change_in_NNA = selected_date_NNA['NNA'].sum() - selected_prev_date_NNA['NNA'].sum()
-          col2.metric("Total Mutual Funds NNA", format_dollar_amount(selected_date_NNA['NNA'].sum()), format_dollar_amount(change_in_NNA))
-          col2.caption("Month Over Month Change")
-          
-          #st.subheader("Metrics")
-          #zizi_mf_line, zizi_mf_bar = st.columns(2)
-          
-          st.markdown("""---""")
-          
-          st.subheader('Top 20 Clients')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                       'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                       'NNA']].sort_values(by=['AUM'], ascending=False).head(20),
-               width='100%',key='capizzi20')
-          
-          st.subheader('Top 10 Inflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                       'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                       'NNA']].sort_values(by=['NNA'], ascending=False).head(10),
-               width='100%')
-          
-          st.subheader('Top 10 Outflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                       'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                       'NNA']].sort_values(by=['NNA'], ascending=True).head(10),
-               width='100%')
-
-     # Torok Tab     
-     with torok:
-          # Create the headers
-          st.header("Torok Summary")
-          col1, col2 = st.columns(2)
-          
-          # Filtered Wholesaler to calculate the AUM
-          selected_date_df3_master_by_wholesaler = selected_date_mf_master[selected_date_mf_master['Vest Wholesaler'].str.contains('Torok', na=False)]
-          df_mf_cohort_master_by_wholesaler = df_mf_cohort_master[df_mf_cohort_master['Vest'].str.contains('Torok', na=False)]
-          selected_prev_date_df3_master_by_wholesaler = selected_prev_date_mf_master[selected_prev_date_mf_master['Vest Wholesaler'].str.contains('Torok', na=False)]
-          selected_date_AUM = selected_date_df3_master_by_wholesaler['AUM'].sum()
-          selected_prev_date_AUM = selected_prev_date_df3_master_by_wholesaler['AUM'].sum()
-          change_in_AUM = selected_date_AUM - selected_prev_date_AUM
-          col1.metric("Total Mutual Funds AUM", format_dollar_amount(selected_date_AUM), format_dollar_amount(change_in_AUM))
-          col1.caption('Month Over Month Change')
-          
-          # Net New Assets Calculations
-          selected_date_NNA = selected_date_df3_master_by_wholesaler[selected_date_df3_master_by_wholesaler['NNA'].notnull()]
-          selected_prev_date_NNA = selected_prev_date_df3_master_by_wholesaler[selected_prev_date_df3_master_by_wholesaler['NNA'].notnull()]
-          change_in_NNA = selected_date_NNA['NNA'].sum() - selected_prev_date_NNA['NNA'].sum()
-          col2.metric("Total Mutual Funds NNA", format_dollar_amount(selected_date_NNA['NNA'].sum()), format_dollar_amount(change_in_NNA))
-          col2.caption("Month Over Month Change")
-          
-          #st.subheader("Metrics")
-          #zizi_mf_line, zizi_mf_bar = st.columns(2)
-          
-          st.markdown("""---""")
-          
-          st.subheader('Top 20 Clients')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                       'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                       'NNA']].sort_values(by=['AUM'], ascending=False).head(20),
-               width='100%',key='torok20')
-          
-          st.subheader('Top 10 Inflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                       'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                       'NNA']].sort_values(by=['NNA'], ascending=False).head(10),
-               width='100%')
-          
-          st.subheader('Top 10 Outflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                       'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                       'NNA']].sort_values(by=['NNA'], ascending=True).head(10),
-               width='100%')
-
+     # Client rankings per wholesaler are computed once per data version
+     client_rankings = load_cohort_rankings(st.secrets['mf_analyzer_url'], 'Vest')
+     client_headers = columns_for('mf_cohort', 'dashboard_clients')
 
-     # Morti Tab     
-     with mortimer:
-          # Create the headers
-          st.header("Mortimer Summary")
-          col1, col2 = st.columns(2)
-          
-          # Filtered Wholesaler to calculate the AUM
-          selected_date_df3_master_by_wholesaler = selected_date_mf_master[selected_date_mf_master['Vest Wholesaler'].str.contains('Morti', na=False)]
-          df_mf_cohort_master_by_wholesaler = df_mf_cohort_master[df_mf_cohort_master['Vest'].str.contains('Morti', na=False)]
-          selected_prev_date_df3_master_by_wholesaler = selected_prev_date_mf_master[selected_prev_date_mf_master['Vest Wholesaler'].str.contains('Morti', na=False)]
-          selected_date_AUM = selected_date_df3_master_by_wholesaler['AUM'].sum()
-          selected_prev_date_AUM = selected_prev_date_df3_master_by_wholesaler['AUM'].sum()
-          change_in_AUM = selected_date_AUM - selected_prev_date_AUM
-          col1.metric("Total Mutual Funds AUM", format_dollar_amount(selected_date_AUM), format_dollar_amount(change_in_AUM))
-          col1.caption('Month Over Month Change')
-          
-          # Net New Assets Calculations
-          selected_date_NNA = selected_date_df3_master_by_wholesaler[selected_date_df3_master_by_wholesaler['NNA'].notnull()]
-          selected_prev_date_NNA = selected_prev_date_df3_master_by_wholesaler[selected_prev_date_df3_master_by_wholesaler['NNA'].notnull()]
-          change_in_NNA = selected_date_NNA['NNA'].sum() - selected_prev_date_NNA['NNA'].sum()
-          col2.metric("Total Mutual Funds NNA", format_dollar_amount(selected_date_NNA['NNA'].sum()), format_dollar_amount(change_in_NNA))
-          col2.caption("Month Over Month Change")
-          
-          st.markdown("""---""")
-          
-          st.subheader('Top 20 Clients')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['AUM'], ascending=False).head(20),
-               width='100%',key='mortimer20')
-          
-          st.subheader('Top 10 Inflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['NNA'], ascending=False).head(10),
-               width='100%',key='mortimer_top_10_inflow')
-          
-          st.subheader('Top 10 Outflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['NNA'], ascending=True).head(10),
-               width='100%',key='mortimer_top_10_outflow')
-          
-     # Poggi Tab     
-     with poggi:
-          # Create the headers
-          st.header("Poggi Summary")
-          col1, col2 = st.columns(2)
-          
-          # Filtered Wholesaler to calculate the AUM
-          selected_date_df3_master_by_wholesaler = selected_date_mf_master[selected_date_mf_master['Vest Wholesaler'].str.contains('Poggi', na=False)]
-          df_mf_cohort_master_by_wholesaler = df_mf_cohort_master[df_mf_cohort_master['Vest'].str.contains('Poggi', na=False)]
-          selected_prev_date_df3_master_by_wholesaler = selected_prev_date_mf_master[selected_prev_date_mf_master['Vest Wholesaler'].str.contains('Poggi', na=False)]
-          selected_date_AUM = selected_date_df3_master_by_wholesaler['AUM'].sum()
-          selected_prev_date_AUM = selected_prev_date_df3_master_by_wholesaler['AUM'].sum()
-          change_in_AUM = selected_date_AUM - selected_prev_date_AUM
-          col1.metric("Total Mutual Funds AUM", format_dollar_amount(selected_date_AUM), format_dollar_amount(change_in_AUM))
-          col1.caption('Month Over Month Change')
-          
-          # Net New Assets Calculations
-          selected_date_NNA = selected_date_df3_master_by_wholesaler[selected_date_df3_master_by_wholesaler['NNA'].notnull()]
-          selected_prev_date_NNA = selected_prev_date_df3_master_by_wholesaler[selected_prev_date_df3_master_by_wholesaler['NNA'].notnull()]
-          change_in_NNA = selected_date_NNA['NNA'].sum() - selected_prev_date_NNA['NNA'].sum()
-          col2.metric("Total Mutual Funds NNA", format_dollar_amount(selected_date_NNA['NNA'].sum()), format_dollar_amount(change_in_NNA))
-          col2.caption("Month Over Month Change")
-          
-          st.markdown("""---""")
-          
-          st.subheader('Top 20 Clients')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['AUM'], ascending=False).head(20),
-               width='100%')
-          
-          st.subheader('Top 10 Inflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['NNA'], ascending=False).head(10),
-               width='100%')
-          
-          st.subheader('Top 10 Outflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['NNA'], ascending=True).head(10),
-               width='100%')
-          
-     # Sullivan Tab     
-     with sullivan:
-          # Create the headers
-          st.header("Sullivan Summary")
-          col1, col2 = st.columns(2)
-          
-          # Filtered Wholesaler to calculate the AUM
-          selected_date_df3_master_by_wholesaler = selected_date_mf_master[selected_date_mf_master['Vest Wholesaler'].str.contains('Sullivan', na=False)]
-          df_mf_cohort_master_by_wholesaler = df_mf_cohort_master[df_mf_cohort_master['Vest'].str.contains('Sullivan', na=False)]
-          selected_prev_date_df3_master_by_wholesaler = selected_prev_date_mf_master[selected_prev_date_mf_master['Vest Wholesaler'].str.contains('Sullivan', na=False)]
-          selected_date_AUM = selected_date_df3_master_by_wholesaler['AUM'].sum()
-          selected_prev_date_AUM = selected_prev_date_df3_master_by_wholesaler['AUM'].sum()
-          change_in_AUM = selected_date_AUM - selected_prev_date_AUM
-          col1.metric("Total Mutual Funds AUM", format_dollar_amount(selected_date_AUM), format_dollar_amount(change_in_AUM))
-          col1.caption('Month Over Month Change')
-          
-          # Net New Assets Calculations
-          selected_date_NNA = selected_date_df3_master_by_wholesaler[selected_date_df3_master_by_wholesaler['NNA'].notnull()]
-          selected_prev_date_NNA = selected_prev_date_df3_master_by_wholesaler[selected_prev_date_df3_master_by_wholesaler['NNA'].notnull()]
-          change_in_NNA = selected_date_NNA['NNA'].sum() - selected_prev_date_NNA['NNA'].sum()
-          col2.metric("Total Mutual Funds NNA", format_dollar_amount(selected_date_NNA['NNA'].sum()), format_dollar_amount(change_in_NNA))
-          col2.caption("Month Over Month Change")
-          
-          st.markdown("""---""")
-          
-          st.subheader('Top 20 Clients')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['AUM'], ascending=False).head(20),
-               width='100%')
-          
-          st.subheader('Top 10 Inflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['NNA'], ascending=False).head(10),
-               width='100%')
-          
-          st.subheader('Top 10 Outflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['NNA'], ascending=True).head(10),
-               width='100%')
-          
-     # Unknown Tab     
-     with unknown:
-          # Create the headers
-          st.header("Unknown Region Summary")
-          col1, col2 = st.columns(2)
-          
-          # Filtered Wholesaler to calculate the AUM
-          selected_date_df3_master_by_wholesaler = selected_date_mf_master[selected_date_mf_master['Vest Wholesaler'].isnull()]
-          df_mf_cohort_master_by_wholesaler = df_mf_cohort_master[df_mf_cohort_master['Vest'].isnull()]
-          selected_prev_date_df3_master_by_wholesaler = selected_prev_date_mf_master[selected_prev_date_mf_master['Vest Wholesaler'].isnull()]
-          selected_date_AUM = selected_date_df3_master_by_wholesaler['AUM'].sum()
-          selected_prev_date_AUM = selected_prev_date_df3_master_by_wholesaler['AUM'].sum()
-          change_in_AUM = selected_date_AUM - selected_prev_date_AUM
-          col1.metric("Total Mutual Funds AUM", format_dollar_amount(selected_date_AUM), format_dollar_amount(change_in_AUM))
-          col1.caption('Month Over Month Change')
-          
-          # Net New Assets Calculations
-          selected_date_NNA = selected_date_df3_master_by_wholesaler[selected_date_df3_master_by_wholesaler['NNA'].notnull()]
-          selected_prev_date_NNA = selected_prev_date_df3_master_by_wholesaler[selected_prev_date_df3_master_by_wholesaler['NNA'].notnull()]
-          change_in_NNA = selected_date_NNA['NNA'].sum() - selected_prev_date_NNA['NNA'].sum()
-          col2.metric("Total Mutual Funds NNA", format_dollar_amount(selected_date_NNA['NNA'].sum()), format_dollar_amount(change_in_NNA))
-          col2.caption("Month Over Month Change")
-          
-          st.markdown("""---""")
-          
-          st.subheader('Top 20 Clients')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['AUM'], ascending=False).head(20),
-               width='100%')
-          
-          st.subheader('Top 10 Inflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['NNA'], ascending=False).head(10),
-               width='100%')
-          
-          st.subheader('Top 10 Outflows')
-          AgGrid(df_mf_cohort_master_by_wholesaler[['Intermediary Firm Name', 'Initiating Firm Name', 'Address Line 1', 'Address Line 2',
-                                                    'City', 'State/Region', 'Postal Code', 'Client Defined Category Name', 'AUM', 
-                                                    'NNA']].sort_values(by=['NNA'], ascending=True).head(10),
-               width='100%')
+     # One tab per wholesaler in the roster, plus the Unknown region
+     for position, (wholesaler, wholesaler_tab) in enumerate(zip(wholesalers, wholesaler_tabs)):
+          label = roster.label(wholesaler)
+          # The files may spell a wholesaler differently. Every spelling counts towards the tab
+          spellings = roster.spellings(wholesaler)
+          with wholesaler_tab:
+               # Create the headers
+               st.header("Unknown Region Summary" if wholesaler is None else f"{label} Summary")
+               col1, col2 = st.columns(2)
+               
+               # Wholesaler AUM from the cube
+               selected_date_AUM = sum(mf_cube.wholesaler_total(selected_date, name, 'AUM') for name in spellings)
+               selected_prev_date_AUM = sum(mf_cube.wholesaler_total(selected_prev_date, name, 'AUM') for name in spellings)
+               change_in_AUM = selected_date_AUM - selected_prev_date_AUM
+               col1.metric("Total Mutual Funds AUM", format_dollar_amount(selected_date_AUM), format_dollar_amount(change_in_AUM))
+               col1.caption('Month Over Month Change')
+               
+               # Net New Assets Calculations
+               selected_date_NNA = sum(mf_cube.wholesaler_total(selected_date, name, 'NNA') for name in spellings)
+               selected_prev_date_NNA = sum(mf_cube.wholesaler_total(selected_prev_date, name, 'NNA') for name in spellings)
+               change_in_NNA = selected_date_NNA - selected_prev_date_NNA
+               col2.metric("Total Mutual Funds NNA", format_dollar_amount(selected_date_NNA), format_dollar_amount(change_in_NNA))
+               col2.caption("Month Over Month Change")
+               
+               st.markdown("""---""")
+               
+               st.subheader('Top 20 Clients')
+               AgGrid(client_rankings.top_of(df_mf_cohort_master, spellings, 'AUM', 20)[client_headers],
+                    width='100%',key=f'wholesaler{position}_top_20')
+               
+               st.subheader('Top 10 Inflows')
+               AgGrid(client_rankings.top_of(df_mf_cohort_master, spellings, 'NNA', 10)[client_headers],
+                    width='100%',key=f'wholesaler{position}_top_10_inflow')
+               
+               st.subheader('Top 10 Outflows')
+               AgGrid(client_rankings.top_of(df_mf_cohort_master, spellings, 'NNA', 10, largest=False)[client_headers],
+                    width='100%',key=f'wholesaler{position}_top_10_outflow')